@@ -4,42 +4,136 @@ Supports both Volumetric and Structural model modes with per-category materials.
 """
 import os
 import json
-import struct
+import asyncio
 import base64
-import tempfile
+import gzip
 import io
+import time
+import uuid
 import zipfile
-import ezdxf
-from typing import Optional
-from fastapi import FastAPI, HTTPException
+import threading
+from typing import Any, Optional
+from fastapi import FastAPI, HTTPException, Header
+try:
+    import brotli
+except ImportError:  # optional: br is only offered when the package is installed
+    brotli = None
 from fastapi.responses import Response, HTMLResponse, JSONResponse, StreamingResponse
-from pydantic import BaseModel
-from build123d import export_gltf, export_step, Compound, Color, Axis, Plane
-from staircase_parametric import build_staircase, DEFAULT_CONFIG as PARAM_DEFAULTS
-from staircase_structural import (
-    build_structural_staircase,
-    DEFAULT_CONFIG as STRUCT_DEFAULTS,
-    C_TREAD, C_RISER, C_STRINGER, C_CARRIAGE, C_PLASTER, C_HANDRAIL,
-    C_BALUSTER, C_WALKLINE,
+from pydantic import BaseModel, Field
+from build123d import Compound, Color, Axis, Plane
+from staircase_parametric import DEFAULT_CONFIG as PARAM_DEFAULTS
+from staircase_structural import DEFAULT_CONFIG as STRUCT_DEFAULTS, shutdown_build_pool
+from exporters import (
+    CATEGORY_ORDER, CATEGORY_STYLE, NESTABLE_CATEGORIES, PROFILE_CATEGORIES,
+    part_profiles, material_nest_input, material_splits, nested_dxf, profile_dxf, bom_csv, step_files,
+    structural_glb,
 )
-from bom_export import generate_csv
-from cnc_nesting import extract_2d_profile, nest_parts_optimized, split_with_scarf_joint
 from solvers import solve_l_shape, ComplianceError
+from geometry_cache import ArtifactCache, config_hash, structural_cache, volumetric_cache
+from brep_cache import BrepDiskCache
+from glb_export import DEFAULT_LOD, LOD_TIERS, shape_to_glb, node_digests, subset_glb
+from compute_pool import ComputePool, PoolSaturated
+from jobs import JobArtifact, JobStore
+from batch import MAX_BATCH, batch_pool, estimate, expand_grid
+from polygon_nesting import DEFAULT_NFP_CACHE_DIR, MIN_ROTATION_STEP, NfpCache
+from nesting_search import MAX_TIME_BUDGET, NEST_MODES
+from stock_nesting import iter_stock_nesting, nest_stock, nesting_summary, stock_lists
 
 app = FastAPI()
 
-# Category rendering info (matches display_structural in staircase_structural.py)
-CATEGORY_ORDER = ["treads", "risers", "plaster", "stringers", "carriages", "handrail", "balusters", "walkline"]
-CATEGORY_STYLE = {
-    "treads":    {"color": list(C_TREAD),    "opacity": 0.5},
-    "risers":    {"color": list(C_RISER),    "opacity": 0.5},
-    "plaster":   {"color": list(C_PLASTER),  "opacity": 0.5},
-    "stringers": {"color": list(C_STRINGER), "opacity": 1.0},
-    "carriages": {"color": list(C_CARRIAGE), "opacity": 1.0},
-    "handrail":  {"color": list(C_HANDRAIL), "opacity": 1.0},
-    "balusters": {"color": list(C_BALUSTER), "opacity": 1.0},
-    "walkline":  {"color": list(C_WALKLINE), "opacity": 0.8},
-}
+# Built geometry, shared by every endpoint that derives output from a config.
+# The disk tier lets restarted servers and sibling workers reuse each other's builds.
+GEOMETRY_CACHE = structural_cache(BrepDiskCache(namespace="structural"))
+VOLUMETRIC_CACHE = volumetric_cache(BrepDiskCache(namespace="volumetric"))
+
+# Finished /generate models (GLB bytes + manifest) keyed by model ETag, plus encoded
+# response bodies keyed by representation ETag (format + content-coding).
+# Bump GENERATE_FORMAT_VERSION whenever the GLB/manifest layout changes so stale client copies revalidate.
+GENERATE_FORMAT_VERSION = "g3"
+GENERATE_CACHE = ArtifactCache(max_entries=64, max_bytes=256 * 1024 * 1024)
+# No-fit polygons shared by every nesting endpoint (and, via disk, the batch workers)
+NFP_CACHE = NfpCache(DEFAULT_NFP_CACHE_DIR)
+# search id -> stop event for streaming /cnc/nest searches still running
+NEST_SEARCHES = {}
+# Configs of batch variants by config key, so their GLB URLs can be served by GET
+BATCH_CONFIGS = ArtifactCache(max_entries=4096, max_bytes=16 * 1024 * 1024)
+# {part id: digest} of recently rendered models by model etag: the base states /generate/delta diffs against
+BUILD_STATES = ArtifactCache(max_entries=512, max_bytes=32 * 1024 * 1024)
+
+# Geometry builds, exports and nesting run here, never on the event loop.
+# Sized by STUDIO_COMPUTE_WORKERS / STUDIO_COMPUTE_QUEUE / STUDIO_COMPUTE_TIMEOUT.
+COMPUTE_POOL = ComputePool()
+
+# Long-running exports submitted via /jobs/*; results are kept for STUDIO_JOB_TTL seconds.
+JOB_STORE = JobStore(COMPUTE_POOL)
+
+
+@app.on_event("shutdown")
+def _stop_build_pool():
+    # The structural build pool (STUDIO_BUILD_WORKERS) holds OCCT worker processes
+    shutdown_build_pool()
+
+
+
+def _structural_elements(config_dict):
+    """Return the categorised structural elements for a config, built at most once per design."""
+    _, elements = GEOMETRY_CACHE.get_or_build(config_dict)
+    return elements
+
+
+def _no_progress(stage):
+    pass
+
+
+def _artifact_response(artifact):
+    headers = {}
+    if artifact.filename:
+        headers["Content-Disposition"] = f"attachment; filename={artifact.filename}"
+    return Response(content=artifact.content, media_type=artifact.media_type, headers=headers)
+
+
+async def _offload(fn, *args):
+    """Run CPU-bound fn(*args) on COMPUTE_POOL; saturation -> 503 + Retry-After, timeout -> 504."""
+    try:
+        return await COMPUTE_POOL.run(fn, *args)
+    except PoolSaturated as e:
+        print(f"[API] Compute pool saturated, rejecting {fn.__name__}")
+        raise HTTPException(status_code=503, detail="Geometry workers are busy, please retry",
+                            headers={"Retry-After": str(e.retry_after)})
+    except asyncio.TimeoutError:
+        print(f"[API] {fn.__name__} exceeded {COMPUTE_POOL.timeout:.0f}s")
+        raise HTTPException(status_code=504, detail=f"Geometry job exceeded {COMPUTE_POOL.timeout:.0f}s")
+
+
+# Single-flight: concurrent requests for the same work await one shared pool job.
+# Only touched from the event loop thread, so no lock is needed.
+_IN_FLIGHT = {}
+COALESCE_STATS = {"leaders": 0, "followers": 0}
+
+
+async def _single_flight(key, fn, *args):
+    """Await fn(*args) on the compute pool, sharing one run among concurrent callers with the same key."""
+    task = _IN_FLIGHT.get(key)
+    if task is None:
+        COALESCE_STATS["leaders"] += 1
+        task = asyncio.ensure_future(_offload(fn, *args))
+        _IN_FLIGHT[key] = task
+        task.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    else:
+        COALESCE_STATS["followers"] += 1
+        print(f"[API] Coalescing onto in-flight {key[0]} {key[1]}")
+    # Shielded so one client disconnecting doesn't cancel the build for the others
+    return await asyncio.shield(task)
+
+
+async def _shared_geometry(cache, config_dict):
+    """Make sure config's geometry is in cache, building it at most once across concurrent requests.
+
+    Endpoints then derive their own output (GLB, BOM, DXF...) from the cached result.
+    """
+    key = cache.key_for(config_dict)
+    if key not in cache:
+        await _single_flight((cache.namespace, key), cache.get_or_build, config_dict)
 
 
 class StaircaseConfig(BaseModel):
@@ -63,11 +157,39 @@ class StaircaseConfig(BaseModel):
     carriage_depth: float = 250.0
     plaster_thickness: float = 10.0
 
+class StockSheet(BaseModel):
+    width: float
+    height: float
+    cost: float = 0.0
+    quantity: Optional[int] = None  # sheets on hand (offcuts); None buys as many as needed
+    name: Optional[str] = None
+
 class CncNestRequest(BaseModel):
     config: StaircaseConfig
     categories: list[str]
     sheet_width: float = 2440.0
     sheet_height: float = 1220.0
+    rotation_step: float = Field(90.0, ge=MIN_ROTATION_STEP, le=360)  # degrees between allowed part rotations
+    mode: str = "fast"              # nesting search: "fast" (~1 s) or "thorough" (~30 s)
+    time_budget: Optional[float] = None   # seconds, overrides the mode's budget
+    stock: Optional[dict[str, list[StockSheet]]] = None  # per material; default sheet_width x sheet_height
+
+class BundleRequest(BaseModel):
+    config: StaircaseConfig
+    categories: list[str] = list(NESTABLE_CATEGORIES)
+    sheet_width: float = 2440.0
+    sheet_height: float = 1220.0
+    stock: Optional[dict[str, list[StockSheet]]] = None  # per material, as for /cnc/nest
+
+class BatchRequest(BaseModel):
+    configs: Optional[list[StaircaseConfig]] = None
+    base: Optional[StaircaseConfig] = None
+    grid: Optional[dict[str, list[Any]]] = None
+    categories: list[str] = list(NESTABLE_CATEGORIES)
+    sheet_width: float = 2440.0
+    sheet_height: float = 1220.0
+    stock: Optional[dict[str, list[StockSheet]]] = None  # per material, as for /cnc/nest
+    include_glb: bool = False
 
 class FitToSpaceRequest(BaseModel):
     totalHeight: float
@@ -100,48 +222,71 @@ async def calculate_fit(req: FitToSpaceRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/cnc/nest")
-async def get_nested_layout(req: CncNestRequest):
+async def get_nested_layout(req: CncNestRequest, stream: bool = False):
     """Calculates an optimized nested layout with structural scarf joints.
     Automatically excludes non-flat architectural parts like handrails.
+    Parts are grouped by material (timber, structural, plywood) and each group is
+    nested on its own stock list; every sheet names its material and stock, and the
+    result carries sheet counts and cost per material and stock.
+    Strategies run in parallel for the request's mode / time budget; the best layout wins.
+
+    With ?stream=true the search is anytime: NDJSON lines stream back as it runs, a
+    {"type": "search"} header (with the search_id for /cnc/nest/{id}/stop), one
+    {"type": "layout"} line per improved layout, then {"type": "done"}.
     """
+    _check_nest_search(req)
+    await _shared_geometry(GEOMETRY_CACHE, req.config.dict())
+    if stream:
+        return await _stream_nesting(req)
+    return await _offload(_nested_layout, req)
+
+
+def _check_nest_search(req):
+    if req.mode not in NEST_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{req.mode}', expected one of {', '.join(NEST_MODES)}")
+    if req.time_budget is not None and not 0 < req.time_budget <= MAX_TIME_BUDGET:
+        raise HTTPException(status_code=400, detail=f"time_budget must be between 0 and {MAX_TIME_BUDGET:g} seconds")
     try:
-        config_dict = req.config.dict()
-        elements = build_structural_staircase(config_dict)
-        
-        # Define categories that can actually be nested on a flat sheet
-        NESTABLE_CATEGORIES = ["treads", "risers", "stringers", "carriages", "ribs", "plaster"]
-        
-        final_part_data = []
-        global_idx = 0
-        
-        for cat in req.categories:
-            if cat not in NESTABLE_CATEGORIES:
-                print(f"[API] Skipping non-nestable category: {cat}")
-                continue
-                
-            parts = elements.get(cat, [])
-            for i, p in enumerate(parts):
-                # 1. Apply 3D Scarf Split for oversized parts
-                segments = split_with_scarf_joint(p, req.sheet_width)
-                
-                for seg_idx, segment in enumerate(segments):
-                    suffix = f"_{chr(65+seg_idx)}" if len(segments) > 1 else ""
-                    prof = extract_2d_profile(segment)
-                    
-                    if prof and prof["width"] > 1 and prof["height"] > 1:
-                        final_part_data.append({
-                            "id": global_idx,
-                            "name": f"{cat}_{i+1}{suffix}",
-                            "width": prof["width"],
-                            "height": prof["height"],
-                            "points": prof["points"]
-                        })
-                        global_idx += 1
-        
-        if not final_part_data:
+        _nest_stock(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _stock_dicts(req):
+    return {m: [s.dict() for s in sheets] for m, sheets in (req.stock or {}).items()} if req.stock else None
+
+
+def _nest_stock(req):
+    """{material: stock list} for every material, the request's sheet size where none is given."""
+    return stock_lists(_stock_dicts(req), req.sheet_width, req.sheet_height)
+
+
+def _nest_groups(req):
+    """({material: part_data}, {material: stock}) for the request's nestable categories."""
+    config_dict = req.config.dict()
+    elements = _structural_elements(config_dict)
+
+    for cat in req.categories:
+        if cat not in NESTABLE_CATEGORIES:
+            print(f"[API] Skipping non-nestable category: {cat}")
+    categories = [c for c in req.categories if c in NESTABLE_CATEGORIES]
+
+    stock = _nest_stock(req)
+    return material_nest_input(elements, categories, stock, GEOMETRY_CACHE.key_for(config_dict)), stock
+
+
+def _search_layout(req, groups, stock):
+    return nest_stock(groups, stock, req.mode, req.time_budget, rotation_step=req.rotation_step,
+                      nfp_cache=NFP_CACHE)
+
+
+def _nested_layout(req):
+    try:
+        groups, stock = _nest_groups(req)
+        if not groups:
             return JSONResponse({"error": "No nestable parts selected"}, status_code=400)
             
-        result = nest_parts_optimized(final_part_data, req.sheet_width, req.sheet_height)
+        result = _search_layout(req, groups, stock)
         return JSONResponse(result)
         
     except Exception as e:
@@ -149,205 +294,122 @@ async def get_nested_layout(req: CncNestRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/cnc/export-dxf")
-async def export_cnc_dxf(req: CncNestRequest):
-    """Generates a multi-sheet DXF from the 3D-scarfed nesting layout."""
-    try:
-        config_dict = req.config.dict()
-        elements = build_structural_staircase(config_dict)
-        
-        # Only nest flat parts
-        NESTABLE_CATEGORIES = ["treads", "risers", "stringers", "carriages", "ribs", "plaster"]
-        
-        final_part_data = []
-        global_idx = 0
-        for cat in req.categories:
-            if cat not in NESTABLE_CATEGORIES:
-                continue
-                
-            parts = elements.get(cat, [])
-            for i, p in enumerate(parts):
-                # Use same 3D split logic as the preview
-                segments = split_with_scarf_joint(p, req.sheet_width)
-                for seg_idx, segment in enumerate(segments):
-                    suffix = f"_{chr(65+seg_idx)}" if len(segments) > 1 else ""
-                    prof = extract_2d_profile(segment)
-                    if prof and prof["width"] > 1:
-                        final_part_data.append({
-                            "id": global_idx, 
-                            "name": f"{cat}_{i+1}{suffix}", 
-                            "width": prof["width"], 
-                            "height": prof["height"], 
-                            "points": prof["points"]
-                        })
-                        global_idx += 1
-        
-        if not final_part_data:
-            return JSONResponse({"error": "No parts to nest"}, status_code=400)
 
-        result = nest_parts_optimized(final_part_data, req.sheet_width, req.sheet_height)
-        
-        doc = ezdxf.new()
-        doc.layers.add("0_PERIMETER", color=7)
-        doc.layers.add("0_HOLES", color=3)
-        doc.layers.add("0_TEXT", color=1)
-        msp = doc.modelspace()
-        
-        for bin_idx, sheet_data in result["sheets"].items():
-            y_offset = int(bin_idx) * (req.sheet_height + 100)
-            
-            # Sheet Border
-            msp.add_lwpolyline([
-                (0, y_offset), (req.sheet_width, y_offset), 
-                (req.sheet_width, y_offset + req.sheet_height), 
-                (0, y_offset + req.sheet_height), (0, y_offset)
-            ], dxfattribs={'layer': 'SHEET_BORDER'})
-            
-            # The new format for sheet_data is {"efficiency": ..., "parts": [...]}
-            for p in sheet_data["parts"]:
-                pts = p["points"]
-                final_pts = []
-                for px, py in pts:
-                    if p["is_rotated"]:
-                        final_pts.append((p["x"] + py, y_offset + p["y"] + px))
-                    else:
-                        final_pts.append((p["x"] + px, y_offset + p["y"] + py))
-                
-                if final_pts:
-                    final_pts.append(final_pts[0])
-                    msp.add_lwpolyline(final_pts, dxfattribs={'layer': 'NESTED_CUTS'})
-                    msp.add_text(p["name"], dxfattribs={'layer': 'LABELS', 'height': 20}).set_placement((p["x"]+5, y_offset + p["y"]+5))
-            
-        dxf_buffer = io.StringIO()
-        doc.write(dxf_buffer)
-        return Response(content=dxf_buffer.getvalue(), media_type="application/dxf", headers={"Content-Disposition": "attachment; filename=staircase_nested_structural.dxf"})
-        
+async def _stream_nesting(req):
+    try:
+        groups, stock = await _offload(_nest_groups, req)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    if not groups:
+        return JSONResponse({"error": "No nestable parts selected"}, status_code=400)
+
+    parts = sum(len(p) for p in groups.values())
+    search_id = uuid.uuid4().hex
+    stop = threading.Event()
+    NEST_SEARCHES[search_id] = stop
+    search = iter_stock_nesting(groups, stock, req.mode, req.time_budget, rotation_step=req.rotation_step,
+                                nfp_cache=NFP_CACHE, stop=stop)
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    # The search blocks between improvements, so one thread owns it and hands items to the loop
+    threading.Thread(target=_run_search, args=(search, loop, items), daemon=True,
+                     name=f"nest-{search_id[:8]}").start()
+    print(f"[API] Streaming nesting search {search_id} ({req.mode}, {parts} parts)")
+
+    async def stream():
+        yield json.dumps({"type": "search", "search_id": search_id, "mode": req.mode,
+                          "parts": parts, "materials": list(groups)}) + "\n"
+        seq = 0
+        try:
+            while True:
+                kind, value = await items.get()
+                if kind == "end":
+                    break
+                if kind == "error":
+                    yield json.dumps({"type": "error", "detail": str(value)}) + "\n"
+                elif kind == "layout":
+                    seq += 1
+                    yield json.dumps({"type": "layout", "seq": seq, "algo": value["algo"],
+                                      "sheet_count": value["sheet_count"], "efficiency": value["efficiency"],
+                                      "cost": value["cost"], "elapsed_s": value["seconds"], "layout": value}) + "\n"
+                else:
+                    yield json.dumps({"type": "done", **value}) + "\n"
+        finally:
+            # Client gone or search over: the owner thread sees the stop and runs the search to its end
+            stop.set()
+            NEST_SEARCHES.pop(search_id, None)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _run_search(search, loop, items):
+    """Run a streaming search to completion, passing each item (then "end") to the loop's queue."""
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            pass  # event loop already closed (server shutting down)
 
+    try:
+        for item in search:
+            put(item)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        put(("error", e))
+    finally:
+        put(("end", None))
 
 
-def _inject_materials_into_gltf(gltf_json, category_counts, part_face_counts):
-    """Create glTF materials from scratch and assign by mesh index.
+@app.post("/cnc/nest/{search_id}/stop")
+async def stop_nesting(search_id: str):
+    """Stop a streaming nesting search; its stream then sends the best layout's done line."""
+    stop = NEST_SEARCHES.get(search_id)
+    if stop is None:
+        raise HTTPException(status_code=404, detail="Unknown or finished nesting search")
+    stop.set()
+    return {"search_id": search_id, "stopping": True}
 
-    OCCT's RWGltf_CafWriter exports a single Compound as one Mesh with many primitives (one per face).
-    This function splits that single mesh into one mesh per part based on part_face_counts,
-    mapping exactly to the frontend's expected object tree structure.
-    """
-    if not category_counts or not part_face_counts:
-        return
-
-    # 1. Create materials array
-    materials = []
-    for cat_name, _ in category_counts:
-        style = CATEGORY_STYLE[cat_name]
-        r, g, b = style["color"]
-        a = style["opacity"]
-        mat = {
-            "name": cat_name,
-            "pbrMetallicRoughness": {
-                "baseColorFactor": [r, g, b, a],
-                "metallicFactor": 0.05,
-                "roughnessFactor": 0.65,
-            },
-        }
-        if a < 1.0:
-            mat["alphaMode"] = "BLEND"
-            mat["doubleSided"] = True
-        materials.append(mat)
+@app.post("/cnc/export-dxf")
+async def export_cnc_dxf(req: CncNestRequest):
+    """Generates a multi-sheet DXF from the 3D-scarfed nesting layout."""
+    _check_nest_search(req)
+    await _shared_geometry(GEOMETRY_CACHE, req.config.dict())
+    return await _offload(_cnc_dxf, req)
 
-    gltf_json["materials"] = materials
 
-    # 2. Split monolithic mesh into individual part meshes
-    meshes = gltf_json.get("meshes", [])
-    if not meshes:
-        return
+def _cnc_dxf(req):
+    try:
+        artifact = _cnc_dxf_artifact(req)
+        if artifact is None:
+            return JSONResponse({"error": "No parts to nest"}, status_code=400)
+        return _artifact_response(artifact)
 
-    original_primitives = meshes[0].get("primitives", [])
-    new_meshes = []
-    new_nodes = []
-    
-    prim_idx = 0
-    mat_idx = 0
-    part_idx = 0
-    
-    total_faces = sum(part_face_counts)
-    print(f"[API] GLTF Primitives: {len(original_primitives)}, Expected Faces: {total_faces}")
-    if len(original_primitives) != total_faces:
-        print("[API] WARNING: Primitive count mismatch! Parts will be grouped incorrectly.")
-    
-    for cat_name, count in category_counts:
-        for _ in range(count):
-            face_count = part_face_counts[part_idx]
-            part_prims = original_primitives[prim_idx : prim_idx + face_count]
-            
-            for prim in part_prims:
-                prim["material"] = mat_idx
-                
-            new_meshes.append({"primitives": part_prims, "name": f"mesh_{part_idx}"})
-            new_nodes.append({"mesh": part_idx, "name": f"part_{part_idx}"})
-            
-            prim_idx += face_count
-            part_idx += 1
-            
-        mat_idx += 1
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
 
-    gltf_json["meshes"] = new_meshes
-    gltf_json["nodes"] = new_nodes
-    
-    if "scenes" in gltf_json and len(gltf_json["scenes"]) > 0:
-        gltf_json["scenes"][0]["nodes"] = list(range(len(new_nodes)))
 
+def _cnc_dxf_artifact(req, progress=_no_progress):
+    """Scarf-split, nest and write the multi-sheet DXF. Returns None if nothing is nestable."""
+    _structural_elements(req.config.dict())  # builds (and reports) the geometry stages first
 
-def pack_glb(gltf_path, category_counts=None, part_face_counts=None):
-    """Read .gltf + .bin → self-contained GLB bytes.
+    progress("scarf_split")
+    groups, stock = _nest_groups(req)
+    if not groups:
+        return None
 
-    Args:
-        gltf_path: path to the .gltf file
-        category_counts: optional list of (name, count) for material injection
-        part_face_counts: optional list of face counts to map flat primitives back to parts
-    """
-    with open(gltf_path, "r") as f:
-        gltf_json = json.load(f)
-
-    bin_path = gltf_path.rsplit(".", 1)[0] + ".bin"
-    bin_data = b""
-    if os.path.exists(bin_path):
-        with open(bin_path, "rb") as f:
-            bin_data = f.read()
-        if "buffers" in gltf_json:
-            for buf in gltf_json["buffers"]:
-                if "uri" in buf:
-                    del buf["uri"]
-                buf["byteLength"] = len(bin_data)
-
-    # Inject materials from scratch if counts are provided
-    if category_counts and part_face_counts:
-        _inject_materials_into_gltf(gltf_json, category_counts, part_face_counts)
-
-    json_bytes = json.dumps(gltf_json, separators=(",", ":")).encode("utf-8")
-    json_padding = (4 - len(json_bytes) % 4) % 4
-    json_bytes += b" " * json_padding
-
-    bin_padding = (4 - len(bin_data) % 4) % 4
-    bin_data += b"\x00" * bin_padding
-
-    total_length = 12 + 8 + len(json_bytes) + 8 + len(bin_data)
-
-    glb = bytearray()
-    glb += struct.pack("<I", 0x46546C67)
-    glb += struct.pack("<I", 2)
-    glb += struct.pack("<I", total_length)
-    glb += struct.pack("<I", len(json_bytes))
-    glb += struct.pack("<I", 0x4E4F534A)
-    glb += json_bytes
-    glb += struct.pack("<I", len(bin_data))
-    glb += struct.pack("<I", 0x004E4942)
-    glb += bin_data
-
-    return bytes(glb)
+    progress("nesting")
+    result = _search_layout(req, groups, stock)
+
+    progress("dxf_write")
+    content = nested_dxf(result, req.sheet_width, req.sheet_height)
+    return JobArtifact(content, "application/dxf", "staircase_nested_structural.dxf")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -366,103 +428,345 @@ async def get_defaults():
     return {"volumetric": PARAM_DEFAULTS, "structural": STRUCT_DEFAULTS}
 
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "geometry": GEOMETRY_CACHE.stats(),
+        "volumetric": VOLUMETRIC_CACHE.stats(),
+        "generate": GENERATE_CACHE.stats(),
+        "build_states": BUILD_STATES.stats(),
+        "nfp": NFP_CACHE.stats(),
+        "compute": COMPUTE_POOL.stats(),
+        "jobs": JOB_STORE.stats(),
+        "coalescing": dict(COALESCE_STATS, in_flight=len(_IN_FLIGHT)),
+    }
+
+
+# ===========================================================================
+# BACKGROUND JOBS
+# ===========================================================================
+# Stage names reported by StageCache ("volumetric", "routing") and by the export
+# pipelines themselves; stages satisfied from cache are reported as skipped.
+CNC_DXF_STAGES = ["volumetric", "routing", "scarf_split", "nesting", "dxf_write"]
+AUTOCAD_STAGES = ["volumetric", "routing", "step_export", "bundle"]
+GENERATE_REFINE_STAGES = ["tessellate"]
+
+
+def _submit_job(kind, key, stages, fn):
+    try:
+        job, deduplicated = JOB_STORE.submit(kind, key, stages, fn)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail="Geometry workers are busy, please retry",
+                            headers={"Retry-After": str(e.retry_after)})
+    status = job.to_dict()
+    status["deduplicated"] = deduplicated
+    status["status_url"] = f"/jobs/{job.id}"
+    return JSONResponse(status, status_code=202)
+
+
+def _cnc_dxf_job(req):
+    def run(progress):
+        artifact = _cnc_dxf_artifact(req, progress)
+        if artifact is None:
+            raise ValueError("No parts to nest")
+        return artifact
+    return run
+
+
+@app.post("/jobs/cnc/export-dxf")
+async def submit_cnc_dxf_job(req: CncNestRequest):
+    """Queue the nested multi-sheet DXF export; poll /jobs/{id} for progress."""
+    _check_nest_search(req)
+    key = config_hash({
+        "geometry": GEOMETRY_CACHE.key_for(req.config.dict()),
+        "categories": sorted(req.categories),
+        "sheet_width": req.sheet_width,
+        "sheet_height": req.sheet_height,
+        "rotation_step": req.rotation_step,
+        "mode": req.mode,
+        "time_budget": req.time_budget,
+        "stock": _stock_dicts(req),
+    }, namespace="job:cnc_dxf")
+    return _submit_job("cnc_dxf", key, CNC_DXF_STAGES, _cnc_dxf_job(req))
+
+
+@app.post("/jobs/export/autocad")
+async def submit_autocad_job(config: StaircaseConfig):
+    """Queue the AutoCAD STEP bundle export; poll /jobs/{id} for progress."""
+    key = config_hash({"geometry": GEOMETRY_CACHE.key_for(config.dict()), "model_type": config.model_type},
+                      namespace="job:autocad")
+    return _submit_job("autocad", key, AUTOCAD_STAGES, lambda progress: _autocad_artifact(config, progress))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    status = job.to_dict()
+    if job.status == "done":
+        status["result_url"] = f"/jobs/{job.id}/result"
+    return status
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return _artifact_response(job.result)
+
+
+def _render_structural(config_dict, lod=DEFAULT_LOD, quantize=False):
+    """Build (or fetch) the structural model and pack it as (glb_bytes, manifest) at the given LOD."""
+    print(f"[API] Building structural model...")
+    elements = _structural_elements(config_dict)
+
+    try:
+        return structural_glb(elements, config_dict, lod, quantize)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _render_volumetric(config_dict, lod=DEFAULT_LOD, quantize=False):
+    """Build (or fetch) the volumetric model and pack it as (glb_bytes, manifest) at the given LOD."""
+    print(f"[API] Building volumetric model...")
+    _, vol_elements = VOLUMETRIC_CACHE.get_or_build(config_dict)
+    if not vol_elements["volumetric"]:
+        raise HTTPException(status_code=500, detail="No geometry produced")
+    stair = vol_elements["volumetric"][0]
+    
+    # The boolean subtraction in the parametric builder might return a ShapeList of multiple disjoint solids
+    try:
+        stair_comp = Compound(stair.solids() if hasattr(stair, 'solids') else stair)
+    except Exception:
+        stair_comp = stair
+        
+    manifest = {"categories": []}
+    glb_bytes = shape_to_glb(stair_comp, name="volumetric", lod=lod, quantize=quantize,
+                             extras={"model_type": "volumetric", "lod": lod, "manifest": manifest})
+    return glb_bytes, manifest
+
+
+def _part_ids(model_type, manifest):
+    """{node name: stable part id}. Ids are the manifest part names (category_N), which
+    survive changes that renumber part_N nodes."""
+    if model_type != "structural":
+        return {"volumetric": "volumetric"}
+    return {f"part_{p['mesh_index']}": p["name"] for cat in manifest["categories"] for p in cat["parts"]}
+
+
+def _render_generate(model_type, config_dict, etag, lod=DEFAULT_LOD, quantize=False):
+    """Build and pack a model, storing {"glb", "manifest", "parts"} in GENERATE_CACHE under its
+    model etag and its part digests in BUILD_STATES."""
+    if model_type == "structural":
+        glb_bytes, manifest = _render_structural(config_dict, lod, quantize)
+    else:
+        glb_bytes, manifest = _render_volumetric(config_dict, lod, quantize)
+
+    ids = _part_ids(model_type, manifest)
+    parts = {ids[name]: digest for name, digest in node_digests(glb_bytes).items() if name in ids}
+    BUILD_STATES.put(etag, parts, 96 * len(parts))
+
+    cached = {"glb": glb_bytes, "manifest": manifest, "parts": parts}
+    GENERATE_CACHE.put(etag, cached, len(glb_bytes))
+    return cached
+
+
+def _encode_generate(model_type, rendered, fmt, encoding, etag):
+    """Serialise a rendered model as raw GLB or the legacy JSON payload, then content-encode it."""
+    if fmt == "glb":
+        body = rendered["glb"]
+    else:
+        payload = {
+            "model_type": model_type,
+            "glb": base64.b64encode(rendered["glb"]).decode("ascii"),
+            "manifest": rendered["manifest"],
+        }
+        if model_type == "structural":
+            payload["styles"] = CATEGORY_STYLE
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    body = _content_encode(body, encoding)
+    GENERATE_CACHE.put(etag, body, len(body))
+    return body
+
+
+def _content_encode(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def _generate_etag(model_type, config_key, fmt=None, encoding="identity", lod=DEFAULT_LOD, quantize=False):
+    """Strong ETag for a /generate model at one LOD and vertex encoding, or one representation
+    of it (format + content-coding).
+
+    It is a pure function of the config, LOD and output format, so it never needs invalidating.
+    """
+    tag = f"{GENERATE_FORMAT_VERSION}-{model_type}-{config_key}-{lod}"
+    if quantize:
+        tag += "-q"
+    if fmt:
+        tag += f"-{fmt}"
+    if encoding != "identity":
+        tag += f"-{encoding}"
+    return f'"{tag}"'
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _negotiate_encoding(accept_encoding):
+    """Pick br (if available) or gzip from an Accept-Encoding header, else identity."""
+    offered = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            offered[coding.strip().lower()] = q
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def _wants_glb(fmt, accept):
+    if fmt:
+        return fmt.lower() == "glb"
+    accept = (accept or "").lower()
+    return "model/gltf-binary" in accept or "application/octet-stream" in accept
+
+
+async def _generate_body(model_type, geometry_cache, config_dict, config_key, fmt, encoding, lod, quantize):
+    """Encoded /generate body for one (format, encoding, LOD, vertex encoding), building and
+    packing only what isn't cached."""
+    etag = _generate_etag(model_type, config_key, fmt, encoding, lod, quantize)
+    body = GENERATE_CACHE.get(etag)
+    if body is None:
+        model_etag = _generate_etag(model_type, config_key, lod=lod, quantize=quantize)
+        rendered = GENERATE_CACHE.get(model_etag)
+        if rendered is None:
+            await _shared_geometry(geometry_cache, config_dict)
+            rendered = await _single_flight(("generate", model_etag), _render_generate,
+                                            model_type, config_dict, model_etag, lod, quantize)
+        body = await _single_flight(("generate", etag), _encode_generate,
+                                    model_type, rendered, fmt, encoding, etag)
+    return body
+
+
+def _refine_job(model_type, config_dict, model_etag, lod, quantize):
+    def run(progress):
+        progress("tessellate")
+        rendered = (GENERATE_CACHE.get(model_etag)
+                    or _render_generate(model_type, config_dict, model_etag, lod, quantize))
+        return JobArtifact(rendered["glb"], "model/gltf-binary")
+    return run
+
+
+def _submit_refinement(model_type, config_dict, config_key, lod, quantize):
+    """Start rendering the model at `lod` in the background; returns the job id, or None if the pool is full."""
+    model_etag = _generate_etag(model_type, config_key, lod=lod, quantize=quantize)
+    try:
+        job, _ = JOB_STORE.submit("generate", model_etag, GENERATE_REFINE_STAGES,
+                                  _refine_job(model_type, config_dict, model_etag, lod, quantize))
+    except PoolSaturated:
+        print(f"[API] Compute pool full, skipping {lod} refinement")
+        return None
+    return job.id
+
+
 @app.post("/generate")
-async def generate_staircase(config: StaircaseConfig):
-    import uuid
+async def generate_staircase(config: StaircaseConfig, format: Optional[str] = None,
+                             lod: Optional[str] = None, progressive: bool = False, quantize: bool = False,
+                             accept: Optional[str] = Header(None),
+                             accept_encoding: Optional[str] = Header(None),
+                             if_none_match: Optional[str] = Header(None)):
+    """Build the model and return it as JSON with a base64 GLB (default), or as the raw
+    GLB with ?format=glb or Accept: model/gltf-binary. The binary GLB carries the manifest
+    and category styles in its root `extras`. Bodies are gzip/br encoded when accepted.
+    ?lod=preview|standard|fabrication picks the tessellation tier (default standard).
+
+    With ?progressive=true and a GLB that isn't cached yet at the requested LOD, the
+    preview tier is returned straight away and the requested tier is rendered as a
+    background job: X-Refine-Job holds its id (fetch /jobs/{id}/result when done) and
+    X-Refine-ETag the ETag the refined model will carry. Node names (part_N) are the
+    same at every tier, so the client can swap geometry node by node.
+
+    ?quantize=true packs vertices with KHR_mesh_quantization (int16 positions, int8
+    normals, cache-optimised order) for a much smaller download.
+    """
+    lod = lod or DEFAULT_LOD
+    if lod not in LOD_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown lod '{lod}', expected one of {', '.join(LOD_TIERS)}")
     try:
         config_dict = config.dict()
         model_type = config_dict.pop("model_type", "volumetric")
 
-        temp_dir = tempfile.gettempdir()
-        gltf_path = os.path.join(temp_dir, f"staircase_output_{uuid.uuid4().hex}.gltf")
-
         if model_type == "structural":
             for key, default_val in STRUCT_DEFAULTS.items():
                 if config_dict.get(key) is None:
                     config_dict[key] = default_val
+            geometry_cache = GEOMETRY_CACHE
+        else:
+            model_type = "volumetric"
+            geometry_cache = VOLUMETRIC_CACHE
+
+        config_key = geometry_cache.key_for(config_dict)
+        fmt = "glb" if _wants_glb(format, accept) else "json"
+        encoding = _negotiate_encoding(accept_encoding)
+        etag = _generate_etag(model_type, config_key, fmt, encoding, lod, quantize)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept, Accept-Encoding",
+                   "X-Config-Key": config_key}
+
+        # The client already holds exactly this model: skip build, pack and transfer
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        body = None
+        if (progressive and fmt == "glb" and lod != "preview" and GENERATE_CACHE.get(etag) is None
+                and GENERATE_CACHE.get(_generate_etag(model_type, config_key, lod=lod, quantize=quantize)) is None):
+            # Preview first: the refinement would hold the mesher while it tessellates
+            preview = await _generate_body(model_type, geometry_cache, config_dict, config_key,
+                                           fmt, encoding, "preview", quantize)
+            job_id = _submit_refinement(model_type, config_dict, config_key, lod, quantize)
+            if job_id is not None:
+                body = preview
+                headers.update({
+                    "ETag": _generate_etag(model_type, config_key, fmt, encoding, "preview", quantize),
+                    "X-Refine-Job": job_id,
+                    "X-Refine-ETag": etag,
+                })
 
-            print(f"[API] Building structural model...")
-            elements = build_structural_staircase(config_dict)
+        if body is None:
+            body = await _generate_body(model_type, geometry_cache, config_dict, config_key,
+                                        fmt, encoding, lod, quantize)
 
-            # Build list of parts and manifest for glTF material post-processing and UI tree
-            all_parts = []
-            manifest_categories = []
-            mesh_index = 0
-            
-            for cat_name in CATEGORY_ORDER:
-                parts = elements.get(cat_name, [])
-                if not parts:
-                    continue
-                
-                category_thicknesses = {
-                    "treads": config_dict.get("tread_thickness", 20.0),
-                    "risers": config_dict.get("riser_thickness", 20.0),
-                    "stringers": config_dict.get("stringer_width", 50.0),
-                    "carriages": config_dict.get("carriage_width", 50.0),
-                    "ribs": config_dict.get("rib_width", 18.0)
-                }
-                
-                cat_manifest = {
-                    "name": cat_name,
-                    "color": CATEGORY_STYLE[cat_name]["color"],
-                    "opacity": CATEGORY_STYLE[cat_name]["opacity"],
-                    "thickness": category_thicknesses.get(cat_name, 0.0),
-                    "parts": []
-                }
-                
-                for i, p in enumerate(parts):
-                    all_parts.append(p)
-                    bbox = p.bounding_box()
-                    cat_manifest["parts"].append({
-                        "name": f"{cat_name}_{i+1}",
-                        "mesh_index": mesh_index,
-                        "volume_mm3": round(p.volume, 2),
-                        "bbox": {
-                            "min": [round(bbox.min.X, 1), round(bbox.min.Y, 1), round(bbox.min.Z, 1)],
-                            "max": [round(bbox.max.X, 1), round(bbox.max.Y, 1), round(bbox.max.Z, 1)],
-                            "size": [round(bbox.size.X, 1), round(bbox.size.Y, 1), round(bbox.size.Z, 1)]
-                        }
-                    })
-                    mesh_index += 1
-                
-                manifest_categories.append(cat_manifest)
-
-            if not all_parts:
-                raise HTTPException(status_code=500, detail="No geometry produced")
-
-            export_gltf(Compound(all_parts), gltf_path)
-
-            # For structural, we track category counts and face counts to inject materials and split meshes
-            # The order in all_parts matches manifest_categories
-            category_counts = [(c["name"], len(c["parts"])) for c in manifest_categories]
-            part_face_counts = [len(p.faces()) for p in all_parts]
-            glb_bytes = pack_glb(gltf_path, category_counts=category_counts, part_face_counts=part_face_counts)
-
-            return JSONResponse({
-                "model_type": "structural",
-                "glb": base64.b64encode(glb_bytes).decode("ascii"),
-                "manifest": {"categories": manifest_categories},
-                "styles": CATEGORY_STYLE,
-            })
-        else:
-            print(f"[API] Building volumetric model...")
-            stair = build_staircase(config_dict)
-            
-            # The boolean subtraction in the parametric builder might return a ShapeList of multiple disjoint solids
-            try:
-                stair_comp = Compound(stair.solids() if hasattr(stair, 'solids') else stair)
-            except Exception:
-                stair_comp = stair
-                
-            export_gltf(stair_comp, gltf_path)
-            glb_bytes = pack_glb(gltf_path)
-
-            return JSONResponse({
-                "model_type": "volumetric",
-                "glb": base64.b64encode(glb_bytes).decode("ascii"),
-                "manifest": {"categories": []},
-            })
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        media_type = "model/gltf-binary" if fmt == "glb" else "application/json"
+        return Response(content=body, media_type=media_type, headers=headers)
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -470,42 +774,83 @@ async def generate_staircase(config: StaircaseConfig):
 
 
 
+def _delta_glb(rendered, base_parts, base, lod):
+    """GLB with only the parts that differ from base_parts; the diff rides in extras["delta"]."""
+    parts = rendered["parts"]
+    added = [pid for pid in parts if pid not in base_parts]
+    replaced = [pid for pid in parts if pid in base_parts and base_parts[pid] != parts[pid]]
+    removed = [pid for pid in base_parts if pid not in parts]
+
+    nodes = {pid: name for name, pid in _part_ids("structural", rendered["manifest"]).items()}
+    extras = {
+        "model_type": "structural",
+        "lod": lod,
+        "manifest": rendered["manifest"],
+        "styles": CATEGORY_STYLE,
+        "delta": {"base": base, "added": added, "removed": removed, "replaced": replaced,
+                  "unchanged": len(parts) - len(added) - len(replaced)},
+    }
+    print(f"[API] Delta from {base[:12]}: +{len(added)} -{len(removed)} ~{len(replaced)}")
+    return subset_glb(rendered["glb"], [nodes[pid] for pid in added + replaced], extras)
+
+
+@app.post("/generate/delta")
+async def generate_delta(config: StaircaseConfig, base: str, lod: Optional[str] = None, quantize: bool = False,
+                         accept_encoding: Optional[str] = Header(None)):
+    """Structural GLB holding only the parts that changed since the model the client holds.
+
+    base is that model's X-Config-Key and must have been rendered recently at the same
+    lod/quantize (409 otherwise; fetch /generate instead). Nodes keep their part_N
+    names in the new model; extras carry the new manifest and the added / removed /
+    replaced part ids (manifest part names) relative to base.
+    """
+    lod = lod or DEFAULT_LOD
+    if lod not in LOD_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown lod '{lod}', expected one of {', '.join(LOD_TIERS)}")
+    base_parts = BUILD_STATES.get(_generate_etag("structural", base, lod=lod, quantize=quantize))
+    if base_parts is None:
+        raise HTTPException(status_code=409, detail="Unknown or expired base build")
+    try:
+        config_dict = config.dict()
+        config_dict.pop("model_type", None)
+        for key, default_val in STRUCT_DEFAULTS.items():
+            if config_dict.get(key) is None:
+                config_dict[key] = default_val
+
+        config_key = GEOMETRY_CACHE.key_for(config_dict)
+        model_etag = _generate_etag("structural", config_key, lod=lod, quantize=quantize)
+        rendered = GENERATE_CACHE.get(model_etag)
+        if rendered is None:
+            await _shared_geometry(GEOMETRY_CACHE, config_dict)
+            rendered = await _single_flight(("generate", model_etag), _render_generate,
+                                            "structural", config_dict, model_etag, lod, quantize)
+
+        encoding = _negotiate_encoding(accept_encoding)
+        body = _content_encode(await _offload(_delta_glb, rendered, base_parts, base, lod), encoding)
+        headers = {"Cache-Control": "no-store", "Vary": "Accept-Encoding", "X-Config-Key": config_key}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="model/gltf-binary", headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/export/bom")
 async def export_bom_csv(config: StaircaseConfig):
     """Generates a Bill of Materials CSV for the staircase."""
-    try:
-        config_dict = config.dict()
-        elements = build_structural_staircase(config_dict)
+    await _shared_geometry(GEOMETRY_CACHE, config.dict())
+    return await _offload(_bom_csv, config)
 
-        manifest_categories = []
-        mesh_index = 0
-        
-        for cat_name in CATEGORY_ORDER:
-            parts = elements.get(cat_name, [])
-            if not parts:
-                continue
-            
-            cat_manifest = {
-                "name": cat_name,
-                "parts": []
-            }
-            
-            for i, p in enumerate(parts):
-                bbox = p.bounding_box()
-                dims = sorted([bbox.size.X, bbox.size.Y, bbox.size.Z], reverse=True)
-                cat_manifest["parts"].append({
-                    "name": f"{cat_name}_{i+1}",
-                    "volume_mm3": p.volume,
-                    "length": dims[0],
-                    "width": dims[1],
-                    "thickness": dims[2]
-                })
-                mesh_index += 1
-            
-            manifest_categories.append(cat_manifest)
 
-        manifest_data = {"categories": manifest_categories}
-        csv_data = generate_csv(manifest_data)
+def _bom_csv(config):
+    try:
+        elements = _structural_elements(config.dict())
+        csv_data = bom_csv(elements, CATEGORY_ORDER)
 
         from fastapi.responses import PlainTextResponse
         return PlainTextResponse(
@@ -522,169 +867,158 @@ async def export_bom_csv(config: StaircaseConfig):
 @app.post("/export/autocad")
 async def export_autocad_bundle(config: StaircaseConfig):
     """Generates a ZIP bundle with per-category STEP files and an AutoLISP import script."""
+    await _shared_geometry(GEOMETRY_CACHE, config.dict())
+    return await _offload(_autocad_bundle, config)
+
+
+def _autocad_bundle(config):
     try:
-        config_dict = config.dict()
-        elements = build_structural_staircase(config_dict)
+        return _artifact_response(_autocad_artifact(config))
 
-        # Create a ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-            manifest_parts = []
+    except Exception as e:
+        print(f"[API] Export Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            # 1. Export STEP files per category
-            for cat_name in CATEGORY_ORDER:
-                parts = elements.get(cat_name, [])
-                if not parts:
-                    continue
 
-                cat_compound = Compound(parts)
-                cat_compound.label = f"SS_{cat_name.upper()}"
-                
-                with tempfile.NamedTemporaryFile(suffix=".step", delete=False) as tmp:
-                    tmp_path = tmp.name
-
-                try:
-                    export_step(cat_compound, tmp_path)
-                    if os.path.getsize(tmp_path) < 100: # Very basic empty-file check
-                        print(f"[API] Warning: {cat_name}.step is suspiciously small.")
-                    zip_file.write(tmp_path, f"{cat_name}.step")
-                    manifest_parts.append(cat_name)
-                    print(f"[API] Packaged: {cat_name}.step")
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
-
-            # Thickness metadata for CNC sheet matching
-            category_thicknesses = {
-                "treads": config_dict.get("tread_thickness", 20.0),
-                "risers": config_dict.get("riser_thickness", 20.0),
-                "stringers": config_dict.get("stringer_width", 50.0),
-                "carriages": config_dict.get("carriage_width", 50.0),
-                "ribs": config_dict.get("rib_width", 18.0)
-            }
-
-            # 2. Generate Manifest JSON
-            manifest_details = []
-            for c in manifest_parts:
-                manifest_details.append({
-                    "name": c,
-                    "thickness": category_thicknesses.get(c, 0.0)
-                })
+def _autocad_artifact(config, progress=_no_progress):
+    """Build the per-category STEP + manifest + AutoLISP ZIP for a config."""
+    config_dict = config.dict()
+    elements = _structural_elements(config_dict)
+
+    # Create a ZIP file in memory
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
+        manifest_parts = []
+
+        # 1. Export STEP files per category
+        progress("step_export")
+        for cat_name, data in step_files(elements, CATEGORY_ORDER):
+            zip_file.writestr(f"{cat_name}.step", data)
+            manifest_parts.append(cat_name)
+
+        # Thickness metadata for CNC sheet matching
+        category_thicknesses = {
+            "treads": config_dict.get("tread_thickness", 20.0),
+            "risers": config_dict.get("riser_thickness", 20.0),
+            "stringers": config_dict.get("stringer_width", 50.0),
+            "carriages": config_dict.get("carriage_width", 50.0),
+            "ribs": config_dict.get("rib_width", 18.0)
+        }
 
-            manifest = {
-                "categories": manifest_details,
-                "config": config_dict
-            }
-            zip_file.writestr("manifest.json", json.dumps(manifest, indent=2))
+        # 2. Generate Manifest JSON
+        progress("bundle")
+        manifest_details = []
+        for c in manifest_parts:
+            manifest_details.append({
+                "name": c,
+                "thickness": category_thicknesses.get(c, 0.0)
+            })
 
-            # 3. Generate AutoLISP Script
-            ACAD_COLORS = {
-                "treads": "32", "risers": "34", "stringers": "42",
-                "carriages": "44", "balusters": "52", "handrail": "40", "plaster": "9"
-            }
-
-            lisp_lines = [
-                ";; import_staircase.lsp - Auto-generated by Staircase Studio",
-                "(defun import-sync (fpath layer color / startent ss count limit oldfd doc nextent ss2 i ent)",
-                '  (princ (strcat "\\n>> STARTING IMPORT: " fpath))',
-                '  (setq doc (vla-get-ActiveDocument (vlax-get-acad-object)))',
-                '  (setq startent (entlast))',
-                '  (setq oldfd (getvar "FILEDIA"))',
-                '  (setvar "FILEDIA" 0)',
-                '  ',
-                '  ;; Create layer via ActiveX to ensure it exists before import',
-                '  (vla-put-color (vla-add (vla-get-layers doc) layer) (atoi color))',
-                '  ',
-                '  ;; Use command version 2 for synchronous Import/Stepin',
-                '  (if (getcname "STEPIN")',
-                '    (progn (initcommandversion 2) (vl-cmdf "._STEPIN" fpath))',
-                '    (progn (initcommandversion 2) (vl-cmdf "._IMPORT" fpath))',
-                '  )',
-                '  ',
-                '  ;; Wait for database change (watchdog)',
-                '  (setq count 0 limit 5000)',
-                "  (while (and (equal startent (entlast)) (< count limit))",
-                "    (setq count (1+ count))",
-                "    (if (= 0 (rem count 1000)) (princ \".\"))",
-                "  )",
-                '  (setvar "FILEDIA" oldfd)',
-                '  ',
-                '  ;; Collect imported objects',
-                '  (setq ss (ssadd))',
-                '  (setq nextent (if startent (entnext startent) (entnext)))',
-                '  (while nextent',
-                '    (ssadd nextent ss)',
-                '    (setq nextent (entnext nextent))',
-                '  )',
-                '  ',
-                '  (if (> (sslength ss) 0)',
-                '    (progn',
-                '      ;; Explode Block References to break 3D link and release ByLayer properties',
-                '      (setq i 0)',
-                '      (while (< i (sslength ss))',
-                '        (setq ent (ssname ss i))',
-                '        (if (= "INSERT" (cdr (assoc 0 (entget ent))))',
-                '          (vl-cmdf "._EXPLODE" ent)',
-                '        )',
-                '        (setq i (1+ i))',
-                '      )',
-                '      ',
-                '      ;; Re-collect resulting baseline entities (e.g. 3D solids)',
-                '      (setq ss2 (ssadd))',
-                '      (setq nextent (if startent (entnext startent) (entnext)))',
-                '      (while nextent',
-                '        (ssadd nextent ss2)',
-                '        (vla-put-layer (vlax-ename->vla-object nextent) layer)',
-                '        (vla-put-color (vlax-ename->vla-object nextent) 256) ;; ByLayer',
-                '        (setq nextent (entnext nextent))',
-                '      )',
-                '      (princ (strcat "\\nSuccess: Layered " (itoa (sslength ss2)) " objects."))',
-                '    )',
-                '    (princ "\\nWarning: No geometry was imported for this category.")',
-                '  )',
-                ")",
-                "",
-                "(defun C:IMPORT-STAIRCASE (/ fpath folder)",
-                '  (vl-load-com)',
-                '  (setvar "CMDECHO" 0)',
-                '  (setq fpath (getfiled "Select any STEP file from the extracted staircase bundle" "" "step" 8))',
-                "  (if fpath",
-                "    (progn",
-                "      (setq folder (vl-filename-directory fpath))",
-                '      (setq folder (strcat folder "\\\\"))'
-            ]
-
-            for cat in manifest_parts:
-                lisp_lines.append(
-                    f'      (import-sync (strcat folder "{cat}.step") "SS-{cat.upper()}" "{ACAD_COLORS.get(cat, "7")}")'  
-                )
-
-            lisp_lines.extend([
-                '      (vla-regen (vla-get-ActiveDocument (vlax-get-acad-object)) acActiveViewport)',
-                '      (princ "\\n--- Staircase import complete ---")',
-                "    )",
-                '    (princ "\\nImport cancelled.")',
-                "  )",
-                '  (setvar "CMDECHO" 1)',
-                "  (princ)",
-                ")",
-                '(princ "\\n>> Staircase Studio LISP Loaded.")',
-                '(princ "\\n>> Type \\"IMPORT-STAIRCASE\\" to begin.")',
-                '(princ)'
-            ])
-            zip_file.writestr("import_staircase.lsp", "\n".join(lisp_lines))
+        manifest = {
+            "categories": manifest_details,
+            "config": config_dict
+        }
+        zip_file.writestr("manifest.json", json.dumps(manifest, indent=2))
 
-        zip_buffer.seek(0)
-        filename = f"staircase_autocad_{config.model_type}.zip"
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/x-zip-compressed",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+        # 3. Generate AutoLISP Script
+        ACAD_COLORS = {
+            "treads": "32", "risers": "34", "stringers": "42",
+            "carriages": "44", "balusters": "52", "handrail": "40", "plaster": "9"
+        }
 
-    except Exception as e:
-        print(f"[API] Export Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        lisp_lines = [
+            ";; import_staircase.lsp - Auto-generated by Staircase Studio",
+            "(defun import-sync (fpath layer color / startent ss count limit oldfd doc nextent ss2 i ent)",
+            '  (princ (strcat "\\n>> STARTING IMPORT: " fpath))',
+            '  (setq doc (vla-get-ActiveDocument (vlax-get-acad-object)))',
+            '  (setq startent (entlast))',
+            '  (setq oldfd (getvar "FILEDIA"))',
+            '  (setvar "FILEDIA" 0)',
+            '  ',
+            '  ;; Create layer via ActiveX to ensure it exists before import',
+            '  (vla-put-color (vla-add (vla-get-layers doc) layer) (atoi color))',
+            '  ',
+            '  ;; Use command version 2 for synchronous Import/Stepin',
+            '  (if (getcname "STEPIN")',
+            '    (progn (initcommandversion 2) (vl-cmdf "._STEPIN" fpath))',
+            '    (progn (initcommandversion 2) (vl-cmdf "._IMPORT" fpath))',
+            '  )',
+            '  ',
+            '  ;; Wait for database change (watchdog)',
+            '  (setq count 0 limit 5000)',
+            "  (while (and (equal startent (entlast)) (< count limit))",
+            "    (setq count (1+ count))",
+            "    (if (= 0 (rem count 1000)) (princ \".\"))",
+            "  )",
+            '  (setvar "FILEDIA" oldfd)',
+            '  ',
+            '  ;; Collect imported objects',
+            '  (setq ss (ssadd))',
+            '  (setq nextent (if startent (entnext startent) (entnext)))',
+            '  (while nextent',
+            '    (ssadd nextent ss)',
+            '    (setq nextent (entnext nextent))',
+            '  )',
+            '  ',
+            '  (if (> (sslength ss) 0)',
+            '    (progn',
+            '      ;; Explode Block References to break 3D link and release ByLayer properties',
+            '      (setq i 0)',
+            '      (while (< i (sslength ss))',
+            '        (setq ent (ssname ss i))',
+            '        (if (= "INSERT" (cdr (assoc 0 (entget ent))))',
+            '          (vl-cmdf "._EXPLODE" ent)',
+            '        )',
+            '        (setq i (1+ i))',
+            '      )',
+            '      ',
+            '      ;; Re-collect resulting baseline entities (e.g. 3D solids)',
+            '      (setq ss2 (ssadd))',
+            '      (setq nextent (if startent (entnext startent) (entnext)))',
+            '      (while nextent',
+            '        (ssadd nextent ss2)',
+            '        (vla-put-layer (vlax-ename->vla-object nextent) layer)',
+            '        (vla-put-color (vlax-ename->vla-object nextent) 256) ;; ByLayer',
+            '        (setq nextent (entnext nextent))',
+            '      )',
+            '      (princ (strcat "\\nSuccess: Layered " (itoa (sslength ss2)) " objects."))',
+            '    )',
+            '    (princ "\\nWarning: No geometry was imported for this category.")',
+            '  )',
+            ")",
+            "",
+            "(defun C:IMPORT-STAIRCASE (/ fpath folder)",
+            '  (vl-load-com)',
+            '  (setvar "CMDECHO" 0)',
+            '  (setq fpath (getfiled "Select any STEP file from the extracted staircase bundle" "" "step" 8))',
+            "  (if fpath",
+            "    (progn",
+            "      (setq folder (vl-filename-directory fpath))",
+            '      (setq folder (strcat folder "\\\\"))'
+        ]
+
+        for cat in manifest_parts:
+            lisp_lines.append(
+                f'      (import-sync (strcat folder "{cat}.step") "SS-{cat.upper()}" "{ACAD_COLORS.get(cat, "7")}")'  
+            )
+
+        lisp_lines.extend([
+            '      (vla-regen (vla-get-ActiveDocument (vlax-get-acad-object)) acActiveViewport)',
+            '      (princ "\\n--- Staircase import complete ---")',
+            "    )",
+            '    (princ "\\nImport cancelled.")',
+            "  )",
+            '  (setvar "CMDECHO" 1)',
+            "  (princ)",
+            ")",
+            '(princ "\\n>> Staircase Studio LISP Loaded.")',
+            '(princ "\\n>> Type \\"IMPORT-STAIRCASE\\" to begin.")',
+            '(princ)'
+        ])
+        zip_file.writestr("import_staircase.lsp", "\n".join(lisp_lines))
+
+    filename = f"staircase_autocad_{config.model_type}.zip"
+    return JobArtifact(zip_buffer.getvalue(), "application/x-zip-compressed", filename)
 
 
 @app.post("/export/dxf")
@@ -692,62 +1026,20 @@ async def export_dxf_file(config: StaircaseConfig):
     """Generates a DXF file with 2D profiles and labels for all structural parts.
     Uses the robust Edge Trace logic to match manufacturing layouts.
     """
+    await _shared_geometry(GEOMETRY_CACHE, config.dict())
+    return await _offload(_profiles_dxf, config)
+
+
+def _profiles_dxf(config):
     try:
         config_dict = config.dict()
-        elements = build_structural_staircase(config_dict)
-        
-        doc = ezdxf.new()
-        doc.layers.add("0_PERIMETER", color=7)
-        doc.layers.add("0_HOLES", color=3)
-        doc.layers.add("0_TEXT", color=1)
-        msp = doc.modelspace()
-        
-        spacing = 1000.0
-        row_size = 5
-        x_offset = 0.0
-        y_offset = 0.0
-        count = 0
-        
-        # Define categories that make sense to export as 2D profiles
-        EXPORT_CATEGORIES = ["treads", "risers", "stringers", "carriages", "ribs"]
-        
-        for cat_name in EXPORT_CATEGORIES:
-            parts = elements.get(cat_name, [])
-            for i, p in enumerate(parts):
-                # Apply 3D Scarf Split for oversized parts in DXF too
-                segments = split_with_scarf_joint(p, 2440.0)
-                
-                for seg_idx, segment in enumerate(segments):
-                    suffix = f"_{chr(65+seg_idx)}" if len(segments) > 1 else ""
-                    # Use the robust Edge Trace engine
-                    prof = extract_2d_profile(segment)
-                    
-                    if prof and prof["points"]:
-                        # Convert points to 2D tuples for ezdxf
-                        path_points = [(px + x_offset, py + y_offset) for px, py in prof["points"]]
-                        path_points.append(path_points[0]) # Close loop
-                        
-                        msp.add_lwpolyline(path_points, dxfattribs={'layer': 'PROFILES'})
-                        
-                        # Add label
-                        label_text = f"{cat_name}_{i+1}{suffix}"
-                        msp.add_text(label_text, dxfattribs={
-                            'layer': 'LABELS',
-                            'height': 50,
-                        }).set_placement((x_offset, y_offset + 50))
-                        
-                        # Increment grid
-                        count += 1
-                        x_offset += spacing
-                        if count % row_size == 0:
-                            x_offset = 0.0
-                            y_offset -= spacing
-
-        dxf_buffer = io.StringIO()
-        doc.write(dxf_buffer)
-        
+        elements = _structural_elements(config_dict)
+
+        # Scarf split at standard sheet length, same segments as the CNC layouts
+        profiles = part_profiles(elements, PROFILE_CATEGORIES, 2440.0, GEOMETRY_CACHE.key_for(config_dict))
+
         return Response(
-            content=dxf_buffer.getvalue(),
+            content=profile_dxf(profiles),
             media_type="application/dxf",
             headers={"Content-Disposition": f"attachment; filename=staircase_profiles_{config.model_type}.dxf"}
         )
@@ -758,6 +1050,215 @@ async def export_dxf_file(config: StaircaseConfig):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _structural_config(config):
+    config_dict = config.dict()
+    config_dict.pop("model_type", None)
+    for key, default_val in STRUCT_DEFAULTS.items():
+        if config_dict.get(key) is None:
+            config_dict[key] = default_val
+    return config_dict
+
+
+def _batch_configs(req):
+    """Validated structural config dicts for a batch: the explicit list, then the grid over base."""
+    configs = [_structural_config(c) for c in req.configs or []]
+    if req.grid:
+        base = (req.base or StaircaseConfig(model_type="structural")).dict()
+        try:
+            configs += [_structural_config(StaircaseConfig(**c)) for c in expand_grid(base, req.grid)]
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid grid: {e}")
+    if not configs:
+        raise HTTPException(status_code=400, detail="Batch needs configs or a grid")
+    if len(configs) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Batch of {len(configs)} exceeds the limit of {MAX_BATCH}")
+    return configs
+
+
+@app.post("/generate/batch")
+async def generate_batch(req: BatchRequest):
+    """Estimate many structural variants (a config list and/or a parameter grid over base).
+
+    Variants build in parallel on the batch process pool and stream back as NDJSON in
+    completion order: a {"type": "batch"} header, one {"type": "result"} line per variant
+    (manifest, volumes, sheet count, timings, optional glb_url) or {"type": "error"},
+    then {"type": "done"}. Each line carries the variant's index in the request.
+    """
+    configs = _batch_configs(req)
+    try:
+        _nest_stock(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stock = _stock_dicts(req)
+    nest_categories = [c for c in req.categories if c in NESTABLE_CATEGORIES]
+    pool = batch_pool()
+    print(f"[API] Batch of {len(configs)} variants")
+
+    async def stream():
+        start = time.time()
+        yield json.dumps({"type": "batch", "count": len(configs)}) + "\n"
+        futures = [pool.submit(estimate, c, CATEGORY_ORDER, nest_categories, req.sheet_width, req.sheet_height, stock)
+                   for c in configs]
+
+        async def outcome(index):
+            try:
+                return index, await asyncio.wrap_future(futures[index]), None
+            except Exception as e:
+                return index, None, e
+
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed([outcome(i) for i in range(len(configs))]):
+                index, result, error = await next_done
+                if error is not None:
+                    failed += 1
+                    print(f"[API] Batch variant {index} failed: {error}")
+                    yield json.dumps({"type": "error", "index": index, "error": str(error)}) + "\n"
+                    continue
+                line = {"type": "result", "index": index, **result}
+                if req.include_glb:
+                    BATCH_CONFIGS.put(result["config_key"], configs[index], 1024)
+                    line["glb_url"] = f"/batch/models/{result['config_key']}.glb"
+                yield json.dumps(line) + "\n"
+        finally:
+            # Client gone or batch over: drop variants that haven't started
+            for future in futures:
+                future.cancel()
+        yield json.dumps({"type": "done", "count": len(configs), "failed": failed,
+                          "seconds": round(time.time() - start, 3)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/batch/models/{config_key}.glb")
+async def batch_model_glb(config_key: str, lod: Optional[str] = None, quantize: bool = False,
+                          accept_encoding: Optional[str] = Header(None),
+                          if_none_match: Optional[str] = Header(None)):
+    """GLB of a variant from an earlier /generate/batch with include_glb (geometry loads from the disk cache)."""
+    config_dict = BATCH_CONFIGS.get(config_key)
+    if config_dict is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch variant")
+    lod = lod or DEFAULT_LOD
+    if lod not in LOD_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown lod '{lod}', expected one of {', '.join(LOD_TIERS)}")
+    try:
+        encoding = _negotiate_encoding(accept_encoding)
+        etag = _generate_etag("structural", config_key, "glb", encoding, lod, quantize)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        body = await _generate_body("structural", GEOMETRY_CACHE, config_dict, config_key,
+                                    "glb", encoding, lod, quantize)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="model/gltf-binary", headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/export/bundle")
+async def export_bundle(req: BundleRequest):
+    """Builds the structural model once and returns the full factory handoff as one ZIP:
+    GLB, BOM CSV, per-category STEP, profile DXF, nested DXF and a manifest.
+    All outputs are derived concurrently from the shared cached geometry.
+    The nested DXF groups parts by material on the request's stock, as /cnc/nest does.
+    """
+    try:
+        stock = _nest_stock(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        config_dict = req.config.dict()
+        config_dict.pop("model_type", None)
+        for key, default_val in STRUCT_DEFAULTS.items():
+            if config_dict.get(key) is None:
+                config_dict[key] = default_val
+
+        await _shared_geometry(GEOMETRY_CACHE, config_dict)
+        geometry_key = GEOMETRY_CACHE.key_for(config_dict)
+        # Off the loop: the entry may have been evicted since, which means a disk load or rebuild
+        elements = await _offload(_structural_elements, config_dict)
+        nest_categories = [c for c in req.categories if c in NESTABLE_CATEGORIES]
+        # The handoff GLB goes to the shop, so it gets the fine tessellation
+        etag = _generate_etag("structural", geometry_key, lod="fabrication")
+
+        def bundle_profiles():
+            # One scarf split + trace pass per (category, split length) the profile and nested DXFs read
+            part_profiles(elements, PROFILE_CATEGORIES, req.sheet_width, geometry_key)
+            for _, cats, split_length in material_splits(nest_categories, stock):
+                part_profiles(elements, cats, split_length, geometry_key)
+
+        def bundle_profile_dxf():
+            return profile_dxf(part_profiles(elements, PROFILE_CATEGORIES, req.sheet_width, geometry_key))
+
+        def bundle_nesting():
+            groups = material_nest_input(elements, nest_categories, stock, geometry_key)
+            if not groups:
+                return None, None
+            result = nest_stock(groups, stock, nfp_cache=NFP_CACHE)
+            return result, nested_dxf(result, req.sheet_width, req.sheet_height)
+
+        async def glb():
+            cached = GENERATE_CACHE.get(etag)
+            if cached is None:
+                cached = await _single_flight(("generate", etag), _render_generate,
+                                              "structural", config_dict, etag, "fabrication")
+            return cached
+
+        async def dxfs():
+            await _offload(bundle_profiles)
+            return await asyncio.gather(_offload(bundle_profile_dxf), _offload(bundle_nesting))
+
+        rendered, bom, steps, (profiles_text, (nesting, nested_text)) = await asyncio.gather(
+            glb(),
+            _offload(bom_csv, elements, CATEGORY_ORDER),
+            _offload(step_files, elements, CATEGORY_ORDER),
+            dxfs(),
+        )
+
+        files = {
+            "staircase.glb": rendered["glb"],
+            "bom.csv": bom,
+            "profiles.dxf": profiles_text,
+        }
+        for cat_name, data in steps:
+            files[f"step/{cat_name}.step"] = data
+        if nested_text is not None:
+            files["nested.dxf"] = nested_text
+
+        manifest = {
+            "geometry_key": geometry_key,
+            "config": config_dict,
+            "parts": rendered["manifest"],
+            "nesting": None if nesting is None else dict(nesting_summary(nesting), categories=nest_categories),
+            "files": sorted(files),
+        }
+
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED, False) as zip_file:
+            for name, data in files.items():
+                zip_file.writestr(name, data)
+            zip_file.writestr("manifest.json", json.dumps(manifest, indent=2))
+        zip_buffer.seek(0)
+        print(f"[API] Bundle {geometry_key}: {len(files) + 1} files")
+
+        return StreamingResponse(
+            zip_buffer,
+            media_type="application/x-zip-compressed",
+            headers={"Content-Disposition": f"attachment; filename=staircase_bundle_{geometry_key[:8]}.zip"},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,379 @@
+"""Batch estimation and headless export for Geometry Studio.
+Builds many staircase variants on a spawn process pool. Every worker goes through
+the shared on-disk BREP cache, so variants already built (by the server or an
+earlier batch) load instead of rebuilding, and the server can pack a variant's
+GLB afterwards without building it again. Each estimate carries the part
+manifest, volumes and the nested sheet count.
+
+The `run` command writes the GLB, per-category STEP, BOM and DXF outputs for every
+row of a JSONL/CSV file into OUT/<row>/, no viewer needed. Each row directory ends
+with a manifest.json stamped with the row's config hash; rows whose manifest still
+matches are skipped, so an interrupted run picks up where it stopped.
+
+Usage:
+    python batch.py run configs.csv --out exports/ [--workers 4] [--formats glb,step,bom,dxf]
+                    [--lod fabrication] [--sheet-width 2440] [--sheet-height 1220]
+                    [--stock stock.json] [--force]
+
+Nesting groups parts by material, as /cnc/nest does; --stock is a JSON file of
+{material: [{width, height, cost, quantity, name}]} overriding the default sheet.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DEFAULT_WORKERS = int(os.environ.get("STUDIO_BATCH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_BATCH = int(os.environ.get("STUDIO_BATCH_MAX", "256"))
+
+EXPORT_FORMATS = ["glb", "step", "bom", "dxf"]
+# Bumped when the files written for a row change, so older exports are redone
+EXPORT_VERSION = "e2"
+# Row columns that name the output directory rather than describe the staircase
+ROW_LABEL_KEYS = ("id", "name")
+MANIFEST_FILE = "manifest.json"
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_WORKER_CACHE = None
+_WORKER_NFP = None
+_WORKER_SEARCH = None
+
+
+def expand_grid(base, grid):
+    """Configs for every combination of grid values ({key: [values]}) applied over base.
+
+    The last key varies fastest, e.g. {"width": [800, 900], "winder_steps": [2, 3]}
+    gives (800, 2), (800, 3), (900, 2), (900, 3).
+    """
+    keys = list(grid)
+    return [dict(base, **dict(zip(keys, values))) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def batch_pool(workers=DEFAULT_WORKERS):
+    """Long-lived batch process pool (spawning re-imports OCCT, so reuse it)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def _geometry_cache():
+    # One per worker process, backed by the same disk cache as the server
+    global _WORKER_CACHE
+    if _WORKER_CACHE is None:
+        from brep_cache import BrepDiskCache
+        from geometry_cache import structural_cache
+        _WORKER_CACHE = structural_cache(BrepDiskCache(namespace="structural"))
+    return _WORKER_CACHE
+
+
+def _nfp_cache():
+    # Per worker too; the disk shards are what the workers (and the server) share
+    global _WORKER_NFP
+    if _WORKER_NFP is None:
+        from polygon_nesting import DEFAULT_NFP_CACHE_DIR, NfpCache
+        _WORKER_NFP = NfpCache(DEFAULT_NFP_CACHE_DIR)
+    return _WORKER_NFP
+
+
+def _search_pool():
+    # Nesting strategies run on one thread per worker: the batch pool is the parallelism
+    global _WORKER_SEARCH
+    if _WORKER_SEARCH is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _WORKER_SEARCH = ThreadPoolExecutor(max_workers=1)
+    return _WORKER_SEARCH
+
+
+def _nest_materials(elements, nest_categories, sheet_width, sheet_height, stock, geometry_key):
+    """(result, part count) of the material-grouped nest, (None, 0) if nothing is nestable."""
+    from exporters import material_nest_input
+    from stock_nesting import nest_stock, stock_lists
+
+    stock = stock_lists(stock, sheet_width, sheet_height)
+    groups = material_nest_input(elements, nest_categories, stock, geometry_key)
+    if not groups:
+        return None, 0
+    result = nest_stock(groups, stock, nfp_cache=_nfp_cache(), pool=_search_pool())
+    return result, sum(len(parts) for parts in groups.values())
+
+
+def summarize(elements, categories):
+    """(manifest, total volume in mm3) for the given categories of built elements."""
+    manifest = []
+    total = 0.0
+    for cat in categories:
+        parts = elements.get(cat, [])
+        if not parts:
+            continue
+        entries = []
+        for i, p in enumerate(parts):
+            size = p.bounding_box().size
+            entries.append({
+                "name": f"{cat}_{i+1}",
+                "volume_mm3": round(p.volume, 2),
+                "size": [round(size.X, 1), round(size.Y, 1), round(size.Z, 1)],
+            })
+        volume = sum(e["volume_mm3"] for e in entries)
+        manifest.append({"name": cat, "count": len(parts), "volume_mm3": round(volume, 2), "parts": entries})
+        total += volume
+    return {"categories": manifest}, round(total, 2)
+
+
+def estimate(config, categories, nest_categories, sheet_width, sheet_height, stock=None):
+    """Worker entry point: build (or load) one structural variant and return its estimate."""
+    from stock_nesting import nesting_summary
+
+    start = time.time()
+    # The batch pool already uses every core; no nested build pool per variant, whatever
+    # the config or STUDIO_BUILD_WORKERS asks for
+    key, elements = _geometry_cache().get_or_build(config, workers=1)
+    built = time.time()
+
+    manifest, volume = summarize(elements, categories)
+    result, parts = _nest_materials(elements, nest_categories, sheet_width, sheet_height, stock, key)
+    nesting = {"sheet_count": 0, "efficiency": 0, "cost": 0, "parts": 0}
+    if result is not None:
+        nesting = dict(nesting_summary(result), parts=parts)
+    finished = time.time()
+
+    return {
+        "config_key": key,
+        "manifest": manifest,
+        "volume_mm3": volume,
+        "nesting": nesting,
+        "timings": {
+            "build_s": round(built - start, 3),
+            "nest_s": round(finished - built, 3),
+            "total_s": round(finished - start, 3),
+        },
+    }
+
+
+def row_config(row):
+    """The staircase config in a CLI row (label columns dropped)."""
+    return {k: v for k, v in row.items() if k not in ROW_LABEL_KEYS}
+
+
+def row_names(rows):
+    """Output directory name per row: its id/name column (made path-safe), else row_NNNN."""
+    names, seen = [], set()
+    for i, row in enumerate(rows):
+        label = next((row[k] for k in ROW_LABEL_KEYS if row.get(k) not in (None, "")), None)
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", str(label)).strip("._") if label is not None else ""
+        name = name or f"row_{i + 1:04d}"
+        if name in seen:
+            name = f"{name}_{i + 1:04d}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def outputs_key(config_key, formats, lod, sheet_width, sheet_height, nest_categories, stock=None):
+    """Digest of everything that decides a row's files: geometry hash plus export options."""
+    payload = json.dumps({
+        "v": EXPORT_VERSION, "config": config_key, "formats": sorted(formats), "lod": lod,
+        "sheet": [float(sheet_width), float(sheet_height)], "nest": list(nest_categories), "stock": stock,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def up_to_date(row_dir, key):
+    """The row's manifest if it was written for `key` and every listed file still exists."""
+    try:
+        with open(os.path.join(row_dir, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("outputs_key") != key:
+        return None
+    if not all(os.path.exists(os.path.join(row_dir, name)) for name in manifest.get("files", [])):
+        return None
+    return manifest
+
+
+def _write(row_dir, name, data):
+    # Write-then-rename so an interrupted row never leaves a truncated file behind
+    path = os.path.join(row_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+    os.replace(tmp, path)
+
+
+def export_row(config, row_dir, key, formats, lod, sheet_width, sheet_height, nest_categories, stock=None):
+    """Worker entry point: build (or load) one structural config and write its files into row_dir.
+
+    manifest.json goes last, so a row only counts as done once all of its files exist.
+    """
+    from exporters import (
+        CATEGORY_ORDER, PROFILE_CATEGORIES, bom_csv, nested_dxf, part_profiles,
+        profile_dxf, step_files, structural_glb,
+    )
+    from stock_nesting import nesting_summary
+
+    start = time.time()
+    config_key, elements = _geometry_cache().get_or_build(config, workers=1)
+    timings = {"build_s": round(time.time() - start, 3)}
+    files = []
+    parts = nesting = None
+
+    def timed(name, fn):
+        t = time.time()
+        fn()
+        timings[f"{name}_s"] = round(time.time() - t, 3)
+
+    def glb():
+        nonlocal parts
+        data, parts = structural_glb(elements, config, lod)
+        _write(row_dir, "staircase.glb", data)
+        files.append("staircase.glb")
+
+    def step():
+        for cat_name, data in step_files(elements, CATEGORY_ORDER):
+            _write(row_dir, f"step/{cat_name}.step", data)
+            files.append(f"step/{cat_name}.step")
+
+    def bom():
+        _write(row_dir, "bom.csv", bom_csv(elements, CATEGORY_ORDER))
+        files.append("bom.csv")
+
+    def dxf():
+        nonlocal nesting
+        _write(row_dir, "profiles.dxf", profile_dxf(part_profiles(elements, PROFILE_CATEGORIES, sheet_width, config_key)))
+        files.append("profiles.dxf")
+        result, _ = _nest_materials(elements, nest_categories, sheet_width, sheet_height, stock, config_key)
+        if result is not None:
+            _write(row_dir, "nested.dxf", nested_dxf(result, sheet_width, sheet_height))
+            files.append("nested.dxf")
+            nesting = nesting_summary(result)
+
+    for name, fn in (("glb", glb), ("step", step), ("bom", bom), ("dxf", dxf)):
+        if name in formats:
+            timed(name, fn)
+    timings["total_s"] = round(time.time() - start, 3)
+
+    manifest = {
+        "outputs_key": key,
+        "config_key": config_key,
+        "config": config,
+        "lod": lod,
+        "parts": parts,
+        "nesting": nesting,
+        "files": sorted(files),
+        "timings": timings,
+    }
+    _write(row_dir, MANIFEST_FILE, json.dumps(manifest, indent=2))
+    return manifest
+
+
+def run_batch(rows, out_dir, formats=EXPORT_FORMATS, workers=DEFAULT_WORKERS, lod="fabrication",
+              sheet_width=2440.0, sheet_height=1220.0, nest_categories=None, force=False, stock=None):
+    """Export every row under out_dir, skipping rows whose outputs are up to date.
+
+    Prints a line per row as it finishes and writes out_dir/report.json (also on
+    interrupt). Returns the report.
+    """
+    from geometry_cache import config_hash
+    from exporters import NESTABLE_CATEGORIES
+    from staircase_structural import BUILDER_VERSION, DEFAULT_CONFIG
+    from stock_nesting import stock_lists
+
+    stock_lists(stock, sheet_width, sheet_height)  # reject a bad stock file before any row starts
+    nest_categories = list(NESTABLE_CATEGORIES if nest_categories is None else nest_categories)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.time()
+    entries = []
+    pending = []
+    for index, (name, row) in enumerate(zip(row_names(rows), rows)):
+        config = row_config(row)
+        entry = {"index": index, "name": name, "status": "pending", "config_key": None, "seconds": None}
+        entries.append(entry)
+        if config.get("model_type", "structural") != "structural":
+            entry.update(status="error", error="only structural rows can be exported")
+            print(f"[{index + 1}/{len(rows)}] {name}: skipped, not a structural config")
+            continue
+        config.pop("model_type", None)
+        entry["config_key"] = config_hash(config, DEFAULT_CONFIG, version=BUILDER_VERSION)
+        key = outputs_key(entry["config_key"], formats, lod, sheet_width, sheet_height, nest_categories, stock)
+        row_dir = os.path.join(out_dir, name)
+        if not force and up_to_date(row_dir, key) is not None:
+            entry["status"] = "up_to_date"
+            print(f"[{index + 1}/{len(rows)}] {name}: up to date")
+            continue
+        pending.append((entry, config, row_dir, key))
+
+    print(f"Exporting {len(pending)} of {len(rows)} rows on {workers} workers")
+    pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = {
+            pool.submit(export_row, config, row_dir, key, formats, lod, sheet_width, sheet_height,
+                        nest_categories, stock): entry
+            for entry, config, row_dir, key in pending
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            entry = futures[future]
+            try:
+                manifest = future.result()
+            except Exception as e:
+                entry.update(status="error", error=str(e))
+                print(f"[{done}/{len(pending)}] {entry['name']}: failed: {e}")
+                continue
+            timings = manifest["timings"]
+            entry.update(status="built", seconds=timings["total_s"], timings=timings, files=manifest["files"])
+            steps = ", ".join(f"{k[:-2]} {v:.2f}s" for k, v in timings.items() if k != "total_s")
+            print(f"[{done}/{len(pending)}] {entry['name']}: {timings['total_s']:.2f}s ({steps})")
+    finally:
+        # On Ctrl-C drop rows that haven't started; finished rows keep their manifests
+        pool.shutdown(wait=True, cancel_futures=True)
+        report = {
+            "rows": entries,
+            "counts": {s: sum(1 for e in entries if e["status"] == s)
+                       for s in ("built", "up_to_date", "error", "pending")},
+            "seconds": round(time.time() - start, 3),
+        }
+        _write(out_dir, "report.json", json.dumps(report, indent=2))
+    print(f"Done in {report['seconds']:.2f}s: {json.dumps(report['counts'])}")
+    return report
+
+
+if __name__ == "__main__":
+    from brep_cache import load_configs
+    from glb_export import LOD_TIERS
+
+    parser = argparse.ArgumentParser(description="Geometry Studio headless batch export")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("configs", help="JSONL/JSON/CSV file of configs; an id or name column names the row's directory")
+    parser.add_argument("--out", required=True, help="Output directory (one subdirectory per row)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS))
+    parser.add_argument("--lod", choices=list(LOD_TIERS), default="fabrication")
+    parser.add_argument("--sheet-width", type=float, default=2440.0)
+    parser.add_argument("--sheet-height", type=float, default=1220.0)
+    parser.add_argument("--stock", help="JSON file of {material: [stock entries]} to nest on")
+    parser.add_argument("--force", action="store_true", help="Rebuild rows even if their outputs are up to date")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = sorted(set(formats) - set(EXPORT_FORMATS))
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(unknown)}")
+    stock = None
+    if args.stock:
+        with open(args.stock, "r") as f:
+            stock = json.load(f)
+    try:
+        report = run_batch(load_configs(args.configs), args.out, formats, args.workers, args.lod,
+                           args.sheet_width, args.sheet_height, force=args.force, stock=stock)
+    except ValueError as e:
+        parser.error(str(e))
+    raise SystemExit(1 if report["counts"]["error"] else 0)
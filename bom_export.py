@@ -2,21 +2,22 @@ import json
 import io
 import csv
 
+# Stock material each category is cut from
+MATERIAL_MAP = {
+    "treads": "20mm Timber",
+    "risers": "20mm Timber",
+    "stringers": "50mm Structural",
+    "carriages": "50mm Structural",
+    "ribs": "18mm Plywood",
+    "plaster": "18mm Plywood",
+}
+
 def generate_csv(manifest_data):
     if isinstance(manifest_data, str):
         data = json.loads(manifest_data)
     else:
         data = manifest_data
 
-    MATERIAL_MAP = {
-        "treads": "20mm Timber",
-        "risers": "20mm Timber",
-        "stringers": "50mm Structural",
-        "carriages": "50mm Structural",
-        "ribs": "18mm Plywood",
-        "plaster": "18mm Plywood",
-    }
-
     output = io.StringIO()
     writer = csv.writer(output)
     
@@ -0,0 +1,292 @@
+"""Persistent on-disk BREP cache for Geometry Studio.
+Serialises built staircase elements per category as OCCT .brep files under a
+config-hash directory, so a restarted server or a second uvicorn worker can load
+finished geometry instead of redoing the volumetric fuse, soffit cut and routing.
+
+Usage:
+    python brep_cache.py prewarm catalogue.jsonl [--cache-dir DIR] [--max-mb 2048]
+    python brep_cache.py stats [--cache-dir DIR]
+    python brep_cache.py clear [--cache-dir DIR]
+"""
+import io
+import os
+import csv
+import json
+import time
+import shutil
+import argparse
+import threading
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "STUDIO_BREP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "brep"))
+DEFAULT_MAX_BYTES = int(os.environ.get("STUDIO_BREP_CACHE_MB", "2048")) * 1024 * 1024
+
+INDEX_FILE = "index.json"
+
+
+def _shape_class(topods):
+    """build123d wrapper class for a raw TopoDS shape."""
+    from build123d import Compound, Solid, Shell, Face, Wire, Edge, Vertex
+    from OCP.TopAbs import TopAbs_ShapeEnum
+
+    return {
+        TopAbs_ShapeEnum.TopAbs_SOLID: Solid,
+        TopAbs_ShapeEnum.TopAbs_SHELL: Shell,
+        TopAbs_ShapeEnum.TopAbs_FACE: Face,
+        TopAbs_ShapeEnum.TopAbs_WIRE: Wire,
+        TopAbs_ShapeEnum.TopAbs_EDGE: Edge,
+        TopAbs_ShapeEnum.TopAbs_VERTEX: Vertex,
+    }.get(topods.ShapeType(), Compound)
+
+
+def pack_shapes(value):
+    """Serialise a shape, or any nesting of lists/tuples/None around shapes, to bytes.
+
+    All shapes are written as one binary BREP compound so located instances that
+    share a TShape stay shared after unpacking. Returns (skeleton, data) where the
+    skeleton mirrors `value` with each shape replaced by its index in the compound.
+    """
+    from OCP.BinTools import BinTools
+    from OCP.BRep import BRep_Builder
+    from OCP.TopoDS import TopoDS_Compound
+
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    count = [0]
+
+    def _walk(v):
+        if v is None:
+            return None
+        if isinstance(v, (list, tuple)):
+            return {"seq": [_walk(x) for x in v], "tuple": isinstance(v, tuple)}
+        builder.Add(compound, v.wrapped)
+        count[0] += 1
+        return {"shape": count[0] - 1}
+
+    skeleton = _walk(value)
+    bio = io.BytesIO()
+    BinTools.Write_s(compound, bio)
+    return skeleton, bio.getvalue()
+
+
+def unpack_shapes(skeleton, data):
+    """Inverse of pack_shapes."""
+    from OCP.BinTools import BinTools
+    from OCP.TopoDS import TopoDS_Shape, TopoDS_Iterator
+
+    compound = TopoDS_Shape()
+    BinTools.Read_s(compound, io.BytesIO(data))
+    shapes = []
+    it = TopoDS_Iterator(compound)
+    while it.More():
+        child = it.Value()
+        shapes.append(_shape_class(child)(child))
+        it.Next()
+
+    def _rebuild(node):
+        if node is None:
+            return None
+        if "shape" in node:
+            return shapes[node["shape"]]
+        items = [_rebuild(x) for x in node["seq"]]
+        return tuple(items) if node["tuple"] else items
+
+    return _rebuild(skeleton)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class BrepDiskCache:
+    """Size-bounded directory of serialised element dicts, one sub-directory per key.
+
+    Layout:  <cache_dir>/<namespace>/<key>/index.json + <category>_<i>.brep
+    The index mtime doubles as the LRU clock: it is touched on every hit and the
+    oldest entries are removed once the namespace exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, namespace="structural"):
+        self.root = os.path.join(cache_dir, namespace)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Load the elements dict for key, or None if it isn't cached (or is unreadable)."""
+        entry = self._entry_dir(key)
+        index_path = os.path.join(entry, INDEX_FILE)
+        if not os.path.exists(index_path):
+            with self._lock:
+                self.misses += 1
+            return None
+        from build123d import import_brep
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            elements = {}
+            for cat, count in index["categories"].items():
+                elements[cat] = [import_brep(os.path.join(entry, f"{cat}_{i}.brep")) for i in range(count)]
+            os.utime(index_path, None)
+        except Exception as e:
+            print(f"[BREP] Discarding unreadable cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            with self._lock:
+                self.misses += 1
+                self.errors += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return elements
+
+    def put(self, key, elements):
+        """Write elements for key. Written to a scratch dir first so readers never see a partial entry."""
+        from build123d import export_brep
+
+        entry = self._entry_dir(key)
+        if os.path.exists(os.path.join(entry, INDEX_FILE)):
+            return
+        scratch = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(scratch, exist_ok=True)
+            index = {"key": key, "created": time.time(), "categories": {}}
+            for cat, parts in elements.items():
+                parts = [p for p in parts if p is not None]
+                for i, p in enumerate(parts):
+                    export_brep(p, os.path.join(scratch, f"{cat}_{i}.brep"))
+                index["categories"][cat] = len(parts)
+            with open(os.path.join(scratch, INDEX_FILE), "w") as f:
+                json.dump(index, f)
+            try:
+                os.rename(scratch, entry)
+            except OSError:
+                # Another worker published the same key first; theirs is equivalent
+                shutil.rmtree(scratch, ignore_errors=True)
+        except Exception as e:
+            print(f"[BREP] Failed to write cache entry {key}: {e}")
+            shutil.rmtree(scratch, ignore_errors=True)
+            with self._lock:
+                self.errors += 1
+            return
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Remove least-recently-used entries (never `keep`) until the namespace fits in max_bytes."""
+        if not os.path.isdir(self.root):
+            return
+        entries = []
+        total = 0
+        for key in os.listdir(self.root):
+            index_path = os.path.join(self.root, key, INDEX_FILE)
+            if not os.path.exists(index_path):
+                continue
+            size = _dir_size(os.path.join(self.root, key))
+            total += size
+            if key != keep:
+                entries.append((os.path.getmtime(index_path), key, size))
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, key, size = entries.pop(0)
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self):
+        count = 0
+        if os.path.isdir(self.root):
+            count = sum(1 for k in os.listdir(self.root)
+                        if os.path.exists(os.path.join(self.root, k, INDEX_FILE)))
+        with self._lock:
+            return {
+                "entries": count,
+                "bytes": _dir_size(self.root) if os.path.isdir(self.root) else 0,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+            }
+
+
+def _csv_value(text):
+    """Number, bool or string for a CSV cell ("true"/"false" are bools)."""
+    lowered = text.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text.strip()
+
+
+def load_configs(path):
+    """Read configs from a JSONL file (one object per line), a JSON list or a CSV with a header row.
+
+    Empty CSV cells are left out so the builder defaults apply.
+    """
+    with open(path, "r", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return [{k: _csv_value(v) for k, v in row.items() if k and v is not None and v.strip()}
+                    for row in csv.DictReader(f)]
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def prewarm(configs, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Build every config through the caches so later requests load from disk."""
+    from geometry_cache import structural_cache, volumetric_cache
+
+    caches = {
+        "structural": structural_cache(BrepDiskCache(cache_dir, max_bytes, "structural")),
+        "volumetric": volumetric_cache(BrepDiskCache(cache_dir, max_bytes, "volumetric")),
+    }
+    for i, config in enumerate(configs):
+        model_type = config.get("model_type", "structural")
+        cache = caches.get(model_type, caches["structural"])
+        start = time.time()
+        key, _ = cache.get_or_build(config)
+        print(f"[{i + 1}/{len(configs)}] {model_type} {key} ready in {time.time() - start:.2f}s")
+    for name, cache in caches.items():
+        print(f"{name}: {json.dumps(cache.disk.stats())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geometry Studio BREP cache")
+    parser.add_argument("command", choices=["prewarm", "stats", "clear"])
+    parser.add_argument("configs", nargs="?", help="JSONL/JSON/CSV file of configs (prewarm only)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    args = parser.parse_args()
+    max_bytes = args.max_mb * 1024 * 1024
+
+    if args.command == "prewarm":
+        if not args.configs:
+            parser.error("prewarm needs a configs file")
+        prewarm(load_configs(args.configs), args.cache_dir, max_bytes)
+    else:
+        for ns in ("structural", "volumetric"):
+            disk = BrepDiskCache(args.cache_dir, max_bytes, ns)
+            if args.command == "clear":
+                disk.clear()
+                print(f"Cleared {disk.root}")
+            else:
+                print(f"{ns}: {json.dumps(disk.stats())}")
@@ -6,6 +6,8 @@ from build123d import *
 import rectpack
 import math
 
+from polygon_nesting import nest_parts_polygon, polygon_area, rotation_steps
+
 def extract_2d_profile(part):
     """
     Robustly extracts the 2D perimeter of a 3D part using tessellation.
@@ -160,14 +162,36 @@ def split_with_scarf_joint(part: Part, sheet_width: float):
     
     return results
 
-def nest_parts_optimized(part_data, sheet_width=2440, sheet_height=1220, spacing=8.0):
-    """Runs multiple packing algorithms and returns the most efficient one."""
-    algos = [
-        rectpack.MaxRectsBaf,
-        rectpack.MaxRectsBl,
-        rectpack.SkylineBl,
-        rectpack.GuillotineBssfLas
-    ]
+def nest_parts_optimized(part_data, sheet_width=2440, sheet_height=1220, spacing=8.0, rotation_step=90,
+                         nfp_cache=None):
+    """True-shape (no-fit polygon) nesting, checked against the bounding-box packers.
+
+    The rectangle layout is only kept if it needs fewer sheets without dropping parts.
+    Efficiencies are real material utilisation in both cases. Pass a shared
+    NfpCache to reuse no-fit polygons across runs.
+    """
+    result = nest_parts_polygon(part_data, sheet_width, sheet_height, spacing, rotation_steps(rotation_step),
+                                nfp_cache)
+    boxes = nest_parts_rectpack(part_data, sheet_width, sheet_height, spacing)
+    placed = sum(len(s["parts"]) for s in result["sheets"].values())
+    boxed = sum(len(s["parts"]) for s in boxes["sheets"].values())
+    if boxes["sheet_count"] and boxes["sheet_count"] < result["sheet_count"] and boxed >= placed:
+        print(f"    [ENGINE] Bounding-box layout uses fewer sheets ({boxes['sheet_count']} vs {result['sheet_count']})")
+        return boxes
+    return result
+
+
+def _part_area(part):
+    outer = part.get("outer") or part["points"]
+    return abs(polygon_area(outer)) - sum(abs(polygon_area(h)) for h in part.get("inner", []) if len(h) >= 3)
+
+
+RECTPACK_ALGOS = ["MaxRectsBaf", "MaxRectsBl", "SkylineBl", "GuillotineBssfLas"]
+
+
+def nest_parts_rectpack(part_data, sheet_width=2440, sheet_height=1220, spacing=8.0, algos=None):
+    """Runs multiple bounding-box packing algorithms (rectpack class names) and returns the most efficient one."""
+    algos = [getattr(rectpack, name) for name in (algos or RECTPACK_ALGOS)]
     best_result = None
     min_sheets = 999
     max_efficiency = -1.0
@@ -186,7 +210,7 @@ def nest_parts_optimized(part_data, sheet_width=2440, sheet_height=1220, spacing
         num_sheets = max([r[0] for r in rects]) + 1 if rects else 0
         
         packed_ids = [r[5] for r in rects]
-        packed_area = sum((p["width"] + spacing) * (p["height"] + spacing) for p in fittable if p["id"] in packed_ids)
+        packed_area = sum(_part_area(p) for p in fittable if p["id"] in packed_ids)
         total_area = num_sheets * sheet_width * sheet_height
         global_efficiency = packed_area / total_area if total_area > 0 else 0
         
@@ -212,7 +236,7 @@ def nest_parts_optimized(part_data, sheet_width=2440, sheet_height=1220, spacing
             # Format output specifically
             formatted_sheets = {}
             for bin_idx, parts in sheets_map.items():
-                sheet_packed_area = sum((p["width"] + spacing) * (p["height"] + spacing) for p in parts)
+                sheet_packed_area = sum(_part_area(p) for p in parts)
                 sheet_eff = (sheet_packed_area / (sheet_width * sheet_height)) * 100
                 formatted_sheets[str(bin_idx)] = {
                     "efficiency": round(sheet_eff, 2),
@@ -221,13 +245,15 @@ def nest_parts_optimized(part_data, sheet_width=2440, sheet_height=1220, spacing
                 
             best_result = {
                 "algo": str(algo), "efficiency": round(global_efficiency * 100, 2),
-                "sheet_count": num_sheets, "sheets": formatted_sheets
+                "sheet_count": num_sheets, "sheets": formatted_sheets,
+                "unplaced": [p["name"] for p in part_data if p["id"] not in packed_ids]
             }
             
     if best_result is None:
         return {
             "algo": "None", "efficiency": 0,
-            "sheet_count": 0, "sheets": {}
+            "sheet_count": 0, "sheets": {},
+            "unplaced": [p["name"] for p in part_data]
         }
         
     return best_result
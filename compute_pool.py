@@ -0,0 +1,109 @@
+"""Bounded compute pool for Geometry Studio's CPU-bound endpoints.
+Geometry builds, exports and nesting run on a fixed set of worker threads so the
+asyncio event loop keeps serving cheap routes ('/', '/defaults') while models build.
+Threads (not processes) so every job shares the in-process geometry caches.
+"""
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = int(os.environ.get("STUDIO_COMPUTE_WORKERS", "2"))
+DEFAULT_MAX_QUEUE = int(os.environ.get("STUDIO_COMPUTE_QUEUE", "8"))
+DEFAULT_TIMEOUT = float(os.environ.get("STUDIO_COMPUTE_TIMEOUT", "120"))
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already holds workers + max_queue jobs."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"compute pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ComputePool:
+    """Thread pool with admission control and per-job timeouts.
+
+    At most `workers` jobs run at once and at most `max_queue` more wait; further
+    submissions are rejected with PoolSaturated instead of piling up. A job that
+    exceeds its timeout raises asyncio.TimeoutError in the caller. The worker thread
+    can't be interrupted, so it finishes in the background and its result still
+    lands in the geometry caches for the client's retry.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geometry")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_seconds = 5.0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up (at least 1)."""
+        with self._lock:
+            waves = max(1, self._pending - self.workers + 1) / self.workers
+            return max(1, int(round(waves * self._avg_seconds)))
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                saturated = True
+            else:
+                self._pending += 1
+                saturated = False
+        if saturated:
+            raise PoolSaturated(self.retry_after())
+
+    def _call(self, fn, args, kwargs):
+        start = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def submit(self, fn, *args, **kwargs):
+        """Admit and start fn(*args, **kwargs); returns a concurrent.futures.Future."""
+        self._admit()
+        try:
+            return self._executor.submit(self._call, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Await fn(*args, **kwargs) on the pool without blocking the event loop."""
+        future = asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        try:
+            # shield: a timeout abandons the wait, not the (uncancellable) job
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "timeout_s": self.timeout,
+                "pending": self._pending,
+                "running": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "avg_seconds": round(self._avg_seconds, 3),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
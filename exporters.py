@@ -0,0 +1,312 @@
+"""Output derivations shared by the Geometry Studio export endpoints.
+Every function works from already-built elements (or the 2D profiles traced from
+them), so a single geometry build can feed the BOM, STEP, profile DXF and nested
+DXF outputs. Scarf splitting and profile tracing are memoised per geometry hash.
+"""
+import io
+import os
+import tempfile
+import ezdxf
+from build123d import Compound, export_step
+
+from bom_export import generate_csv
+from cnc_nesting import extract_2d_profile, split_with_scarf_joint
+from geometry_cache import ArtifactCache
+from glb_export import DEFAULT_LOD, categories_to_glb
+from stock_nesting import material_groups
+from staircase_structural import (
+    C_TREAD, C_RISER, C_STRINGER, C_CARRIAGE, C_PLASTER, C_HANDRAIL,
+    C_BALUSTER, C_WALKLINE,
+)
+
+# Category rendering info (matches display_structural in staircase_structural.py)
+CATEGORY_ORDER = ["treads", "risers", "plaster", "stringers", "carriages", "handrail", "balusters", "walkline"]
+CATEGORY_STYLE = {
+    "treads":    {"color": list(C_TREAD),    "opacity": 0.5},
+    "risers":    {"color": list(C_RISER),    "opacity": 0.5},
+    "plaster":   {"color": list(C_PLASTER),  "opacity": 0.5},
+    "stringers": {"color": list(C_STRINGER), "opacity": 1.0},
+    "carriages": {"color": list(C_CARRIAGE), "opacity": 1.0},
+    "handrail":  {"color": list(C_HANDRAIL), "opacity": 1.0},
+    "balusters": {"color": list(C_BALUSTER), "opacity": 1.0},
+    "walkline":  {"color": list(C_WALKLINE), "opacity": 0.8},
+}
+
+# Categories that can be cut from flat sheet stock
+NESTABLE_CATEGORIES = ["treads", "risers", "stringers", "carriages", "ribs", "plaster"]
+# Categories that make sense to export as 2D profiles
+PROFILE_CATEGORIES = ["treads", "risers", "stringers", "carriages", "ribs"]
+
+# [(name, profile)] per (geometry hash, category, scarf split length)
+PROFILE_CACHE = ArtifactCache(max_entries=512, max_bytes=64 * 1024 * 1024)
+
+
+def _profiles_bytes(profiles):
+    return sum(64 + 16 * len(p["points"]) for _, p in profiles if p)
+
+
+def category_profiles(elements, category, sheet_width, geometry_key=None):
+    """Scarf-split every part in a category and trace each segment's 2D profile.
+
+    Returns [(name, profile)] in part order; profile is None where tracing failed.
+    Memoised in PROFILE_CACHE when the geometry hash is given.
+    """
+    cache_key = f"{geometry_key}:{category}:{float(sheet_width)}" if geometry_key else None
+    if cache_key:
+        cached = PROFILE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    profiles = []
+    for i, p in enumerate(elements.get(category, [])):
+        # Apply 3D Scarf Split for oversized parts
+        segments = split_with_scarf_joint(p, sheet_width)
+        for seg_idx, segment in enumerate(segments):
+            suffix = f"_{chr(65+seg_idx)}" if len(segments) > 1 else ""
+            profiles.append((f"{category}_{i+1}{suffix}", extract_2d_profile(segment)))
+
+    if cache_key:
+        PROFILE_CACHE.put(cache_key, profiles, _profiles_bytes(profiles))
+    return profiles
+
+
+def part_profiles(elements, categories, sheet_width, geometry_key=None):
+    """[(name, profile)] for every scarf segment in the given categories, in category order."""
+    profiles = []
+    for cat in categories:
+        profiles.extend(category_profiles(elements, cat, sheet_width, geometry_key))
+    return profiles
+
+
+def nest_input(profiles, start=0):
+    """Part dicts for nest_parts_optimized from every usable profile, ids counting from start."""
+    part_data = []
+    for name, prof in profiles:
+        if prof and prof["width"] > 1 and prof["height"] > 1:
+            part_data.append({
+                "id": start + len(part_data),
+                "name": name,
+                "width": prof["width"],
+                "height": prof["height"],
+                "points": prof["points"],
+                "inner": prof.get("inner", []),
+            })
+    return part_data
+
+
+def material_splits(categories, stock):
+    """[(material, categories, scarf split length)]: each material splits at its widest stock."""
+    return [(material, cats, max(s["width"] for s in stock[material]))
+            for material, cats in material_groups(categories).items()]
+
+
+def material_nest_input(elements, categories, stock, geometry_key=None):
+    """{material: part dicts} for the categories, grouped by stock material (stock_nesting.stock_lists).
+
+    Each group is scarf split at the widest stock of its material (material_splits);
+    part ids are unique across groups. Materials with no usable profiles are left out.
+    """
+    groups = {}
+    next_id = 0
+    for material, cats, split_length in material_splits(categories, stock):
+        part_data = nest_input(part_profiles(elements, cats, split_length, geometry_key), start=next_id)
+        if part_data:
+            groups[material] = part_data
+            next_id += len(part_data)
+    return groups
+
+
+def structural_glb(elements, config_dict, lod=DEFAULT_LOD, quantize=False):
+    """(GLB bytes, manifest) for structural elements: node part_N per part in manifest order.
+
+    The manifest (categories, part names, volumes, bboxes) and category styles ride in
+    the GLB's root extras. Raises ValueError if there is nothing to draw.
+    """
+    # Build list of parts and manifest for glTF material post-processing and UI tree
+    all_parts = []
+    manifest_categories = []
+    mesh_index = 0
+    
+    for cat_name in CATEGORY_ORDER:
+        parts = elements.get(cat_name, [])
+        if not parts:
+            continue
+        
+        category_thicknesses = {
+            "treads": config_dict.get("tread_thickness", 20.0),
+            "risers": config_dict.get("riser_thickness", 20.0),
+            "stringers": config_dict.get("stringer_width", 50.0),
+            "carriages": config_dict.get("carriage_width", 50.0),
+            "ribs": config_dict.get("rib_width", 18.0)
+        }
+        
+        cat_manifest = {
+            "name": cat_name,
+            "color": CATEGORY_STYLE[cat_name]["color"],
+            "opacity": CATEGORY_STYLE[cat_name]["opacity"],
+            "thickness": category_thicknesses.get(cat_name, 0.0),
+            "parts": []
+        }
+        
+        for i, p in enumerate(parts):
+            all_parts.append(p)
+            bbox = p.bounding_box()
+            cat_manifest["parts"].append({
+                "name": f"{cat_name}_{i+1}",
+                "mesh_index": mesh_index,
+                "volume_mm3": round(p.volume, 2),
+                "bbox": {
+                    "min": [round(bbox.min.X, 1), round(bbox.min.Y, 1), round(bbox.min.Z, 1)],
+                    "max": [round(bbox.max.X, 1), round(bbox.max.Y, 1), round(bbox.max.Z, 1)],
+                    "size": [round(bbox.size.X, 1), round(bbox.size.Y, 1), round(bbox.size.Z, 1)]
+                }
+            })
+            mesh_index += 1
+        
+        manifest_categories.append(cat_manifest)
+
+    if not all_parts:
+        raise ValueError("No geometry produced")
+
+    # Node part_N / mesh_N follow all_parts order, which matches the manifest mesh_index
+    categories = [(c["name"], elements[c["name"]]) for c in manifest_categories]
+    manifest = {"categories": manifest_categories}
+    extras = {"model_type": "structural", "lod": lod, "manifest": manifest, "styles": CATEGORY_STYLE}
+    glb_bytes = categories_to_glb(categories, CATEGORY_STYLE, lod=lod, extras=extras, quantize=quantize)
+    return glb_bytes, manifest
+
+
+def _new_dxf():
+    doc = ezdxf.new()
+    doc.layers.add("0_PERIMETER", color=7)
+    doc.layers.add("0_HOLES", color=3)
+    doc.layers.add("0_TEXT", color=1)
+    return doc
+
+
+def nested_dxf(result, sheet_width, sheet_height):
+    """Multi-sheet DXF text for a nest_parts_optimized result, sheets stacked in Y.
+
+    Sheets carrying their own "width"/"height" (mixed stock) use it over the given size
+    and are titled with their material and stock.
+    """
+    doc = _new_dxf()
+    msp = doc.modelspace()
+
+    y_offset = 0
+    for _, sheet_data in sorted(result["sheets"].items(), key=lambda item: int(item[0])):
+        width = sheet_data.get("width", sheet_width)
+        height = sheet_data.get("height", sheet_height)
+
+        # Sheet Border
+        msp.add_lwpolyline([
+            (0, y_offset), (width, y_offset),
+            (width, y_offset + height),
+            (0, y_offset + height), (0, y_offset)
+        ], dxfattribs={'layer': 'SHEET_BORDER'})
+        if "material" in sheet_data:
+            msp.add_text(f"{sheet_data['material']} - {sheet_data['stock']}", dxfattribs={
+                'layer': 'LABELS', 'height': 30}).set_placement((0, y_offset + height + 20))
+
+        for p in sheet_data["parts"]:
+            def placed(points):
+                if p["is_rotated"]:
+                    return [(p["x"] + py, y_offset + p["y"] + px) for px, py in points]
+                return [(p["x"] + px, y_offset + p["y"] + py) for px, py in points]
+
+            final_pts = placed(p["points"])
+            if final_pts:
+                final_pts.append(final_pts[0])
+                msp.add_lwpolyline(final_pts, dxfattribs={'layer': 'NESTED_CUTS'})
+                for hole in p.get("inner", []):
+                    hole_pts = placed(hole)
+                    hole_pts.append(hole_pts[0])
+                    msp.add_lwpolyline(hole_pts, dxfattribs={'layer': 'NESTED_HOLES'})
+                msp.add_text(p["name"], dxfattribs={'layer': 'LABELS', 'height': 20}).set_placement((p["x"]+5, y_offset + p["y"]+5))
+        y_offset += height + 100
+
+    dxf_buffer = io.StringIO()
+    doc.write(dxf_buffer)
+    return dxf_buffer.getvalue()
+
+
+def profile_dxf(profiles, spacing=1000.0, row_size=5):
+    """DXF text laying out each profile with its label on a grid."""
+    doc = _new_dxf()
+    msp = doc.modelspace()
+    x_offset = 0.0
+    y_offset = 0.0
+    count = 0
+
+    for name, prof in profiles:
+        if not prof or not prof["points"]:
+            continue
+        path_points = [(px + x_offset, py + y_offset) for px, py in prof["points"]]
+        path_points.append(path_points[0])  # Close loop
+        msp.add_lwpolyline(path_points, dxfattribs={'layer': 'PROFILES'})
+        msp.add_text(name, dxfattribs={
+            'layer': 'LABELS',
+            'height': 50,
+        }).set_placement((x_offset, y_offset + 50))
+
+        count += 1
+        x_offset += spacing
+        if count % row_size == 0:
+            x_offset = 0.0
+            y_offset -= spacing
+
+    dxf_buffer = io.StringIO()
+    doc.write(dxf_buffer)
+    return dxf_buffer.getvalue()
+
+
+def bom_csv(elements, categories):
+    """Bill of Materials CSV text for the given categories."""
+    manifest_categories = []
+    for cat_name in categories:
+        parts = elements.get(cat_name, [])
+        if not parts:
+            continue
+
+        cat_manifest = {"name": cat_name, "parts": []}
+        for i, p in enumerate(parts):
+            bbox = p.bounding_box()
+            dims = sorted([bbox.size.X, bbox.size.Y, bbox.size.Z], reverse=True)
+            cat_manifest["parts"].append({
+                "name": f"{cat_name}_{i+1}",
+                "volume_mm3": p.volume,
+                "length": dims[0],
+                "width": dims[1],
+                "thickness": dims[2]
+            })
+        manifest_categories.append(cat_manifest)
+
+    return generate_csv({"categories": manifest_categories})
+
+
+def step_files(elements, categories):
+    """[(category, STEP bytes)] with one labelled compound per non-empty category."""
+    files = []
+    for cat_name in categories:
+        parts = elements.get(cat_name, [])
+        if not parts:
+            continue
+
+        cat_compound = Compound(parts)
+        cat_compound.label = f"SS_{cat_name.upper()}"
+
+        with tempfile.NamedTemporaryFile(suffix=".step", delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            export_step(cat_compound, tmp_path)
+            with open(tmp_path, "rb") as f:
+                data = f.read()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if len(data) < 100:  # Very basic empty-file check
+            print(f"[EXPORT] Warning: {cat_name}.step is suspiciously small.")
+        files.append((cat_name, data))
+        print(f"[EXPORT] Packaged: {cat_name}.step")
+    return files
@@ -0,0 +1,293 @@
+"""Content-addressed geometry cache for Geometry Studio.
+Memoises build_structural_staircase() results on a canonical hash of the normalised
+config, so preview, BOM and DXF requests for the same design share one OCCT build.
+"""
+import hashlib
+import json
+import threading
+import contextlib
+from collections import OrderedDict
+
+# Keys that travel with a StaircaseConfig but never change the built geometry
+NON_GEOMETRIC_KEYS = {"model_type", "build_workers"}
+
+# Rough per-entity footprint of an in-memory OCCT BRep (TShape + geometry handles)
+_BYTES_PER_FACE = 4096
+_BYTES_PER_EDGE = 1024
+_BYTES_PER_VERTEX = 256
+
+
+def normalize_config(config, defaults, strict=False):
+    """Merge a request config over the builder defaults.
+
+    Missing or None values fall back to the defaults and presentation-only keys are
+    dropped, so the result is both a valid builder input and a stable hash source.
+    With strict=True, keys the builder has no default for are dropped as well.
+    """
+    normalized = dict(defaults)
+    for key, value in config.items():
+        if key in NON_GEOMETRIC_KEYS or value is None:
+            continue
+        if strict and key not in defaults:
+            continue
+        normalized[key] = value
+    return normalized
+
+
+def _canonical_value(value):
+    """Collapse numerically equal values (800, 800.0, 800.0000001) to one representation."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return repr(round(float(value), 6))
+    return value
+
+
+def config_hash(config, defaults=None, namespace="structural", strict=False, version=None):
+    """Return a short, stable hex digest identifying the geometry a config produces.
+
+    version (the builder's BUILDER_VERSION) is hashed in, so keys persisted by an
+    older builder -- on disk, in clients' ETags -- stop matching once it changes.
+    """
+    if defaults is not None:
+        config = normalize_config(config, defaults, strict)
+    canonical = {k: _canonical_value(v) for k, v in config.items() if k not in NON_GEOMETRIC_KEYS}
+    key = {"ns": namespace, "config": canonical}
+    if version is not None:
+        key["version"] = version
+    payload = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def estimate_shape_bytes(shape):
+    """Approximate the resident size of a build123d shape from its topology counts."""
+    try:
+        return (len(shape.faces()) * _BYTES_PER_FACE
+                + len(shape.edges()) * _BYTES_PER_EDGE
+                + len(shape.vertices()) * _BYTES_PER_VERTEX)
+    except Exception:
+        return _BYTES_PER_FACE
+
+
+def estimate_elements_bytes(elements):
+    """Approximate the resident size of a categorised elements dict."""
+    return sum(estimate_shape_bytes(p) for parts in elements.values() for p in parts if p is not None)
+
+
+def estimate_value_bytes(value):
+    """Approximate the resident size of a shape or any nesting of lists/tuples/dicts of shapes."""
+    if value is None:
+        return 0
+    if isinstance(value, dict):
+        return sum(estimate_value_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_value_bytes(v) for v in value)
+    return estimate_shape_bytes(value)
+
+
+class ArtifactCache:
+    """Thread-safe LRU cache bounded by entry count and total (caller-estimated) bytes.
+
+    Entries are evicted least-recently-used first whenever either limit is exceeded.
+    The newest entry is always kept, even if it alone is larger than max_bytes.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        """Membership check that doesn't touch hit/miss counters or LRU order."""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+
+class GeometryCache(ArtifactCache):
+    """ArtifactCache of categorised element dicts keyed on the canonical config hash.
+
+    Sizes are estimated from BRep topology. An optional disk tier (BrepDiskCache) is
+    consulted on a memory miss and filled after every build.
+    """
+
+    def __init__(self, defaults, builder=None, disk=None, max_entries=32,
+                 max_bytes=512 * 1024 * 1024, namespace="structural", strict=False, version=None):
+        super().__init__(max_entries, max_bytes)
+        self.defaults = defaults
+        self.builder = builder
+        self.disk = disk
+        self.namespace = namespace
+        self.strict = strict
+        self.version = version
+
+    def key_for(self, config):
+        return config_hash(config, self.defaults, self.namespace, self.strict, self.version)
+
+    def get(self, key):
+        elements = super().get(key)
+        return _copy_elements(elements) if elements is not None else None
+
+    def put(self, key, elements, size=None):
+        if size is None:
+            size = estimate_elements_bytes(elements)
+        super().put(key, _copy_elements(elements), size)
+
+    def get_or_build(self, config, builder=None, workers=None):
+        """Return (key, elements) for config, building and caching on a miss.
+
+        workers (default: the config's "build_workers") is handed to the builder as a
+        keyword; like every non-geometric key it stays out of the hash.
+        """
+        key = self.key_for(config)
+        elements = self.get(key)
+        if elements is not None:
+            print(f"[CACHE] Geometry hit {key}")
+            return key, elements
+        if self.disk is not None:
+            elements = self.disk.get(key)
+            if elements is not None:
+                print(f"[CACHE] Disk hit {key}")
+                self.put(key, elements)
+                return key, _copy_elements(elements)
+        print(f"[CACHE] Geometry miss {key}, building...")
+        if workers is None:
+            workers = config.get("build_workers")
+        kwargs = {"workers": workers} if workers is not None else {}
+        elements = (builder or self.builder)(normalize_config(config, self.defaults, self.strict), **kwargs)
+        self.put(key, elements)
+        if self.disk is not None:
+            self.disk.put(key, elements)
+        return key, _copy_elements(elements)
+
+    def stats(self):
+        stats = super().stats()
+        stats["disk"] = self.disk.stats() if self.disk is not None else None
+        return stats
+
+
+_observer = threading.local()
+
+
+@contextlib.contextmanager
+def stage_observer(callback):
+    """Call callback(stage_name) as each StageCache stage starts on this thread."""
+    previous = getattr(_observer, "callback", None)
+    _observer.callback = callback
+    try:
+        yield
+    finally:
+        _observer.callback = previous
+
+
+def notify_stage(name):
+    """Report a pipeline stage to the current thread's observer, if any."""
+    callback = getattr(_observer, "callback", None)
+    if callback is not None:
+        callback(name)
+
+
+class StageCache(ArtifactCache):
+    """Memoises individual builder stages on only the config keys each stage reads.
+
+    A stage key hashes the stage name, the values of its declared config keys and the
+    keys of the upstream stages it consumes, so an edit invalidates exactly the stages
+    downstream of the parameters it touches. Stage outputs are shared between builds
+    and must be treated as read-only.
+    """
+
+    def stage_key(self, name, config, keys, deps=()):
+        subset = {k: config.get(k) for k in keys}
+        return config_hash(subset, namespace=f"stage:{name}:{','.join(deps)}")
+
+    def has(self, name, config, keys, deps=()):
+        """True if the stage is cached (does not touch hit/miss counters or LRU order)."""
+        key = self.stage_key(name, config, keys, deps)
+        with self._lock:
+            return key in self._entries
+
+    def run(self, name, config, keys, fn, deps=()):
+        """Return (stage_key, value), calling fn() only if this stage input is new."""
+        key = self.stage_key(name, config, keys, deps)
+        notify_stage(name)
+        entry = self.get(key)
+        if entry is not None:
+            print(f"  [stage] {name}: reused")
+            return key, entry[0]
+        value = fn()
+        # Wrapped so a legitimately empty result (e.g. no plaster) is still a hit
+        self.put(key, (value,), estimate_value_bytes(value))
+        return key, value
+
+
+def _copy_elements(elements):
+    """Shallow-copy the category lists so callers can't reorder the cached entry."""
+    return {cat: list(parts) for cat, parts in elements.items()}
+
+
+def _build_volumetric(config, workers=None):
+    # The volumetric build is a single stage; workers has nothing to parallelise
+    from staircase_parametric import build_staircase
+
+    stair = build_staircase(config)
+    return {"volumetric": [stair] if stair is not None else []}
+
+
+def structural_cache(disk=None, **kwargs):
+    """GeometryCache wired to build_structural_staircase and its defaults."""
+    from staircase_structural import build_structural_staircase, BUILDER_VERSION, DEFAULT_CONFIG
+
+    return GeometryCache(DEFAULT_CONFIG, build_structural_staircase, disk, namespace="structural",
+                         version=BUILDER_VERSION, **kwargs)
+
+
+def volumetric_cache(disk=None, **kwargs):
+    """GeometryCache wired to build_staircase; elements are {"volumetric": [stair]}."""
+    from staircase_parametric import BUILDER_VERSION, DEFAULT_CONFIG
+
+    return GeometryCache(DEFAULT_CONFIG, _build_volumetric, disk, namespace="volumetric", strict=True,
+                         version=BUILDER_VERSION, **kwargs)
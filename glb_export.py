@@ -0,0 +1,628 @@
+"""In-memory GLB writer for Geometry Studio.
+Tessellates build123d shapes with BRepMesh and packs positions, normals and indices
+straight into a glTF 2.0 binary container with NumPy. Nothing touches the disk.
+
+Layout: one material per category, one mesh "mesh_N" with a single primitive per
+part, referenced by node "part_N" in manifest order, all nodes in scene 0. Parts are
+meshed independently, so there is no face-count bookkeeping to map primitives back
+to parts. Parts of a category whose meshes are identical up to a rigid transform
+(balusters, treads of a straight flight) share the first one's mesh, stored about
+its centre of mass; their nodes carry the rotation and translation instead. Coordinates are converted from build123d's Z-up millimetres to glTF's
+Y-up, as export_gltf does.
+
+With quantize=True the vertex data uses KHR_mesh_quantization: positions are
+normalised int16 in a per-part frame (undone by the part node's translation and
+uniform scale), normals normalised int8. Vertices and triangles are reordered for
+the GPU's post-transform cache, which also helps gzip/brotli on the wire.
+"""
+import json
+import struct
+import hashlib
+import threading
+import numpy as np
+
+# Named tessellation tiers. linear: max chord deviation in mm; angular: max angle
+# between adjacent segments in radians. Flat parts mesh identically at every tier;
+# the difference is in the curved parts (handrail sweep, balusters, winder voids).
+LOD_TIERS = {
+    "preview":     {"linear": 1.0,  "angular": 0.5},
+    "standard":    {"linear": 0.2,  "angular": 0.2},
+    "fabrication": {"linear": 0.02, "angular": 0.05},
+}
+DEFAULT_LOD = "standard"
+
+# Meshing runs one pass at a time (OCCT already spreads each pass over its own threads).
+# It works on topology copies, so the cached shapes themselves are never re-triangulated.
+_MESH_LOCK = threading.Lock()
+
+_GLB_MAGIC = 0x46546C67
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+
+_FLOAT = 5126
+_BYTE = 5120
+_SHORT = 5122
+_UNSIGNED_SHORT = 5123
+_UNSIGNED_INT = 5125
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def _to_y_up(points):
+    """Rotate -90 degrees about X: (x, y, z) -> (x, z, -y)."""
+    return np.column_stack((points[:, 0], points[:, 2], -points[:, 1]))
+
+
+def vertex_normals(positions, indices):
+    """Area-weighted per-vertex normals for an indexed triangle list."""
+    tri = positions[indices]
+    face_normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    normals = np.zeros_like(positions)
+    for corner in range(3):
+        np.add.at(normals, indices[:, corner], face_normals)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return (normals / lengths).astype(np.float32)
+
+
+def vertex_cache_order(indices, cache_size=16):
+    """Triangle order for the post-transform vertex cache (Tipsify, Sander et al. 2007).
+
+    Returns a permutation of the rows of indices (T, 3).
+    """
+    flat = indices.reshape(-1)
+    vertex_count = int(flat.max()) + 1 if len(flat) else 0
+    # Vertex -> triangles adjacency (CSR)
+    order = np.argsort(flat, kind="stable")
+    adj_tris = (order // 3).tolist()
+    starts = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertex_count), out=starts[1:])
+    starts = starts.tolist()
+    live = np.diff(starts).tolist()
+    tris = indices.tolist()
+
+    emitted = [False] * len(tris)
+    stamp = [0] * vertex_count
+    dead_end = []
+    result = []
+    time, cursor, fanning = cache_size + 1, 0, 0
+    while fanning >= 0:
+        candidates = []
+        for t in adj_tris[starts[fanning]:starts[fanning + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            result.append(t)
+            for v in tris[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamp[v] > cache_size:
+                    stamp[v] = time
+                    time += 1
+
+        # Next fanning vertex: the cached candidate with the most remaining triangles
+        best, best_priority = -1, -1
+        for v in candidates:
+            if live[v] > 0 and time - stamp[v] + 2 * live[v] <= cache_size:
+                priority = time - stamp[v]
+                if priority > best_priority:
+                    best, best_priority = v, priority
+        if best < 0:
+            while dead_end and best < 0:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    best = v
+            while best < 0 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    best = cursor
+                cursor += 1
+        fanning = best
+    return np.array(result, dtype=np.int64)
+
+
+def optimize_mesh(positions, normals, indices):
+    """Reorder triangles for the vertex cache, then vertices by first use (dropping unused ones)."""
+    indices = indices[vertex_cache_order(indices)]
+    flat = indices.reshape(-1)
+    used, first = np.unique(flat, return_index=True)
+    order = used[np.argsort(first)]
+    remap = np.zeros(len(positions), dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+    return positions[order], normals[order], remap[indices]
+
+
+def quantization_frame(shape):
+    """(centre, scale) mapping a shape's Y-up bounds onto [-1, 1] with one uniform scale.
+
+    Taken from the exact B-rep bounds, not the triangulation, so every LOD of a part
+    shares the same frame and node transform.
+    """
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRepBndLib import BRepBndLib
+
+    box = Bnd_Box()
+    BRepBndLib.Add_s(shape.wrapped, box, False)
+    xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+    corners = _to_y_up(np.array([[xmin, ymin, zmin], [xmax, ymax, zmax]]))
+    lo, hi = corners.min(axis=0), corners.max(axis=0)
+    return (lo + hi) / 2, max(float((hi - lo).max()) / 2, 1e-6)
+
+
+_PROPER_SIGNS = [np.diag(s) for s in ((1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1))]
+
+
+def rigid_frame(shape):
+    """(volume, centre of mass, principal axes as matrix columns) in glTF's Y-up frame."""
+    from OCP.GProp import GProp_GProps
+    from OCP.BRepGProp import BRepGProp
+
+    props = GProp_GProps()
+    BRepGProp.VolumeProperties_s(shape.wrapped, props)
+    c = props.CentreOfMass()
+    principal = props.PrincipalProperties()
+    axes = np.array([[v.X(), v.Y(), v.Z()] for v in (principal.FirstAxisOfInertia(),
+                                                      principal.SecondAxisOfInertia(),
+                                                      principal.ThirdAxisOfInertia())])
+    axes = _to_y_up(axes).T
+    if np.linalg.det(axes) < 0:
+        axes[:, 2] *= -1
+    return props.Mass(), _to_y_up(np.array([[c.X(), c.Y(), c.Z()]]))[0], axes
+
+
+def find_instances(shapes, meshes, tolerance=1e-3):
+    """Match parts whose meshes are identical up to a rigid transform.
+
+    Returns one entry per part: (prototype, rotation, centre), where prototype is the
+    index of the part whose mesh it can reuse (its own index if none), rotation maps the
+    prototype's mesh about its centre of mass onto this part, and centre is this part's
+    centre of mass. None for parts without a mesh or volume. Translated copies are tried
+    first; rotated ones are matched through their principal axes. Every match is
+    verified vertex by vertex, so a part is only ever shared when it looks identical.
+    """
+    instances = [None] * len(shapes)
+    buckets = {}
+    for idx, (shape, arrays) in enumerate(zip(shapes, meshes)):
+        if arrays is None:
+            continue
+        volume, centre, axes = rigid_frame(shape)
+        if volume <= 0:
+            continue
+        positions, _, indices = arrays
+        local = positions - centre
+
+        match = None
+        candidates = buckets.setdefault((len(positions), len(indices), round(volume)), [])
+        for proto, proto_local, proto_indices, proto_axes in candidates:
+            if not np.array_equal(proto_indices, indices):
+                continue
+            rotations = [np.eye(3)] + [axes @ s @ proto_axes.T for s in _PROPER_SIGNS]
+            for rotation in rotations:
+                if np.allclose(proto_local @ rotation.T, local, rtol=0, atol=tolerance):
+                    match = (proto, rotation)
+                    break
+            if match:
+                break
+        if match is None:
+            candidates.append((idx, local, indices, axes))
+            match = (idx, np.eye(3))
+        instances[idx] = (match[0], match[1], centre)
+    return instances
+
+
+def _quaternion(m):
+    """Unit quaternion [x, y, z, w] of a 3x3 rotation matrix."""
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    if trace > 0:
+        s = 2 * np.sqrt(trace + 1)
+        q = [(m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s, s / 4]
+    elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = 2 * np.sqrt(1 + m[0, 0] - m[1, 1] - m[2, 2])
+        q = [s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s, (m[2, 1] - m[1, 2]) / s]
+    elif m[1, 1] > m[2, 2]:
+        s = 2 * np.sqrt(1 + m[1, 1] - m[0, 0] - m[2, 2])
+        q = [(m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s, (m[0, 2] - m[2, 0]) / s]
+    else:
+        s = 2 * np.sqrt(1 + m[2, 2] - m[0, 0] - m[1, 1])
+        q = [(m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4, (m[1, 0] - m[0, 1]) / s]
+    q = np.array(q)
+    return (q / np.linalg.norm(q)).tolist()
+
+
+def lod_tier(lod):
+    """Deflection settings for a tier name; raises ValueError for unknown names."""
+    try:
+        return LOD_TIERS[lod or DEFAULT_LOD]
+    except KeyError:
+        raise ValueError(f"Unknown LOD '{lod}', expected one of {', '.join(LOD_TIERS)}")
+
+
+def mesh_shapes(shapes, lod=DEFAULT_LOD, parallel=True):
+    """Triangulate copies of the shapes in one BRepMesh pass at the given tier.
+
+    Returns the meshed copies (TopoDS shapes, in input order) for part_mesh. The
+    cached shapes are read concurrently by the BOM, STEP and profile exports, so
+    only their topology is copied (geometry stays shared) and the unmeshed copies
+    are triangulated; the originals' faces are never touched. The copy keeps
+    sharing, so prototype faces of located instances are still meshed once. With
+    parallel=True OCCT meshes faces on its own thread pool (outside the GIL).
+    Callers hold _MESH_LOCK for the call.
+    """
+    from OCP.BRepBuilderAPI import BRepBuilderAPI_Copy
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.BRep import BRep_Builder
+    from OCP.TopoDS import TopoDS_Compound, TopoDS_Iterator
+
+    tier = lod_tier(lod)
+
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    for shape in shapes:
+        builder.Add(compound, shape.wrapped)
+    copy = BRepBuilderAPI_Copy(compound, False, False).Shape()
+    BRepMesh_IncrementalMesh(copy, tier["linear"], False, tier["angular"], parallel)
+
+    copies = []
+    it = TopoDS_Iterator(copy)
+    while it.More():
+        copies.append(it.Value())
+        it.Next()
+    return copies
+
+
+def _trsf_matrix(trsf):
+    return np.array([[trsf.Value(r, c) for c in range(1, 5)] for r in range(1, 4)])
+
+
+def part_mesh(shape):
+    """Merge a meshed shape's face triangulations into one indexed triangle list.
+
+    Returns (positions, normals, indices): float32 (N, 3) in glTF's Y-up frame and
+    uint32 (T, 3) wound counter-clockwise, or None if nothing was triangulated.
+    Faces keep their own vertices, so normals stay sharp along B-rep edges.
+    `shape` is a meshed copy returned by mesh_shapes; unmeshed faces are skipped.
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.TopAbs import TopAbs_ShapeEnum, TopAbs_Orientation
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    node_blocks, tri_blocks = [], []
+    offset = 0
+    explorer = TopExp_Explorer(shape, TopAbs_ShapeEnum.TopAbs_FACE)
+    while explorer.More():
+        face = TopoDS.Face_s(explorer.Current())
+        explorer.Next()
+        loc = TopLoc_Location()
+        poly = BRep_Tool.Triangulation_s(face, loc)
+        if poly is None or poly.NbTriangles() == 0:
+            continue
+
+        nodes = np.array([(p.X(), p.Y(), p.Z()) for p in (poly.Node(i) for i in range(1, poly.NbNodes() + 1))])
+        if not loc.IsIdentity():
+            m = _trsf_matrix(loc.Transformation())
+            nodes = nodes @ m[:, :3].T + m[:, 3]
+        tris = np.array([(t.Value(1), t.Value(2), t.Value(3))
+                         for t in (poly.Triangle(i) for i in range(1, poly.NbTriangles() + 1))],
+                        dtype=np.uint32) - 1
+        if face.Orientation() == TopAbs_Orientation.TopAbs_REVERSED:
+            tris = tris[:, [0, 2, 1]]
+
+        node_blocks.append(nodes)
+        tri_blocks.append(tris + offset)
+        offset += len(nodes)
+
+    if not node_blocks:
+        return None
+    positions = _to_y_up(np.concatenate(node_blocks)).astype(np.float32)
+    indices = np.concatenate(tri_blocks)
+    return positions, vertex_normals(positions, indices), indices
+
+
+class GlbWriter:
+    """Accumulates glTF nodes, meshes and materials with one shared binary buffer."""
+
+    def __init__(self, quantize=False):
+        self.quantize = quantize
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "Geometry Studio"},
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": [],
+            "materials": [],
+            "accessors": [],
+            "bufferViews": [],
+        }
+        if quantize:
+            self.gltf["extensionsUsed"] = ["KHR_mesh_quantization"]
+            self.gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
+        self._chunks = []
+        self._length = 0
+
+    def _buffer_view(self, data, target, stride=None):
+        view = {"buffer": 0, "byteOffset": self._length, "byteLength": len(data)}
+        if target:
+            view["target"] = target
+        if stride:
+            view["byteStride"] = stride
+        self.gltf["bufferViews"].append(view)
+        padding = (4 - len(data) % 4) % 4
+        self._chunks.append(data + b"\x00" * padding)
+        self._length += len(data) + padding
+        return len(self.gltf["bufferViews"]) - 1
+
+    def _accessor(self, array, component_type, accessor_type, target, bounds=False, normalized=False):
+        data, stride = array.tobytes(), None
+        if accessor_type == "VEC3" and array.itemsize < 4:
+            # Vertex attributes must start on 4-byte boundaries: pad each element to 4 components
+            padded = np.zeros((array.shape[0], 4), dtype=array.dtype)
+            padded[:, :3] = array
+            data, stride = padded.tobytes(), 4 * array.itemsize
+        accessor = {
+            "bufferView": self._buffer_view(data, target, stride),
+            "componentType": component_type,
+            "count": int(array.shape[0]),
+            "type": accessor_type,
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if bounds:
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def add_material(self, name, color, opacity=1.0):
+        r, g, b = color
+        material = {
+            "name": name,
+            "pbrMetallicRoughness": {
+                "baseColorFactor": [r, g, b, opacity],
+                "metallicFactor": 0.05,
+                "roughnessFactor": 0.65,
+            },
+        }
+        if opacity < 1.0:
+            material["alphaMode"] = "BLEND"
+            material["doubleSided"] = True
+        self.gltf["materials"].append(material)
+        return len(self.gltf["materials"]) - 1
+
+    def primitive(self, positions, normals, indices, material=None, frame=None):
+        """Write one triangle primitive's arrays and return its glTF dict.
+
+        When quantizing, positions are encoded relative to frame = (centre, scale), which
+        the node referencing this mesh must apply (see add_node).
+        """
+        if self.quantize:
+            positions, normals, indices = optimize_mesh(positions, normals, indices)
+            centre, scale = frame
+            q_positions = np.clip(np.round((positions - centre) / scale * 32767), -32767, 32767).astype(np.int16)
+            q_normals = np.clip(np.round(normals * 127), -127, 127).astype(np.int8)
+            attributes = {
+                "POSITION": self._accessor(q_positions, _SHORT, "VEC3", _ARRAY_BUFFER, bounds=True, normalized=True),
+                "NORMAL": self._accessor(q_normals, _BYTE, "VEC3", _ARRAY_BUFFER, normalized=True),
+            }
+        else:
+            attributes = {
+                "POSITION": self._accessor(positions, _FLOAT, "VEC3", _ARRAY_BUFFER, bounds=True),
+                "NORMAL": self._accessor(normals, _FLOAT, "VEC3", _ARRAY_BUFFER),
+            }
+
+        flat = indices.reshape(-1)
+        if positions.shape[0] <= 0xFFFF:
+            index_array, index_type = flat.astype(np.uint16), _UNSIGNED_SHORT
+        else:
+            index_array, index_type = flat.astype(np.uint32), _UNSIGNED_INT
+        prim = {
+            "attributes": attributes,
+            "indices": self._accessor(index_array, index_type, "SCALAR", _ELEMENT_ARRAY_BUFFER),
+            "mode": 4,
+        }
+        if material is not None:
+            prim["material"] = material
+        return prim
+
+    def add_mesh(self, name, primitives):
+        self.gltf["meshes"].append({"name": name, "primitives": primitives})
+        return len(self.gltf["meshes"]) - 1
+
+    def add_node(self, name, mesh=None, frame=None, placement=None):
+        """Add a root node.
+
+        frame = (centre, scale) dequantizes a quantized mesh; placement = (rotation,
+        translation) positions a shared mesh stored about the origin.
+        """
+        node = {"name": name}
+        if mesh is not None:
+            node["mesh"] = mesh
+        rotation, translation = placement if placement is not None else (np.eye(3), np.zeros(3))
+        if frame is not None:
+            centre, scale = frame
+            translation = translation + rotation @ centre
+            node["scale"] = [scale / 32767] * 3
+        if not np.allclose(rotation, np.eye(3)):
+            node["rotation"] = _quaternion(rotation)
+        if frame is not None or placement is not None:
+            node["translation"] = [float(t) for t in translation]
+        self.gltf["nodes"].append(node)
+        index = len(self.gltf["nodes"]) - 1
+        self.gltf["scenes"][0]["nodes"].append(index)
+        return index
+
+    def to_bytes(self):
+        """Serialise to a GLB container (12-byte header, JSON chunk, BIN chunk)."""
+        # glTF forbids empty top-level arrays, and a buffer must hold at least one byte
+        gltf = {k: v for k, v in self.gltf.items() if v != []}
+        bin_data = b"".join(self._chunks)
+        if bin_data:
+            gltf["buffers"] = [{"byteLength": len(bin_data)}]
+
+        json_bytes = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+        json_bytes += b" " * ((4 - len(json_bytes) % 4) % 4)
+
+        chunks = [struct.pack("<II", len(json_bytes), _CHUNK_JSON), json_bytes]
+        if bin_data:
+            chunks += [struct.pack("<II", len(bin_data), _CHUNK_BIN), bin_data]
+        total_length = 12 + sum(len(c) for c in chunks)
+        return b"".join([struct.pack("<III", _GLB_MAGIC, 2, total_length)] + chunks)
+
+
+def _add_part(writer, name, mesh_name, shape, arrays, material=None):
+    # A node without a mesh keeps part_N aligned with the manifest if a part fails to mesh
+    if not arrays:
+        return writer.add_node(name)
+    frame = quantization_frame(shape) if writer.quantize else None
+    mesh = writer.add_mesh(mesh_name, [writer.primitive(*arrays, material, frame=frame)])
+    return writer.add_node(name, mesh, frame=frame)
+
+
+def categories_to_glb(categories, styles, lod=DEFAULT_LOD, extras=None, quantize=False, instance=True):
+    """GLB bytes for [(category, parts)]: material per category, node part_N per part in order.
+
+    With instance=True identical parts within a category share one mesh (see find_instances).
+    extras (JSON-serialisable) is stored as the glTF root `extras`; three.js exposes it as gltf.userData.
+    """
+    writer = GlbWriter(quantize)
+    if extras is not None:
+        writer.gltf["extras"] = extras
+    with _MESH_LOCK:
+        copies = iter(mesh_shapes([p for _, parts in categories for p in parts], lod))
+    meshes = [[part_mesh(next(copies)) for _ in parts] for _, parts in categories]
+
+    part_idx = 0
+    for (cat_name, parts), part_arrays in zip(categories, meshes):
+        style = styles[cat_name]
+        material = writer.add_material(cat_name, style["color"], style["opacity"])
+        instances = find_instances(parts, part_arrays) if instance else [None] * len(parts)
+        shared = {entry[0] for i, entry in enumerate(instances) if entry and entry[0] != i}
+        written = {}
+        for i, (part, arrays, entry) in enumerate(zip(parts, part_arrays, instances)):
+            if entry is None or entry[0] not in shared:
+                _add_part(writer, f"part_{part_idx}", f"mesh_{part_idx}", part, arrays, material)
+            else:
+                proto, rotation, centre = entry
+                if proto not in written:
+                    # Shared meshes are stored about the prototype's centre of mass
+                    positions, normals, indices = part_arrays[proto]
+                    proto_centre = instances[proto][2]
+                    frame = None
+                    if quantize:
+                        q_centre, q_scale = quantization_frame(parts[proto])
+                        frame = (q_centre - proto_centre, q_scale)
+                    local = (positions - proto_centre).astype(np.float32)
+                    prim = writer.primitive(local, normals, indices, material, frame=frame)
+                    written[proto] = (writer.add_mesh(f"mesh_{part_idx}", [prim]), frame)
+                mesh, frame = written[proto]
+                writer.add_node(f"part_{part_idx}", mesh, frame=frame, placement=(rotation, centre))
+            part_idx += 1
+    return writer.to_bytes()
+
+
+def shape_to_glb(shape, name="model", lod=DEFAULT_LOD, extras=None, quantize=False):
+    """GLB bytes for a single shape as one mesh without materials."""
+    writer = GlbWriter(quantize)
+    if extras is not None:
+        writer.gltf["extras"] = extras
+    with _MESH_LOCK:
+        (meshed,) = mesh_shapes([shape], lod)
+    arrays = part_mesh(meshed)
+    _add_part(writer, name, name, shape, arrays)
+    return writer.to_bytes()
+
+
+def read_glb(data):
+    """Split GLB bytes into (gltf dict, binary chunk)."""
+    magic, _, _ = struct.unpack_from("<III", data, 0)
+    if magic != _GLB_MAGIC:
+        raise ValueError("Not a GLB container")
+    json_len, _ = struct.unpack_from("<II", data, 12)
+    gltf = json.loads(data[20:20 + json_len])
+    bin_start = 20 + json_len
+    bin_data = b""
+    if bin_start < len(data):
+        bin_len, _ = struct.unpack_from("<II", data, bin_start)
+        bin_data = data[bin_start + 8:bin_start + 8 + bin_len]
+    return gltf, bin_data
+
+
+def _view_bytes(gltf, bin_data, accessor_index):
+    view = gltf["bufferViews"][gltf["accessors"][accessor_index]["bufferView"]]
+    start = view.get("byteOffset", 0)
+    return view, bin_data[start:start + view["byteLength"]]
+
+
+def node_digests(data):
+    """{node name: digest} of what each node draws: transform, material and vertex data.
+
+    Independent of buffer layout and of which part a shared mesh was written for, so
+    equal digests across two GLBs mean the node renders identically.
+    """
+    gltf, bin_data = read_glb(data)
+    digests = {}
+    for node in gltf.get("nodes", []):
+        h = hashlib.sha1(json.dumps({k: node[k] for k in ("translation", "rotation", "scale") if k in node},
+                                    sort_keys=True).encode("utf-8"))
+        if "mesh" in node:
+            for prim in gltf["meshes"][node["mesh"]]["primitives"]:
+                material = gltf["materials"][prim["material"]] if "material" in prim else None
+                h.update(json.dumps(material, sort_keys=True).encode("utf-8"))
+                accessors = [prim["attributes"][k] for k in sorted(prim["attributes"])] + [prim["indices"]]
+                for index in accessors:
+                    accessor = {k: v for k, v in gltf["accessors"][index].items() if k != "bufferView"}
+                    h.update(json.dumps(accessor, sort_keys=True).encode("utf-8"))
+                    h.update(_view_bytes(gltf, bin_data, index)[1])
+        digests[node["name"]] = h.hexdigest()
+    return digests
+
+
+def subset_glb(data, names, extras=None):
+    """GLB bytes holding only the named root nodes (and the meshes, materials and buffers they use).
+
+    extras replaces the root extras when given.
+    """
+    gltf, bin_data = read_glb(data)
+    writer = GlbWriter("KHR_mesh_quantization" in gltf.get("extensionsUsed", []))
+    extras = gltf.get("extras") if extras is None else extras
+    if extras is not None:
+        writer.gltf["extras"] = extras
+    meshes, materials, accessors = {}, {}, {}
+
+    def copy_accessor(index):
+        if index not in accessors:
+            accessor = dict(gltf["accessors"][index])
+            view, chunk = _view_bytes(gltf, bin_data, index)
+            accessor["bufferView"] = writer._buffer_view(chunk, view.get("target"), view.get("byteStride"))
+            writer.gltf["accessors"].append(accessor)
+            accessors[index] = len(writer.gltf["accessors"]) - 1
+        return accessors[index]
+
+    def copy_mesh(index):
+        if index not in meshes:
+            mesh = gltf["meshes"][index]
+            primitives = []
+            for prim in mesh["primitives"]:
+                prim = dict(prim, attributes={k: copy_accessor(v) for k, v in prim["attributes"].items()},
+                            indices=copy_accessor(prim["indices"]))
+                if "material" in prim:
+                    if prim["material"] not in materials:
+                        writer.gltf["materials"].append(gltf["materials"][prim["material"]])
+                        materials[prim["material"]] = len(writer.gltf["materials"]) - 1
+                    prim["material"] = materials[prim["material"]]
+                primitives.append(prim)
+            meshes[index] = writer.add_mesh(mesh["name"], primitives)
+        return meshes[index]
+
+    wanted = set(names)
+    for node in gltf.get("nodes", []):
+        if node["name"] not in wanted:
+            continue
+        node = dict(node)
+        if "mesh" in node:
+            node["mesh"] = copy_mesh(node["mesh"])
+        writer.gltf["nodes"].append(node)
+        writer.gltf["scenes"][0]["nodes"].append(len(writer.gltf["nodes"]) - 1)
+    return writer.to_bytes()
@@ -0,0 +1,177 @@
+"""Background jobs for long-running Geometry Studio exports.
+A job runs on the compute pool, reports progress by pipeline stage, and keeps its
+finished artifact in memory until the TTL expires. Submitting the same (kind, key)
+while a matching job is in flight or still stored returns that job instead.
+"""
+import os
+import time
+import uuid
+import threading
+import traceback
+
+from geometry_cache import stage_observer
+
+DEFAULT_TTL = float(os.environ.get("STUDIO_JOB_TTL", "900"))
+DEFAULT_MAX_JOBS = int(os.environ.get("STUDIO_JOB_MAX", "256"))
+
+
+class JobArtifact:
+    """Finished job output, served as-is by GET /jobs/{id}/result."""
+
+    def __init__(self, content, media_type, filename=None):
+        self.content = content
+        self.media_type = media_type
+        self.filename = filename
+
+
+class Job:
+    """One submitted job. Stage states: pending, running, done, skipped."""
+
+    def __init__(self, kind, key, stages):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.stages = [{"name": s, "status": "pending", "started": None, "finished": None} for s in stages]
+        self.detail = None
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def advance(self, name):
+        """Mark stage `name` running and everything before it done (or skipped if never started).
+
+        Names that aren't declared stages (e.g. internal builder stages) are recorded
+        as the current detail only.
+        """
+        now = time.time()
+        with self._lock:
+            self.detail = name
+            names = [s["name"] for s in self.stages]
+            if name not in names:
+                return
+            target = names.index(name)
+            for stage in self.stages[:target]:
+                if stage["status"] == "running":
+                    stage["status"], stage["finished"] = "done", now
+                elif stage["status"] == "pending":
+                    stage["status"] = "skipped"
+            current = self.stages[target]
+            if current["status"] == "pending":
+                current["status"], current["started"] = "running", now
+
+    def _finish(self, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            for stage in self.stages:
+                if stage["status"] == "running":
+                    stage["status"], stage["finished"] = ("done" if status == "done" else "failed"), now
+                elif stage["status"] == "pending" and status == "done":
+                    stage["status"] = "skipped"
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = now
+            self.detail = None
+
+    @property
+    def in_flight(self):
+        return self.status in ("queued", "running")
+
+    def progress(self):
+        """Fraction of declared stages that are finished (done or skipped)."""
+        finished = sum(1 for s in self.stages if s["status"] in ("done", "skipped"))
+        return finished / len(self.stages) if self.stages else (1.0 if self.status == "done" else 0.0)
+
+    def to_dict(self):
+        with self._lock:
+            current = next((s["name"] for s in self.stages if s["status"] == "running"), None)
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "stage": current,
+                "detail": self.detail,
+                "progress": round(self.progress(), 3),
+                "stages": [dict(s) for s in self.stages],
+                "error": self.error,
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+
+class JobStore:
+    """Registry of jobs and their results, executed on a compute pool.
+
+    Finished jobs (and their artifacts) are dropped `ttl` seconds after they finish;
+    the oldest finished jobs also go first once more than `max_jobs` are held.
+    """
+
+    def __init__(self, pool, ttl=DEFAULT_TTL, max_jobs=DEFAULT_MAX_JOBS):
+        self.pool = pool
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    def submit(self, kind, key, stages, fn):
+        """Start fn(progress) as a job, or return the live job for (kind, key).
+
+        fn receives the job's advance callback and must return a JobArtifact.
+        Returns (job, deduplicated). Raises the pool's PoolSaturated if it is full.
+        """
+        with self._lock:
+            self._purge()
+            existing = self._jobs.get(self._by_key.get((kind, key)))
+            if existing is not None and existing.status != "error":
+                self.deduplicated += 1
+                return existing, True
+            job = Job(kind, key, stages)
+            self.pool.submit(self._run, job, fn)
+            self._jobs[job.id] = job
+            self._by_key[(kind, key)] = job.id
+        print(f"[JOBS] Queued {kind} job {job.id}")
+        return job, False
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn):
+        job.status = "running"
+        start = time.time()
+        try:
+            with stage_observer(job.advance):
+                artifact = fn(job.advance)
+        except Exception as e:
+            traceback.print_exc()
+            job._finish("error", error=str(e))
+            print(f"[JOBS] {job.kind} job {job.id} failed: {e}")
+            return
+        job._finish("done", result=artifact)
+        print(f"[JOBS] {job.kind} job {job.id} done in {time.time() - start:.2f}s")
+
+    def _purge(self):
+        now = time.time()
+        finished = sorted((j.finished, j.id) for j in self._jobs.values() if not j.in_flight)
+        excess = len(self._jobs) - self.max_jobs
+        for finished_at, job_id in finished:
+            if now - finished_at <= self.ttl and excess <= 0:
+                break
+            job = self._jobs.pop(job_id)
+            if self._by_key.get((job.kind, job.key)) == job_id:
+                del self._by_key[(job.kind, job.key)]
+            excess -= 1
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {"jobs": len(self._jobs), "by_status": statuses,
+                    "ttl_s": self.ttl, "deduplicated": self.deduplicated}
@@ -0,0 +1,244 @@
+"""Parallel nesting search for Geometry Studio.
+Runs many nesting strategies at once on a spawn process pool and keeps the best
+layout found within the caller's time budget: true-shape nesting under several
+placement orders and rotation sets, the rectpack MaxRects/Skyline/Guillotine
+packers, and simulated annealing over the placement order. The area-ordered
+true-shape layout always runs in the calling thread as well, so a result is
+ready even while the pool is still spawning. Workers share NFPs through the
+on-disk NfpCache shards.
+"""
+import os
+import math
+import time
+import random
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from polygon_nesting import (
+    DEFAULT_NFP_CACHE_DIR, NfpCache, layout_score, nest_parts_polygon, rotation_steps, sort_key,
+)
+
+DEFAULT_WORKERS = int(os.environ.get("STUDIO_NEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_TIME_BUDGET = float(os.environ.get("STUDIO_NEST_MAX_BUDGET", "120"))
+# Annealing chains report back (and can be stopped) after at most this many seconds
+ANNEAL_SLICE = 2.0
+# How often a running search checks its stop event
+STOP_POLL = 0.25
+
+ORDERS = ["area", "length", "bbox", "perimeter"]
+MAXRECTS = ["MaxRectsBaf", "MaxRectsBssf", "MaxRectsBlsf", "MaxRectsBl", "SkylineBl", "GuillotineBssfLas"]
+
+# Budget in seconds and the strategies tried, per search mode
+NEST_MODES = {
+    "fast": {
+        "budget": 1.0,
+        "strategies": [("polygon", "length"), ("rectpack", "MaxRectsBaf"), ("rectpack", "MaxRectsBssf"),
+                       ("rectpack", "SkylineBl")],
+    },
+    "thorough": {
+        "budget": 30.0,
+        # One annealing chain starts straight away; the others queue behind the one-shot layouts
+        "strategies": ([("anneal", 0)]
+                       + [("polygon", o) for o in ORDERS[1:]]
+                       + [("rectpack", a) for a in MAXRECTS]
+                       + [("polygon_fine", o) for o in ORDERS]
+                       + [("anneal", seed) for seed in (1, 2)]),
+    },
+}
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_WORKER_NFP = None
+
+
+def nesting_pool(workers=DEFAULT_WORKERS):
+    """Long-lived search process pool (spawning is slow, so reuse it)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def _nfp_cache():
+    global _WORKER_NFP
+    if _WORKER_NFP is None:
+        _WORKER_NFP = NfpCache(DEFAULT_NFP_CACHE_DIR)
+    return _WORKER_NFP
+
+
+def _fine_rotations(rotation_step):
+    # Twice as many rotations as the caller asked for, down to 15 degree steps
+    return rotation_steps(max(15.0, (rotation_step or 360) / 2.0))
+
+
+def anneal(part_data, sheet_width, sheet_height, spacing, rotations, deadline, seed=0, nfp_cache=None,
+           order=None, cooling=None):
+    """Simulated annealing over the placement order until the deadline; returns the best layout.
+
+    Moves swap two parts or move one part to a new position in the order; worse
+    orders are accepted with a probability that falls over the `cooling` window
+    (start, end), which defaults to now until the deadline. Passing the previous
+    result's "order" (and the same window) continues a chain in slices.
+    """
+    rng = random.Random(seed)
+    if order is None:
+        order = [p["id"] for p in sorted(part_data, key=sort_key)]
+        if seed:
+            # Start each extra chain from a lightly shuffled order
+            for _ in range(len(order) // 4):
+                i, j = rng.randrange(len(order)), rng.randrange(len(order))
+                order[i], order[j] = order[j], order[i]
+    order = list(order)
+
+    def evaluate(candidate):
+        return nest_parts_polygon(part_data, sheet_width, sheet_height, spacing, rotations, nfp_cache, candidate)
+
+    best = evaluate(order)
+    best_order = order
+    current_score = best_score = layout_score(best)
+    cool_start, cool_end = cooling or (time.time(), deadline)
+    span = max(cool_end - cool_start, 1e-3)
+    steps = 0
+    while len(order) > 1 and time.time() < deadline:
+        candidate = list(order)
+        i, j = rng.randrange(len(order)), rng.randrange(len(order))
+        if rng.random() < 0.5:
+            candidate[i], candidate[j] = candidate[j], candidate[i]
+        else:
+            candidate.insert(j, candidate.pop(i))
+        result = evaluate(candidate)
+        score = layout_score(result)
+        temperature = 0.3 * max(0.0, 1.0 - (time.time() - cool_start) / span) + 1e-3
+        if score <= current_score or rng.random() < math.exp((current_score - score) / temperature):
+            order, current_score = candidate, score
+            if score < best_score:
+                best, best_order, best_score = result, candidate, score
+        steps += 1
+    return dict(best, algo=f"anneal[{seed}]", anneal_steps=steps, order=best_order)
+
+
+def run_strategy(strategy, part_data, sheet_width, sheet_height, spacing, rotation_step, deadline,
+                 order=None, cooling=None):
+    """Worker entry point: one layout (or one annealing slice) for a (kind, parameter) strategy."""
+    kind, param = strategy
+    start = time.time()
+    if kind == "rectpack":
+        from cnc_nesting import nest_parts_rectpack
+        result = nest_parts_rectpack(part_data, sheet_width, sheet_height, spacing, [param])
+    elif kind == "anneal":
+        result = anneal(part_data, sheet_width, sheet_height, spacing, rotation_steps(rotation_step),
+                        deadline, param, _nfp_cache(), order, cooling)
+    else:
+        rotations = _fine_rotations(rotation_step) if kind == "polygon_fine" else rotation_steps(rotation_step)
+        order = [p["id"] for p in sorted(part_data, key=lambda p: sort_key(p, param))]
+        result = nest_parts_polygon(part_data, sheet_width, sheet_height, spacing, rotations, _nfp_cache(), order)
+        result["algo"] = f"{kind}:{param}"
+    return dict(result, seconds=round(time.time() - start, 3))
+
+
+def _summary(result):
+    return {"algo": result["algo"], "sheet_count": result["sheet_count"], "efficiency": result["efficiency"],
+            "unplaced": len(result.get("unplaced", [])), "seconds": result["seconds"]}
+
+
+def search_budget(mode, time_budget=None):
+    """Seconds a search in `mode` may run; raises ValueError for an unknown mode or bad budget."""
+    if mode not in NEST_MODES:
+        raise ValueError(f"Unknown nesting mode '{mode}', expected one of {', '.join(NEST_MODES)}")
+    budget = float(time_budget if time_budget is not None else NEST_MODES[mode]["budget"])
+    if not 0 < budget <= MAX_TIME_BUDGET:
+        raise ValueError(f"time_budget must be between 0 and {MAX_TIME_BUDGET:g} seconds")
+    return budget
+
+
+def iter_search(part_data, sheet_width=2440, sheet_height=1220, mode="fast", time_budget=None,
+                spacing=8.0, rotation_step=90, nfp_cache=None, pool=None, stop=None):
+    """Anytime nesting search: yields ("layout", result) every time the best layout improves,
+    then ("done", summary) once the budget is spent, every strategy finished or `stop`
+    (a threading.Event) was set.
+
+    The area-ordered true-shape layout runs in this thread (with nfp_cache) and is
+    always the first layout; the other strategies run on the pool. Annealing chains
+    run in ANNEAL_SLICE slices so their improvements surface during the search.
+    """
+    budget = search_budget(mode, time_budget)
+    start = time.time()
+    deadline = start + budget
+    stop = stop or threading.Event()
+    args = (part_data, sheet_width, sheet_height, spacing, rotation_step)
+
+    futures = {}
+
+    def submit(strategy, **kwargs):
+        until = min(deadline, time.time() + ANNEAL_SLICE) if strategy[0] == "anneal" else deadline
+        future = pool.submit(run_strategy, strategy, *args, until, **kwargs)
+        futures[future] = strategy
+        return future
+
+    try:
+        pool = pool or nesting_pool()
+        for strategy in NEST_MODES[mode]["strategies"]:
+            submit(strategy, cooling=(start, deadline) if strategy[0] == "anneal" else None)
+    except Exception as e:
+        # A broken pool shouldn't cost the caller a layout; the baseline still runs
+        print(f"[ENGINE] Nesting pool unavailable: {e}")
+
+    layouts = []
+    best = None
+    reason = "exhausted"
+    try:
+        baseline = nest_parts_polygon(part_data, sheet_width, sheet_height, spacing, rotation_steps(rotation_step),
+                                      nfp_cache)
+        best = dict(baseline, algo="polygon:area", seconds=round(time.time() - start, 3))
+        layouts.append(_summary(best))
+        yield "layout", best
+
+        pending = set(futures)
+        while pending:
+            if stop.is_set():
+                reason = "stopped"
+                break
+            # Past the deadline the zero timeout still collects whatever already finished
+            done, pending = wait(pending, timeout=max(0.0, min(STOP_POLL, deadline - time.time())),
+                                 return_when=FIRST_COMPLETED)
+            if not done and time.time() >= deadline:
+                reason = "budget"
+                break
+            for future in done:
+                strategy = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[ENGINE] Nesting strategy {strategy} failed: {e}")
+                    continue
+                layouts.append(_summary(result))
+                order = result.pop("order", None)
+                if order is not None and time.time() < deadline - 0.05 and not stop.is_set():
+                    # Carry the annealing chain on from its best order for another slice
+                    try:
+                        pending.add(submit(strategy, order=order, cooling=(start, deadline)))
+                    except Exception as e:
+                        print(f"[ENGINE] Nesting strategy {strategy} not resumed: {e}")
+                if layout_score(result) < layout_score(best):
+                    best = result
+                    yield "layout", best
+    finally:
+        # Budget spent, stopped or abandoned: drop strategies that haven't started
+        for future in futures:
+            future.cancel()
+
+    elapsed = time.time() - start
+    print(f"[ENGINE] Nesting search ({mode}, {reason}): {len(layouts)} layouts in {elapsed:.2f}s, "
+          f"best {best['algo']} with {best['sheet_count']} sheets")
+    yield "done", {
+        "mode": mode,
+        "budget_s": budget,
+        "elapsed_s": round(elapsed, 3),
+        "reason": reason,
+        "layouts_run": len(layouts),
+        "strategies_dropped": len(futures),
+        "best": _summary(best),
+        "layouts": sorted(layouts, key=lambda l: (l["unplaced"], l["sheet_count"], -l["efficiency"])),
+    }
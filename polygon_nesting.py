@@ -0,0 +1,662 @@
+"""True-shape sheet nesting for Geometry Studio.
+Places the traced part outlines (extract_2d_profile's "outer"/"inner" polygons)
+with no-fit polygons instead of packing bounding rectangles. Each outline is split
+into convex pieces, so the NFP of two parts is the union of the convex Minkowski
+sums of their pieces and a placement test is a handful of point-in-convex checks.
+Parts go largest first to the bottom-left-most feasible position over every
+allowed rotation, including positions inside the cut-outs of parts already placed.
+Pure Python, so it runs anywhere the API does.
+
+NFPs only depend on the two outlines (as turned) and the spacing, so NfpCache keys
+them on a canonical hash of each outline. Identical treads, repeated stringers and
+configs that share part shapes reuse them, in memory and optionally on disk.
+"""
+import os
+import json
+import math
+import hashlib
+import threading
+
+from geometry_cache import ArtifactCache
+
+DEFAULT_ROTATIONS = (0, 90, 180, 270)
+# Finest rotation step (degrees): each rotation multiplies the NFPs a part needs
+MIN_ROTATION_STEP = 5.0
+# Grid positions tried per axis when looking for room inside a cut-out
+HOLE_GRID = 6
+
+_EPS = 1e-6
+
+DEFAULT_NFP_CACHE_DIR = os.environ.get(
+    "STUDIO_NFP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "nfp"))
+DEFAULT_NFP_CACHE_MAX_BYTES = int(os.environ.get("STUDIO_NFP_CACHE_MB", "256")) * 1024 * 1024
+
+
+def rotation_steps(step):
+    """Rotations (degrees) for a step size, e.g. 90 gives 0, 90, 180, 270.
+    Steps finer than MIN_ROTATION_STEP are clamped to it."""
+    if not step or step <= 0 or step >= 360:
+        return (0,)
+    step = max(float(step), MIN_ROTATION_STEP)
+    return tuple(round(i * step, 6) for i in range(int(math.ceil(360.0 / step - _EPS))))
+
+
+# ---------------------------------------------------------------------------
+# Polygon helpers (polygons are lists of (x, y), counter-clockwise once cleaned)
+# ---------------------------------------------------------------------------
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def polygon_area(points):
+    """Signed shoelace area (positive when counter-clockwise)."""
+    n = len(points)
+    return 0.5 * sum(points[i][0] * points[(i + 1) % n][1] - points[(i + 1) % n][0] * points[i][1]
+                     for i in range(n))
+
+
+def clean_polygon(points, tolerance=1e-3):
+    """Counter-clockwise copy without repeated, closing or collinear vertices."""
+    pts = []
+    for p in points:
+        p = (float(p[0]), float(p[1]))
+        if not pts or abs(p[0] - pts[-1][0]) > tolerance or abs(p[1] - pts[-1][1]) > tolerance:
+            pts.append(p)
+    while len(pts) > 1 and abs(pts[0][0] - pts[-1][0]) <= tolerance and abs(pts[0][1] - pts[-1][1]) <= tolerance:
+        pts.pop()
+    changed = True
+    while changed and len(pts) > 3:
+        changed = False
+        for i in range(len(pts)):
+            a, b, c = pts[i - 1], pts[i], pts[(i + 1) % len(pts)]
+            length = math.hypot(c[0] - a[0], c[1] - a[1]) or 1.0
+            if abs(_cross(a, b, c)) / length <= tolerance:
+                del pts[i]
+                changed = True
+                break
+    if polygon_area(pts) < 0:
+        pts.reverse()
+    return pts
+
+
+def convex_hull(points):
+    """Counter-clockwise convex hull (monotone chain)."""
+    pts = sorted(set(points))
+    if len(pts) <= 2:
+        return pts
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and _cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def _in_triangle(p, a, b, c):
+    return _cross(a, b, p) >= -_EPS and _cross(b, c, p) >= -_EPS and _cross(c, a, p) >= -_EPS
+
+
+def _triangulate(pts):
+    """Ear-clipping triangulation of a simple CCW polygon as index triples, or None."""
+    idx = list(range(len(pts)))
+    triangles = []
+    guard = 0
+    while len(idx) > 3:
+        guard += 1
+        if guard > 4 * len(pts) * len(pts):
+            return None
+        for k in range(len(idx)):
+            i, j, l = idx[k - 1], idx[k], idx[(k + 1) % len(idx)]
+            a, b, c = pts[i], pts[j], pts[l]
+            if _cross(a, b, c) <= _EPS:
+                continue
+            if any(_in_triangle(pts[m], a, b, c) for m in idx if m not in (i, j, l)):
+                continue
+            triangles.append([i, j, l])
+            del idx[k]
+            break
+        else:
+            return None
+    triangles.append(idx)
+    return triangles
+
+
+def _is_convex(pts, ring):
+    n = len(ring)
+    return all(_cross(pts[ring[k - 1]], pts[ring[k]], pts[ring[(k + 1) % n]]) >= -_EPS for k in range(n))
+
+
+def _merge(p, q, a, b):
+    # p runs a -> b, q runs b -> a; join them across the shared edge
+    i = p.index(b)
+    p_path = p[i:] + p[:i]          # b ... a
+    j = q.index(a)
+    q_path = q[j:] + q[:j]          # a ... b
+    return p_path + q_path[1:-1]
+
+
+def convex_pieces(points):
+    """Split a simple CCW polygon into convex CCW pieces (ear clipping + Hertel-Mehlhorn).
+
+    Falls back to the convex hull (a safe over-approximation) if the outline
+    can't be triangulated, e.g. when it self-intersects.
+    """
+    pts = clean_polygon(points)
+    if len(pts) < 3:
+        return []
+    if _is_convex(pts, list(range(len(pts)))):
+        return [pts]
+    triangles = _triangulate(pts)
+    if triangles is None:
+        return [convex_hull(pts)]
+    pieces = [list(t) for t in triangles]
+    merged = True
+    while merged:
+        merged = False
+        edges = {}
+        for n, piece in enumerate(pieces):
+            for k in range(len(piece)):
+                edges[(piece[k], piece[(k + 1) % len(piece)])] = n
+        for (a, b), n in edges.items():
+            m = edges.get((b, a))
+            if m is None or m == n:
+                continue
+            candidate = _merge(pieces[n], pieces[m], a, b)
+            if _is_convex(pts, candidate):
+                pieces[n] = candidate
+                del pieces[m]
+                merged = True
+                break
+    return [[pts[i] for i in piece] for piece in pieces]
+
+
+def minkowski_sum(p, q):
+    """Minkowski sum of two convex CCW polygons (edge merge by angle)."""
+    def from_lowest(poly):
+        k = min(range(len(poly)), key=lambda i: (poly[i][1], poly[i][0]))
+        return poly[k:] + poly[:k]
+
+    p, q = from_lowest(p), from_lowest(q)
+    np_, nq = len(p), len(q)
+    p, q = p + p[:2], q + q[:2]
+    out = []
+    i = j = 0
+    while i < np_ or j < nq:
+        out.append((p[i][0] + q[j][0], p[i][1] + q[j][1]))
+        ep = (p[i + 1][0] - p[i][0], p[i + 1][1] - p[i][1])
+        eq = (q[j + 1][0] - q[j][0], q[j + 1][1] - q[j][1])
+        cross = ep[0] * eq[1] - ep[1] * eq[0]
+        if cross >= 0 and i < np_:
+            i += 1
+        if cross <= 0 and j < nq:
+            j += 1
+    return convex_hull(out)
+
+
+def _bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _strictly_inside_convex(poly, bbox, x, y):
+    if x <= bbox[0] + _EPS or x >= bbox[2] - _EPS or y <= bbox[1] + _EPS or y >= bbox[3] - _EPS:
+        return False
+    n = len(poly)
+    for k in range(n):
+        a, b = poly[k], poly[(k + 1) % n]
+        if (b[0] - a[0]) * (y - a[1]) - (b[1] - a[1]) * (x - a[0]) <= _EPS:
+            return False
+    return True
+
+
+def point_in_polygon(points, x, y):
+    """Even-odd ray cast test."""
+    inside = False
+    n = len(points)
+    for k in range(n):
+        (x1, y1), (x2, y2) = points[k], points[(k + 1) % n]
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _segment_distance(a, b, c, d):
+    """Shortest distance between segments ab and cd (0 if they cross)."""
+    def point_seg(p, s, e):
+        dx, dy = e[0] - s[0], e[1] - s[1]
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else max(0.0, min(1.0, ((p[0] - s[0]) * dx + (p[1] - s[1]) * dy) / length))
+        return math.hypot(p[0] - s[0] - t * dx, p[1] - s[1] - t * dy)
+
+    d1, d2 = _cross(a, b, c), _cross(a, b, d)
+    d3, d4 = _cross(c, d, a), _cross(c, d, b)
+    if ((d1 > 0) != (d2 > 0)) and ((d3 > 0) != (d4 > 0)) and d1 and d2 and d3 and d4:
+        return 0.0
+    return min(point_seg(a, c, d), point_seg(b, c, d), point_seg(c, a, b), point_seg(d, a, b))
+
+
+def _octagon(radius):
+    # Circumscribes a circle of `radius`, so growing by it keeps at least that clearance
+    r = radius / math.cos(math.pi / 8)
+    return [(r * math.cos(math.pi / 8 * (2 * k + 1)), r * math.sin(math.pi / 8 * (2 * k + 1))) for k in range(8)]
+
+
+# ---------------------------------------------------------------------------
+# Parts
+# ---------------------------------------------------------------------------
+
+def _rotate(points, angle):
+    quarter = round(angle / 90.0)
+    if abs(angle - 90.0 * quarter) < _EPS:
+        # Exact for right angles, so rectangles stay axis aligned
+        turn = {0: lambda x, y: (x, y), 1: lambda x, y: (-y, x),
+                2: lambda x, y: (-x, -y), 3: lambda x, y: (y, -x)}[quarter % 4]
+        return [turn(x, y) for x, y in points]
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    return [(x * c - y * s, x * s + y * c) for x, y in points]
+
+
+def outline_key(points, precision=2):
+    """Hash of an outline that ignores where it sits, which vertex it starts at and
+    sub-`precision` noise, so the same part traced twice gets the same key."""
+    min_x = min(p[0] for p in points)
+    min_y = min(p[1] for p in points)
+    pts = [(round(x - min_x, precision), round(y - min_y, precision)) for x, y in points]
+    start = min(range(len(pts)), key=lambda i: pts[i])
+    pts = pts[start:] + pts[:start]
+    return hashlib.sha1(json.dumps(pts).encode("utf-8")).hexdigest()[:20]
+
+
+class _Shape:
+    """One part outline at one rotation, normalised so its bounding box starts at (0, 0)."""
+
+    def __init__(self, outer, inner, angle):
+        outer = clean_polygon(_rotate(outer, angle))
+        min_x, min_y, max_x, max_y = _bbox(outer)
+        self.angle = angle
+        self.outer = [(x - min_x, y - min_y) for x, y in outer]
+        self.holes = [clean_polygon([(x - min_x, y - min_y) for x, y in _rotate(h, angle)]) for h in inner]
+        self.holes = [h for h in self.holes if len(h) >= 3]
+        self.width = max_x - min_x
+        self.height = max_y - min_y
+        self.key = outline_key(self.outer)
+        self.pieces = convex_pieces(self.outer)
+        self._grown = None
+        self._negated = None
+
+    def grown(self, spacing):
+        """Convex pieces grown by the part spacing (as a placed, stationary part)."""
+        if self._grown is None:
+            octagon = _octagon(spacing) if spacing > 0 else None
+            self._grown = [minkowski_sum(p, octagon) if octagon else p for p in self.pieces]
+        return self._grown
+
+    def negated(self):
+        """Convex pieces mirrored through the origin (as the part being placed)."""
+        if self._negated is None:
+            self._negated = [[(-x, -y) for x, y in p] for p in self.pieces]
+        return self._negated
+
+
+def no_fit_polygon(fixed, moving, spacing):
+    """NFP of `moving` around `fixed` in fixed's frame: [(convex piece, bbox)] whose union
+    holds every reference position where moving would come within `spacing` of fixed."""
+    pieces = []
+    for f in fixed.grown(spacing):
+        for m in moving.negated():
+            poly = minkowski_sum(f, m)
+            if len(poly) >= 3:
+                pieces.append((poly, _bbox(poly)))
+    return pieces
+
+
+class NfpCache(ArtifactCache):
+    """No-fit polygons keyed on (fixed outline, moving outline, spacing).
+
+    With a cache_dir, entries are also kept on disk in one JSON shard per fixed
+    outline: a shard is read the first time that outline misses in memory, and
+    new entries are merged into it by flush() (at the end of every nesting run).
+    Shards are replaced atomically; concurrent writers can only lose entries.
+    A shard's mtime is its LRU clock (touched on read and write); flush() removes the
+    oldest shards once the directory exceeds max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=200000, max_bytes=128 * 1024 * 1024,
+                 max_disk_bytes=DEFAULT_NFP_CACHE_MAX_BYTES):
+        super().__init__(max_entries, max_bytes)
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._loaded = set()
+        self._dirty = {}
+        self._disk_lock = threading.Lock()
+        self.shard_reads = 0
+        self.shard_writes = 0
+
+    @staticmethod
+    def _size(pieces):
+        return 64 + sum(48 + 16 * len(poly) for poly, _ in pieces)
+
+    def _shard_path(self, fixed_key):
+        return os.path.join(self.cache_dir, fixed_key[:2], f"{fixed_key}.json")
+
+    def _read_shard(self, fixed_key):
+        try:
+            with open(self._shard_path(fixed_key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_shard(self, fixed_key, key):
+        """Pull a fixed outline's shard into memory (once); returns its entry for key."""
+        with self._disk_lock:
+            if fixed_key in self._loaded:
+                return None
+            self._loaded.add(fixed_key)
+        shard = self._read_shard(fixed_key)
+        if shard:
+            with self._disk_lock:
+                self.shard_reads += 1
+            try:
+                os.utime(self._shard_path(fixed_key), None)
+            except OSError:
+                pass
+        for k, value in shard.items():
+            self.put(k, value, self._size(value))
+        return shard.get(key)
+
+    def lookup(self, fixed, moving, spacing):
+        """Pieces for the pair, or None; counts exactly one hit or miss per call."""
+        key = f"{fixed.key}|{moving.key}|{spacing:g}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        pieces = self._load_shard(fixed.key, key) if self.cache_dir is not None else None
+        with self._lock:
+            if pieces is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return pieces
+
+    def store(self, fixed, moving, spacing, pieces):
+        key = f"{fixed.key}|{moving.key}|{spacing:g}"
+        self.put(key, pieces, self._size(pieces))
+        if self.cache_dir is not None:
+            with self._disk_lock:
+                self._dirty.setdefault(fixed.key, {})[key] = pieces
+
+    def flush(self):
+        """Merge entries computed since the last flush into their on-disk shards."""
+        with self._disk_lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        for fixed_key, entries in dirty.items():
+            path = self._shard_path(fixed_key)
+            shard = self._read_shard(fixed_key)
+            shard.update(entries)
+            tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp, "w") as f:
+                    json.dump(shard, f, separators=(",", ":"))
+                os.replace(tmp, path)
+                self.shard_writes += 1
+            except OSError as e:
+                print(f"[CACHE] Failed to write NFP shard {fixed_key}: {e}")
+        self.evict(keep=set(dirty))
+
+    def evict(self, keep=()):
+        """Remove least-recently-used shards (never those in `keep`) until the directory fits in max_disk_bytes."""
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        shards = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                if name[:-len(".json")] not in keep:
+                    shards.append((stat.st_mtime, path, stat.st_size))
+        shards.sort()
+        while shards and total > self.max_disk_bytes:
+            _, path, size = shards.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({"cache_dir": self.cache_dir, "shard_reads": self.shard_reads,
+                      "shard_writes": self.shard_writes, "max_disk_bytes": self.max_disk_bytes})
+        return stats
+
+
+def _part_area(outer, inner):
+    return abs(polygon_area(outer)) - sum(abs(polygon_area(h)) for h in inner)
+
+
+class _Sheet:
+    def __init__(self):
+        self.placed = []     # [(shape, x, y, part)]
+        self.used = 0.0      # material area placed so far
+
+
+def _fits_in_hole(shape, x, y, hole, hx, hy, spacing):
+    """True if shape at (x, y) lies inside the hole (at hx, hy) with `spacing` clearance."""
+    ax, ay = shape.outer[0]
+    if not point_in_polygon(hole, ax + x - hx, ay + y - hy):
+        return False
+    a_pts = [(px + x, py + y) for px, py in shape.outer]
+    h_pts = [(px + hx, py + hy) for px, py in hole]
+    for i in range(len(a_pts)):
+        a, b = a_pts[i], a_pts[(i + 1) % len(a_pts)]
+        for j in range(len(h_pts)):
+            if _segment_distance(a, b, h_pts[j], h_pts[(j + 1) % len(h_pts)]) < spacing - _EPS:
+                return False
+    return True
+
+
+def _find_position(sheet, shape, sheet_width, sheet_height, spacing, nfp):
+    """Bottom-left-most feasible (x, y) for shape on the sheet, or None."""
+    margin = spacing / 2.0
+    x0, y0 = margin, margin
+    x1, y1 = sheet_width - margin - shape.width, sheet_height - margin - shape.height
+    if x1 < x0 - _EPS or y1 < y0 - _EPS:
+        return None
+    x1, y1 = max(x0, x1), max(y0, y1)
+
+    obstacles = []
+    flat = []       # [(piece, bbox, obstacle index)] for every NFP piece on the sheet
+    candidates = {(x0, y0), (x0, y1), (x1, y0), (x1, y1)}
+    for fixed, fx, fy, _ in sheet.placed:
+        k = len(obstacles)
+        obstacles.append((fixed, fx, fy))
+        for poly, b in nfp(fixed, shape):
+            poly = [(px + fx, py + fy) for px, py in poly]
+            flat.append((poly, (b[0] + fx, b[1] + fy, b[2] + fx, b[3] + fy), k))
+            for px, py in poly:
+                if x0 - _EPS <= px <= x1 + _EPS:
+                    candidates.add((px, max(y0, min(py, y1))))
+                    candidates.add((px, y0))
+                if y0 - _EPS <= py <= y1 + _EPS:
+                    candidates.add((x0, py))
+        for hole in fixed.holes:
+            hx0, hy0, hx1, hy1 = _bbox(hole)
+            lo_x, hi_x = fx + hx0 + spacing, fx + hx1 - spacing - shape.width
+            lo_y, hi_y = fy + hy0 + spacing, fy + hy1 - spacing - shape.height
+            if hi_x < lo_x or hi_y < lo_y:
+                continue
+            for i in range(HOLE_GRID):
+                for j in range(HOLE_GRID):
+                    candidates.add((lo_x + (hi_x - lo_x) * i / (HOLE_GRID - 1),
+                                    lo_y + (hi_y - lo_y) * j / (HOLE_GRID - 1)))
+
+    last = 0
+    for x, y in sorted(candidates, key=lambda c: (round(c[0], 3), round(c[1], 3))):
+        if x < x0 - _EPS or x > x1 + _EPS or y < y0 - _EPS or y > y1 + _EPS:
+            continue
+        # Neighbouring candidates tend to be blocked by the same piece, so test it first
+        cleared = set()
+        blocked = False
+        for step in range(len(flat)):
+            n = (last + step) % len(flat)
+            poly, b, k = flat[n]
+            if k in cleared or not _strictly_inside_convex(poly, b, x, y):
+                continue
+            fixed, fx, fy = obstacles[k]
+            # Overlaps the fixed part's outline: only allowed inside one of its cut-outs
+            if any(_fits_in_hole(shape, x, y, hole, fx, fy, spacing) for hole in fixed.holes):
+                cleared.add(k)
+                continue
+            last = n
+            blocked = True
+            break
+        if not blocked:
+            return x, y
+    return None
+
+
+def sort_key(part, order="area"):
+    """Descending sort key for a part dict under a named placement order."""
+    outer = part.get("outer") or part["points"]
+    min_x, min_y, max_x, max_y = _bbox(outer)
+    w, h = max_x - min_x, max_y - min_y
+    return -{
+        "area": abs(polygon_area(outer)),
+        "length": max(w, h),
+        "bbox": w * h,
+        "perimeter": sum(math.hypot(outer[i][0] - outer[i - 1][0], outer[i][1] - outer[i - 1][1])
+                         for i in range(len(outer))),
+    }[order]
+
+
+def layout_score(result):
+    """Lower is better: unplaced parts, then sheets, then how full the last sheet is
+    (an emptier last sheet is closer to being saved)."""
+    sheets = result.get("sheets") or {}
+    last = sheets.get(str(result["sheet_count"] - 1), {}).get("efficiency", 0) if sheets else 0
+    return len(result.get("unplaced", [])) * 1000 + result["sheet_count"] + last / 100.0
+
+
+def nest_parts_polygon(part_data, sheet_width=2440, sheet_height=1220, spacing=8.0,
+                       rotations=DEFAULT_ROTATIONS, nfp_cache=None, order=None, max_sheets=None):
+    """Nest part outlines on as few sheets as possible using no-fit polygons.
+
+    part_data items need "id", "name" and "points" (or "outer"), plus optional
+    "inner" cut-outs. Placed parts carry their rotated outline in sheet-local
+    "points"/"outer"/"inner" at offset (x, y); "rotation" is in degrees and
+    "is_rotated" stays False because the outline is already turned. Efficiency is
+    real material utilisation (part area less cut-outs over sheet area).
+    Parts that fit no sheet in any rotation are listed in "unplaced".
+    NFPs come from (and go to) nfp_cache, a per-run NfpCache if none is given.
+    `order` lists part ids in placement order; by default parts go largest area first.
+    With max_sheets, parts that don't fit on that many sheets are left unplaced.
+    """
+    nfp_cache = NfpCache() if nfp_cache is None else nfp_cache
+    counts = {"hits": 0, "computed": 0}
+
+    def nfp(fixed, moving):
+        pieces = nfp_cache.lookup(fixed, moving, spacing)
+        if pieces is None:
+            pieces = no_fit_polygon(fixed, moving, spacing)
+            nfp_cache.store(fixed, moving, spacing, pieces)
+            counts["computed"] += 1
+        else:
+            counts["hits"] += 1
+        return pieces
+
+    items = []
+    for p in part_data:
+        outer = clean_polygon(p.get("outer") or p["points"])
+        if len(outer) < 3:
+            continue
+        inner = p.get("inner") or []
+        shapes = [_Shape(outer, inner, angle) for angle in rotations]
+        items.append((_part_area(outer, [clean_polygon(h) for h in inner if len(h) >= 3]), p, shapes))
+    if order is not None:
+        rank = {pid: n for n, pid in enumerate(order)}
+        items.sort(key=lambda item: rank.get(item[1]["id"], len(rank)))
+    else:
+        # Largest first; the small offcut-fillers go last, when the cut-outs exist
+        items.sort(key=lambda item: -item[0])
+
+    sheet_area = float(sheet_width) * float(sheet_height)
+    sheets = []
+    unplaced = []
+    for area, part, shapes in items:
+        placement = None
+        opened = max_sheets is None or len(sheets) < max_sheets
+        for sheet in sheets + ([_Sheet()] if opened else []):
+            if sheet.used + area > sheet_area:
+                continue
+            best = None
+            for shape in shapes:
+                pos = _find_position(sheet, shape, sheet_width, sheet_height, spacing, nfp)
+                if pos is None:
+                    continue
+                # Across rotations, keep the one that reaches least far into the sheet
+                rank = (round(pos[0] + shape.width, 3), round(pos[1] + shape.height, 3))
+                if best is None or rank < best[0]:
+                    best = (rank, shape, pos)
+            if best is not None:
+                placement = (sheet, best[1], best[2])
+                break
+        if placement is None:
+            if opened:
+                print(f"    [ENGINE] {part['name']} does not fit a {sheet_width}x{sheet_height} sheet")
+            unplaced.append(part["name"])
+            continue
+        sheet, shape, (x, y) = placement
+        if sheet not in sheets:
+            sheets.append(sheet)
+        sheet.placed.append((shape, x, y, dict(part, area=area)))
+        sheet.used += area
+    nfp_cache.flush()
+
+    formatted = {}
+    used = 0.0
+    for n, sheet in enumerate(sheets):
+        parts = []
+        for shape, x, y, part in sheet.placed:
+            parts.append({
+                "id": part["id"], "name": part["name"],
+                "x": round(x, 3), "y": round(y, 3),
+                "width": round(shape.width, 2), "height": round(shape.height, 2),
+                "rotation": shape.angle, "is_rotated": False,
+                "points": [(round(px, 3), round(py, 3)) for px, py in shape.outer],
+                "outer": [(round(px, 3), round(py, 3)) for px, py in shape.outer],
+                "inner": [[(round(px, 3), round(py, 3)) for px, py in h] for h in shape.holes],
+                "area": round(part["area"], 2),
+            })
+        sheet_used = sum(p["area"] for p in parts)
+        used += sheet_used
+        formatted[str(n)] = {"efficiency": round(sheet_used / sheet_area * 100, 2), "parts": parts}
+
+    total = len(sheets) * sheet_area
+    return {
+        "algo": "polygon_nfp",
+        "efficiency": round(used / total * 100, 2) if total else 0,
+        "sheet_count": len(sheets),
+        "sheets": formatted,
+        "unplaced": unplaced,
+        "nfp": counts,
+    }
@@ -11,9 +11,12 @@ Usage:
 import math
 import argparse
 from build123d import *
-from ocp_vscode import show, set_port
 from stair_helpers import make_flight, make_winder
 
+# Part of every geometry cache key (memory, disk and ETags): bump it whenever
+# build_staircase produces different solids for the same config.
+BUILDER_VERSION = "v1"
+
 # Default Configuration
 DEFAULT_CONFIG = {
     "width": 800.0,
@@ -186,6 +189,7 @@ def build_staircase(config, return_cuts=False):
     return result
 
 if __name__ == "__main__":
+    from ocp_vscode import show, set_port
     set_port(3939)
     
     parser = argparse.ArgumentParser()
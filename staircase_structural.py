@@ -12,13 +12,23 @@ Backward-compatible: --mode volumetric delegates to staircase_parametric.py.
 Usage:
     python staircase_structural.py [--mode structural|volumetric]
 """
+import os
 import math
 import argparse
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from build123d import *
-from ocp_vscode import show, set_port
+from OCP.TopAbs import TopAbs_ShapeEnum
 
 # Re-use the volumetric builder for plaster boolean and backward compat
-from staircase_parametric import build_staircase, DEFAULT_CONFIG as PARAM_DEFAULTS
+from staircase_parametric import build_staircase, DEFAULT_CONFIG as PARAM_DEFAULTS, BUILDER_VERSION as PARAM_VERSION
+
+# Part of every geometry cache key (memory, disk and ETags): bump it whenever
+# build_structural_staircase produces different solids for the same config.
+# The volumetric builder's version is folded in, since the plaster is cut from it.
+BUILDER_VERSION = f"s1+{PARAM_VERSION}"
 
 # ---------------------------------------------------------------------------
 # Configuration (extends the parametric defaults)
@@ -36,6 +46,8 @@ DEFAULT_CONFIG = {**PARAM_DEFAULTS,
 
 from handrail_generator import build_handrail, build_walkline
 from baluster_generator import build_balusters
+from geometry_cache import StageCache
+from brep_cache import pack_shapes, unpack_shapes
 
 # Colours
 C_TREAD    = (0.72, 0.52, 0.30)
@@ -84,24 +96,46 @@ def _winder_step_polygon(sa, ea, winder_width):
 # STRAIGHT FLIGHT ELEMENTS
 # ===========================================================================
 
+def _located(proto, loc):
+    """Place a prototype part without copying its geometry.
+
+    The instance shares the prototype's TShape and differs only by its Location,
+    so N identical treads cost one BRep plus N small location records.
+    """
+    moved = proto.wrapped.Moved(loc.wrapped)
+    if moved.ShapeType() == TopAbs_ShapeEnum.TopAbs_SOLID:
+        return Solid(moved)
+    return Compound(moved)
+
+
+def _place(parts, loc):
+    """Move already-built parts as a group (e.g. a whole flight), keeping shared TShapes."""
+    return [_located(p, loc) for p in parts]
+
+
 def _flight_treads_risers(steps, going, rise, width, tread_t, riser_t, nosing=0.0):
     """Individual treads & risers for one straight flight at local origin.
     Includes 'nosing' overhang for architectural finish.
+
+    Every tread (and every riser) in a straight flight is the same solid, so one
+    prototype of each is built and the rest are located instances of it.
     """
     treads, risers = [], []
+    if steps <= 0:
+        return treads, risers
+    # Tread: depth is going + nosing
+    tread_proto = Box(going + nosing, width, tread_t,
+                      align=(Align.MIN, Align.MAX, Align.MAX))
+    # Riser: vertical panel
+    riser_proto = Box(riser_t, width, rise,
+                      align=(Align.MIN, Align.MAX, Align.MIN))
     for i in range(steps):
         x0 = i * going
         z_tread_top = (i + 1) * rise
-        # Tread: depth is going + nosing
-        t = Box(going + nosing, width, tread_t,
-                align=(Align.MIN, Align.MAX, Align.MAX))
         # Riser is at the back of the nosing
-        treads.append(t.translate((x0 - nosing, 0, z_tread_top)))
-        # Riser: vertical panel
+        treads.append(_located(tread_proto, Pos(x0 - nosing, 0, z_tread_top)))
         # Dropped by tread_t to meet the tread below, pushed back by riser_t
-        r = Box(riser_t, width, rise,
-                align=(Align.MIN, Align.MAX, Align.MIN))
-        risers.append(r.translate((x0, 0, i * rise - tread_t if i > 0 else 0)))
+        risers.append(_located(riser_proto, Pos(x0, 0, i * rise - tread_t if i > 0 else 0)))
     return treads, risers
 
 
@@ -178,6 +212,12 @@ def _make_stringer_solid(steps, going, rise, depth, thickness, tread_t=20.0, ris
     return bp.part
 
 
+@functools.lru_cache(maxsize=32)
+def _stringer_prototype(steps, going, rise, depth, thickness, tread_t, riser_t, nosing, str_d_nominal):
+    """Shared stringer/carriage solid per unique profile (flights and carriages reuse it)."""
+    return _make_stringer_solid(steps, going, rise, depth, thickness, tread_t, riser_t, nosing, str_d_nominal)
+
+
 def _flight_stringers(steps, going, rise, width, str_depth, str_width, tread_t=20.0, riser_t=20.0, nosing=20.0, str_d_nominal=250.0):
     if steps <= 0: return []
     """Two wall-flush stringers for a straight flight.
@@ -187,8 +227,8 @@ def _flight_stringers(steps, going, rise, width, str_depth, str_width, tread_t=2
     """
     stringers = []
     # Inner stringer: at Y=0, extruded -Y → Y from 0 to -str_width
-    inner = _make_stringer_solid(steps, going, rise, str_depth, str_width, tread_t, riser_t, nosing, str_d_nominal)
-    stringers.append(inner)
+    inner = _stringer_prototype(steps, going, rise, str_depth, str_width, tread_t, riser_t, nosing, str_d_nominal)
+    stringers.append(_located(inner, Location()))
     
     # User requested to REMOVE the outer stringer for straight flights and just
     # rely on the long outer stringer generated by the winder boolean intersection.
@@ -206,13 +246,13 @@ def _flight_carriages(steps, going, rise, width, car_depth, car_width, tread_t=2
     Carriages sit above the soffit line (car_depth < waist).
     """
     n_carriages = max(1, round(width / 400) - 1)
+    proto = _stringer_prototype(steps, going, rise, car_depth, car_width, tread_t, riser_t, nosing, str_d_nominal)
     carriages = []
     for i in range(n_carriages):
         frac = (i + 1) / (n_carriages + 1)  # evenly spaced
         # Width extends in -Y: position at -width*frac, centre the carriage
         y_pos = -width * frac + car_width / 2
-        c = _make_stringer_solid(steps, going, rise, car_depth, car_width, tread_t, riser_t, nosing, str_d_nominal)
-        carriages.append(c.translate((0, y_pos, 0)))
+        carriages.append(_located(proto, Pos(0, y_pos, 0)))
     return carriages
 
 
@@ -327,44 +367,41 @@ def _winder_corner_stringers(volumetric, winder_width, str_width, pivot_global):
 
 
 # ===========================================================================
-# PLASTER SOFFIT VIA BOOLEAN SUBTRACTION
-# ===========================================================================# ===========================================================================
-# MAIN ASSEMBLY
+# BUILD STAGES
 # ===========================================================================
+# Each stage declares the config keys it reads. build_structural_staircase runs
+# them through STAGE_CACHE so an edit only rebuilds the stages it can affect
+# (e.g. plaster_thickness re-runs plaster -> trim -> routing, never the treads).
 
-def build_structural_staircase(config):
-    """Build the full structural staircase as categorised element lists."""
-    width    = config["width"]
-    rise     = config["rise"]
-    going    = config["going"]
-    waist    = config["waist"]
-    inner_r  = config["inner_r"]
-    sb_steps = config["s_bottom_steps"]
-    w_steps  = config["winder_steps"]
-    st_steps = config["s_top_steps"]
-    ext_top  = config["extend_top_flight"]
-    tread_t  = config["tread_thickness"]
-    riser_t  = config["riser_thickness"]
-    str_w    = config["stringer_width"]
-    str_d    = max(config["stringer_depth"], waist)
-    car_w    = config["carriage_width"]
-    car_d    = max(config["carriage_depth"], waist)
-
-    winder_width  = width + inner_r
-    sb_length     = sb_steps * going
-    sb_top_z      = sb_steps * rise
-    winder_base_z = sb_top_z
-    winder_top_z  = winder_base_z + w_steps * rise
-    st_base_z     = winder_top_z
-    pivot_x       = sb_length
-    pivot_y       = 0.0
-
-    all_treads, all_risers = [], []
-    all_stringers, all_carriages = [], []
-
-    # -----------------------------------------------------------------------
-    # 0. BUILD VOLUMETRIC REFERENCE (reused for winder stringers + plaster)
-    # -----------------------------------------------------------------------
+STAGE_CACHE = StageCache(max_entries=256, max_bytes=1024 * 1024 * 1024)
+
+VOLUMETRIC_KEYS = ["width", "rise", "going", "waist", "inner_r", "s_bottom_steps",
+                   "winder_steps", "s_top_steps", "extend_top_flight", "unified_soffit"]
+FLIGHT_SKIN_KEYS = ["width", "rise", "going", "inner_r", "s_bottom_steps", "winder_steps",
+                    "s_top_steps", "tread_thickness", "riser_thickness", "nosing"]
+WINDER_SKIN_KEYS = ["width", "rise", "going", "inner_r", "s_bottom_steps", "winder_steps",
+                    "tread_thickness", "riser_thickness", "nosing"]
+FLIGHT_FRAMING_KEYS = FLIGHT_SKIN_KEYS + ["waist", "stringer_width", "stringer_depth",
+                                          "carriage_width", "carriage_depth"]
+CORNER_STRINGER_KEYS = ["width", "going", "inner_r", "s_bottom_steps", "stringer_width"]
+PLASTER_KEYS = ["plaster_thickness"]
+ARCHITECTURAL_KEYS = ["width", "rise", "going", "inner_r", "s_bottom_steps", "winder_steps", "s_top_steps"]
+
+
+def _bottom_flight_location(config):
+    """Flight built at Y=0..-width; the bottom flight's inner edge sits at Y=-inner_r."""
+    return Pos(0, -config["inner_r"], 0)
+
+
+def _top_flight_location(config):
+    """Rotate a flight built at the origin 90 deg onto the top flight's position."""
+    pivot_x = config["s_bottom_steps"] * config["going"]
+    st_base_z = (config["s_bottom_steps"] + config["winder_steps"]) * config["rise"]
+    return Pos(pivot_x + config["inner_r"], 0, st_base_z) * Rot(0, 0, 90)
+
+
+def _build_volumetric_reference(config):
+    """0. Volumetric staircase + soffit cutting mass (reused for winder stringers + plaster)."""
     print(f"  Building volumetric reference...")
     vol_config = config.copy()
     vol_config["unified_soffit"] = config.get("unified_soffit", True)
@@ -381,62 +418,71 @@ def build_structural_staircase(config):
             volumetric = Compound(children=volumetric.solids())
         else:
             volumetric = Compound(children=volumetric)
+    return volumetric, soffit_cut
+
+
+def _build_flight_skin(config):
+    """1/3. Treads & risers of both straight flights, placed globally.
+
+    Returns (bottom_treads, bottom_risers, top_treads, top_risers).
+    """
+    nosing = config.get("nosing", 0)
+    args = (config["going"], config["rise"], config["width"],
+            config["tread_thickness"], config["riser_thickness"], nosing)
+
+    print(f"  Bottom flight: {config['s_bottom_steps']} steps")
+    t, r = _flight_treads_risers(config["s_bottom_steps"], *args)
+    bottom = _bottom_flight_location(config)
+
+    print(f"  Top flight: {config['s_top_steps']} steps")
+    t2, r2 = _flight_treads_risers(config["s_top_steps"], *args)
+    top = _top_flight_location(config)
 
-    # -----------------------------------------------------------------------
-    # 1. BOTTOM FLIGHT  — +X, inner edge at Y=-inner_r
-    # -----------------------------------------------------------------------
-    print(f"  Bottom flight: {sb_steps} steps")
-    t, r = _flight_treads_risers(sb_steps, going, rise, width, tread_t, riser_t, config.get("nosing", 0))
-    # Translate: flight built at Y=0..width, need inner edge at Y=-inner_r
-    off_sb = (0, -inner_r, 0)
-    all_treads.extend([p.translate(off_sb) for p in t])
-    all_risers.extend([p.translate(off_sb) for p in r])
-
-    s = _flight_stringers(sb_steps, going, rise, width, str_d, str_w, tread_t, riser_t, config.get("nosing", 0), config["stringer_depth"])
-    all_stringers.extend([p.translate(off_sb) for p in s])
-
-    c = _flight_carriages(sb_steps, going, rise, width, car_d, car_w, tread_t, riser_t, config.get("nosing", 0), config["carriage_depth"])
-    # Trim carriages to volumetric envelope (so they don't protrude below soffit)
-    all_carriages.extend([p.translate(off_sb) for p in c])
-
-    # -----------------------------------------------------------------------
-    # 2. WINDER — pivot at (pivot_x, pivot_y)
-    # -----------------------------------------------------------------------
-    print(f"  Winder: {w_steps} steps")
-    wt, wr = _winder_treads_risers(
-        w_steps, rise, winder_width, inner_r,
-        winder_base_z, tread_t, riser_t,
-        pivot_global=(pivot_x, pivot_y),
+    return _place(t, bottom), _place(r, bottom), _place(t2, top), _place(r2, top)
+
+
+def _build_winder_skin(config):
+    """2. Winder treads & risers about the pivot at the end of the bottom flight."""
+    print(f"  Winder: {config['winder_steps']} steps")
+    return _winder_treads_risers(
+        config["winder_steps"], config["rise"], config["width"] + config["inner_r"], config["inner_r"],
+        config["s_bottom_steps"] * config["rise"], config["tread_thickness"], config["riser_thickness"],
+        pivot_global=(config["s_bottom_steps"] * config["going"], 0.0),
         nosing=config.get("nosing", 0))
-    all_treads.extend(wt)
-    all_risers.extend(wr)
-
-    # Winder corner stringers (sliced from volumetric → stepped profiles)
-    ws = _winder_corner_stringers(
-        volumetric, winder_width, str_w,
-        pivot_global=(pivot_x, pivot_y))
-    all_stringers.extend(ws)
-
-    # -----------------------------------------------------------------------
-    # 3. TOP FLIGHT — rotated 90°, inner edge at X=pivot_x+inner_r
-    # -----------------------------------------------------------------------
-    print(f"  Top flight: {st_steps} steps")
-    t2, r2 = _flight_treads_risers(st_steps, going, rise, width, tread_t, riser_t, config.get("nosing", 0))
-    s2 = _flight_stringers(st_steps, going, rise, width, str_d, str_w, tread_t, riser_t, config.get("nosing", 0), config["stringer_depth"])
-    c2 = _flight_carriages(st_steps, going, rise, width, car_d, car_w, tread_t, riser_t, config.get("nosing", 0), config["carriage_depth"])
-
-    def _rotate_translate(parts):
-        return [p.rotate(Axis.Z, 90).translate((pivot_x + inner_r, 0, st_base_z))
-                for p in parts]
-
-    all_treads.extend(_rotate_translate(t2))
-    all_risers.extend(_rotate_translate(r2))
-    all_stringers.extend(_rotate_translate(s2))
-    all_carriages.extend(_rotate_translate(c2))
-
-    # -----------------------------------------------------------------------
-    # 4. PLASTER SOFFIT (fast boolean intersection)
-    # -----------------------------------------------------------------------
+
+
+def _build_flight_framing(config):
+    """1/3. Untrimmed flight stringers and carriages.
+
+    Returns (bottom_stringers, top_stringers, carriages).
+    """
+    waist = config["waist"]
+    str_d = max(config["stringer_depth"], waist)
+    car_d = max(config["carriage_depth"], waist)
+    nosing = config.get("nosing", 0)
+    common = (config["going"], config["rise"], config["width"])
+    skin = (config["tread_thickness"], config["riser_thickness"], nosing)
+    bottom = _bottom_flight_location(config)
+    top = _top_flight_location(config)
+
+    sb_steps, st_steps = config["s_bottom_steps"], config["s_top_steps"]
+    s = _flight_stringers(sb_steps, *common, str_d, config["stringer_width"], *skin, config["stringer_depth"])
+    c = _flight_carriages(sb_steps, *common, car_d, config["carriage_width"], *skin, config["carriage_depth"])
+    s2 = _flight_stringers(st_steps, *common, str_d, config["stringer_width"], *skin, config["stringer_depth"])
+    c2 = _flight_carriages(st_steps, *common, car_d, config["carriage_width"], *skin, config["carriage_depth"])
+
+    return _place(s, bottom), _place(s2, top), _place(c, bottom) + _place(c2, top)
+
+
+def _build_corner_stringers(config, volumetric):
+    """2. Winder corner stringers (sliced from volumetric -> stepped profiles)."""
+    return _winder_corner_stringers(
+        volumetric, config["width"] + config["inner_r"], config["stringer_width"],
+        pivot_global=(config["s_bottom_steps"] * config["going"], 0.0))
+
+
+def _build_plaster(config, volumetric, soffit_cut):
+    """4. Plaster soffit shell (fast boolean intersection), or None."""
     print(f"  Building plaster shell (fast boolean intersection)...")
     plaster_t = config.get("plaster_thickness", 10.0)
     plaster = None
@@ -451,65 +497,196 @@ def build_structural_staircase(config):
                 plaster = plaster_raw
         except Exception as e:
             print(f"  [!] Failed to generate fast plaster shell: {e}")
+    return plaster
 
-    # -----------------------------------------------------------------------
-    # 5. RECESS STRINGERS & CARRIAGES
-    # -----------------------------------------------------------------------
-    # Restore strict boolean containment to prevent stringers/carriages from
-    # protruding through the plaster soffit at complex transitions (e.g. winder base).
-    # We intersect with the volumetric model to guarantee they stay inside the envelope.
-    print(f"  Trimming structural elements to volumetric envelope...")
-    
-    def _trim_to_envelope(parts, envelope, subtract_envelope=None):
-        trimmed = []
-        for p in parts:
-            if not p or len(p.solids()) == 0: continue
-            try:
-                # Intersect with the overall volumetric envelope
-                clipped = p & envelope
-                
-                # If there's a plaster envelope, subtract it so framing stays INSIDE the plaster layer
-                if clipped and subtract_envelope and len(clipped.solids()) > 0:
-                    try:
-                        clipped = clipped - subtract_envelope
-                    except Exception as sub_e:
-                        print(f"    Warning: Plaster subtract failed: {sub_e}")
-
-                if clipped and len(clipped.solids()) > 0:
-                    trimmed.append(clipped)
-                else:
-                    trimmed.append(p)
-            except Exception as e:
-                print(f"    Warning: Boolean intersect failed on element: {e}")
+
+def _trim_to_envelope(parts, envelope, subtract_envelope=None):
+    """5. Clip framing to the volumetric envelope, then out of the plaster layer."""
+    trimmed = []
+    for p in parts:
+        if not p or len(p.solids()) == 0: continue
+        try:
+            # Intersect with the overall volumetric envelope
+            clipped = p & envelope
+            
+            # If there's a plaster envelope, subtract it so framing stays INSIDE the plaster layer
+            if clipped and subtract_envelope and len(clipped.solids()) > 0:
+                try:
+                    clipped = clipped - subtract_envelope
+                except Exception as sub_e:
+                    print(f"    Warning: Plaster subtract failed: {sub_e}")
+
+            if clipped and len(clipped.solids()) > 0:
+                trimmed.append(clipped)
+            else:
                 trimmed.append(p)
-        return trimmed
-
-    all_stringers = _trim_to_envelope(all_stringers, volumetric, subtract_envelope=plaster)
-    all_carriages = _trim_to_envelope(all_carriages, volumetric, subtract_envelope=plaster)
-
-    # -----------------------------------------------------------------------
-    # 5.5 ROUTE OUTER STRINGERS
-    # -----------------------------------------------------------------------
-    # The winder corner stringers (which act as outer stringers for the whole stairs)
-    # were sliced from the volumetric model, so they lacked the 20mm recesses for
-    # the treads and risers. We physically boolean subtract all treads and risers
-    # from the stringers to perfectly rout out their housing joints.
+        except Exception as e:
+            print(f"    Warning: Boolean intersect failed on element: {e}")
+            trimmed.append(p)
+    return trimmed
+
+
+def _route_stringers(stringers, skin):
+    """5.5 Rout tread/riser housings into the stringers by 3D boolean subtraction.
+
+    The winder corner stringers (which act as outer stringers for the whole stairs)
+    were sliced from the volumetric model, so they lack the 20mm recesses for the
+    treads and risers.
+    """
     print(f"  Routing stringer recesses via 3D boolean subtraction...")
-    all_skin = all_treads + all_risers
-    if all_skin:
+    if not skin:
+        return stringers
+    try:
+        skin_compound = Compound(children=skin)
+        routed_stringers = []
+        for s in stringers:
+            if not s or len(s.solids()) == 0: continue
+            try:
+                routed_stringers.append(s - skin_compound)
+            except Exception as e:
+                print(f"    Warning: Boolean subtract failed on stringer element: {e}")
+                routed_stringers.append(s)
+        return routed_stringers
+    except Exception as e:
+        print(f"  [!] Failed to build skin compound for routing: {e}")
+        return stringers
+
+
+def _build_architectural(config):
+    """6. Handrail, balusters and walkline. Returns (handrail, balusters, walkline)."""
+    print(f"  Building architectural suite...")
+    return build_handrail(config), build_balusters(config), build_walkline(config)
+
+
+# ===========================================================================
+# PARALLEL EXECUTION (opt-in)
+# ===========================================================================
+# Stages that only read the config are independent of each other and can be
+# built in worker processes. Results cross the process boundary as binary BREP
+# (brep_cache.pack_shapes). Enabled by config["build_workers"] > 1 or the
+# STUDIO_BUILD_WORKERS environment variable.
+
+DEFAULT_BUILD_WORKERS = int(os.environ.get("STUDIO_BUILD_WORKERS", "0"))
+
+_POOL_TASKS = {
+    "volumetric": _build_volumetric_reference,
+    "flight_treads_risers": _build_flight_skin,
+    "winder_treads_risers": _build_winder_skin,
+    "flight_framing": _build_flight_framing,
+    "handrail": build_handrail,
+    "balusters": build_balusters,
+    "walkline": build_walkline,
+}
+_INDEPENDENT_STAGES = [
+    ("volumetric", VOLUMETRIC_KEYS, ["volumetric"]),
+    ("flight_treads_risers", FLIGHT_SKIN_KEYS, ["flight_treads_risers"]),
+    ("winder_treads_risers", WINDER_SKIN_KEYS, ["winder_treads_risers"]),
+    ("flight_framing", FLIGHT_FRAMING_KEYS, ["flight_framing"]),
+    ("architectural", ARCHITECTURAL_KEYS, ["handrail", "balusters", "walkline"]),
+]
+
+_BUILD_POOL = None
+_BUILD_POOL_LOCK = threading.Lock()
+
+
+def _build_pool(workers):
+    """The one long-lived build pool (spawning re-imports OCCT, so reuse it).
+
+    Sized by the first parallel build -- STUDIO_BUILD_WORKERS on the server, --workers
+    on the CLI; later builds share it whatever count they ask for.
+    """
+    global _BUILD_POOL
+    with _BUILD_POOL_LOCK:
+        if _BUILD_POOL is None:
+            _BUILD_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _BUILD_POOL
+
+
+def shutdown_build_pool():
+    """Stop the build pool's worker processes (a later parallel build starts a new pool)."""
+    global _BUILD_POOL
+    with _BUILD_POOL_LOCK:
+        pool, _BUILD_POOL = _BUILD_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _pool_task(name, config):
+    """Worker-process entry point: build one independent stage and ship it back as BREP."""
+    return pack_shapes(_POOL_TASKS[name](config))
+
+
+def _submit_independent(config, workers):
+    """Start every uncached independent stage in the build pool. Returns {task: future}."""
+    pool = _build_pool(workers)
+    futures = {}
+    for stage, keys, tasks in _INDEPENDENT_STAGES:
+        if STAGE_CACHE.has(stage, config, keys):
+            continue
+        for task in tasks:
+            futures[task] = pool.submit(_pool_task, task, dict(config))
+    if futures:
+        print(f"  Building {len(futures)} independent groups on {workers} workers: {', '.join(futures)}")
+    return futures
+
+
+def _from_pool(futures, task, config):
+    """Result of a pooled task, or an in-process build if it wasn't submitted or failed."""
+    future = futures.get(task)
+    if future is not None:
         try:
-            skin_compound = Compound(children=all_skin)
-            routed_stringers = []
-            for s in all_stringers:
-                if not s or len(s.solids()) == 0: continue
-                try:
-                    routed_stringers.append(s - skin_compound)
-                except Exception as e:
-                    print(f"    Warning: Boolean subtract failed on stringer element: {e}")
-                    routed_stringers.append(s)
-            all_stringers = routed_stringers
+            return unpack_shapes(*future.result())
         except Exception as e:
-            print(f"  [!] Failed to build skin compound for routing: {e}")
+            print(f"  [!] Parallel build of {task} failed ({e}); building in-process")
+    return _POOL_TASKS[task](config)
+
+
+# ===========================================================================
+# MAIN ASSEMBLY
+# ===========================================================================
+
+def build_structural_staircase(config, workers=None):
+    """Build the full structural staircase as categorised element lists.
+
+    Stages are memoised in STAGE_CACHE on the config keys they read (plus the
+    stages they consume), so repeated builds only recompute what an edit touched.
+    With workers > 1 the independent stages are built concurrently in a process pool.
+    """
+    if workers is None:
+        workers = config.get("build_workers") or DEFAULT_BUILD_WORKERS
+    futures = _submit_independent(config, workers) if workers > 1 else {}
+    run = STAGE_CACHE.run
+
+    vol_key, (volumetric, soffit_cut) = run(
+        "volumetric", config, VOLUMETRIC_KEYS, lambda: _from_pool(futures, "volumetric", config))
+    flight_key, (sb_treads, sb_risers, st_treads, st_risers) = run(
+        "flight_treads_risers", config, FLIGHT_SKIN_KEYS, lambda: _from_pool(futures, "flight_treads_risers", config))
+    winder_key, (w_treads, w_risers) = run(
+        "winder_treads_risers", config, WINDER_SKIN_KEYS, lambda: _from_pool(futures, "winder_treads_risers", config))
+    framing_key, (sb_stringers, st_stringers, raw_carriages) = run(
+        "flight_framing", config, FLIGHT_FRAMING_KEYS, lambda: _from_pool(futures, "flight_framing", config))
+    corner_key, corner_stringers = run(
+        "corner_stringers", config, CORNER_STRINGER_KEYS,
+        lambda: _build_corner_stringers(config, volumetric), deps=(vol_key,))
+    plaster_key, plaster = run(
+        "plaster", config, PLASTER_KEYS,
+        lambda: _build_plaster(config, volumetric, soffit_cut), deps=(vol_key,))
+
+    all_treads = sb_treads + w_treads + st_treads
+    all_risers = sb_risers + w_risers + st_risers
+
+    # Restore strict boolean containment to prevent stringers/carriages from
+    # protruding through the plaster soffit at complex transitions (e.g. winder base).
+    def _trim():
+        print(f"  Trimming structural elements to volumetric envelope...")
+        return (_trim_to_envelope(sb_stringers + corner_stringers + st_stringers, volumetric, subtract_envelope=plaster),
+                _trim_to_envelope(raw_carriages, volumetric, subtract_envelope=plaster))
+
+    trim_key, (trimmed_stringers, all_carriages) = run(
+        "envelope_trim", config, [], _trim, deps=(framing_key, corner_key, vol_key, plaster_key))
+    _, all_stringers = run(
+        "routing", config, [], lambda: _route_stringers(trimmed_stringers, all_treads + all_risers),
+        deps=(trim_key, flight_key, winder_key))
 
     # Filter out empty geometry
     all_treads = [p for p in all_treads if p and len(p.solids()) > 0]
@@ -521,13 +698,12 @@ def build_structural_staircase(config):
           f"{len(all_stringers)} stringers, {len(all_carriages)} carriages, "
           f"1 plaster shell")
 
-    # -----------------------------------------------------------------------
-    # 6. ARCHITECTURAL ELEMENTS (Handrail, Balusters, Walkline)
-    # -----------------------------------------------------------------------
-    print(f"  Building architectural suite...")
-    handrail = build_handrail(config)
-    balusters = build_balusters(config)
-    walkline = build_walkline(config)
+    _, (handrail, balusters, walkline) = run(
+        "architectural", config, ARCHITECTURAL_KEYS,
+        lambda: _build_architectural(config) if not futures else (
+            _from_pool(futures, "handrail", config),
+            _from_pool(futures, "balusters", config),
+            _from_pool(futures, "walkline", config)))
 
     return {
         "treads": all_treads,
@@ -546,6 +722,7 @@ def build_structural_staircase(config):
 
 def display_structural(elements):
     """Show with skin at 50% alpha, structural at 100%."""
+    from ocp_vscode import show
     parts, names, colours, alphas = [], [], [], []
 
     def _add(category, items, colour, alpha):
@@ -573,6 +750,7 @@ def display_structural(elements):
 # ===========================================================================
 
 if __name__ == "__main__":
+    from ocp_vscode import show, set_port
     set_port(3939)
 
     parser = argparse.ArgumentParser(description="Structural Staircase Builder")
@@ -586,6 +764,7 @@ if __name__ == "__main__":
     parser.add_argument("--steps_top",    type=int,   default=DEFAULT_CONFIG["s_top_steps"])
     parser.add_argument("--waist",        type=float, default=DEFAULT_CONFIG["waist"], help="Distance from soffit to inner stair corner")
     parser.add_argument("--no_unified_soffit", action="store_true")
+    parser.add_argument("--workers",      type=int,   default=DEFAULT_BUILD_WORKERS, help="Process-pool size for independent stages (0/1 = serial)")
     args = parser.parse_args()
 
     config = DEFAULT_CONFIG.copy()
@@ -606,5 +785,5 @@ if __name__ == "__main__":
         show(stair, names=["Staircase (volumetric)"])
     else:
         print("Mode: STRUCTURAL")
-        elements = build_structural_staircase(config)
+        elements = build_structural_staircase(config, workers=args.workers)
         display_structural(elements)
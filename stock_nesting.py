@@ -0,0 +1,294 @@
+"""Material-aware nesting on mixed stock for Geometry Studio.
+Parts are grouped by the material their category is cut from (bom_export.MATERIAL_MAP)
+and every group is nested on its own stock list. Stock with a quantity is offcut
+inventory and is filled first; each unlimited sheet size then runs its own
+nesting search, every group and size at once on the shared search pool. The
+cheapest layout per group wins, after which each of its sheets moves onto cheaper
+stock if all of its parts still fit.
+"""
+import time
+import queue
+import threading
+
+from bom_export import MATERIAL_MAP
+from nesting_search import iter_search, search_budget
+from polygon_nesting import nest_parts_polygon, rotation_steps
+
+REFERENCE_SHEET = (2440.0, 1220.0)
+# Indicative price of one REFERENCE_SHEET per material; other sizes scale by area
+SHEET_PRICES = {
+    "20mm Timber": 95.0,
+    "50mm Structural": 240.0,
+    "18mm Plywood": 55.0,
+}
+
+MATERIALS = list(dict.fromkeys(MATERIAL_MAP.values()))
+
+
+def material_groups(categories):
+    """{material: [categories]} for the given categories, in first-seen order."""
+    groups = {}
+    for cat in categories:
+        groups.setdefault(MATERIAL_MAP.get(cat, cat), []).append(cat)
+    return groups
+
+
+def default_stock(material, sheet_width=REFERENCE_SHEET[0], sheet_height=REFERENCE_SHEET[1]):
+    """Unlimited full sheets of one size, priced from SHEET_PRICES."""
+    scale = sheet_width * sheet_height / (REFERENCE_SHEET[0] * REFERENCE_SHEET[1])
+    return [{"name": f"{sheet_width:g}x{sheet_height:g}", "width": float(sheet_width),
+             "height": float(sheet_height), "cost": round(SHEET_PRICES.get(material, 0.0) * scale, 2),
+             "quantity": None}]
+
+
+def normalize_stock(stock):
+    """Checked copies of stock entries ({width, height, cost, quantity, name}).
+
+    quantity None means unlimited sheets; a number is inventory on hand (offcuts).
+    Names default to the size. Raises ValueError for a bad or duplicated entry.
+    """
+    entries = []
+    for s in stock:
+        width, height = float(s["width"]), float(s["height"])
+        cost = float(s.get("cost") or 0.0)
+        quantity = s.get("quantity")
+        if width <= 0 or height <= 0 or cost < 0 or (quantity is not None and quantity < 0):
+            raise ValueError(f"Invalid stock entry {s}")
+        name = s.get("name") or f"{width:g}x{height:g}" + ("" if quantity is None else " offcut")
+        if any(e["name"] == name for e in entries):
+            raise ValueError(f"Duplicate stock name '{name}'")
+        entries.append({"name": name, "width": width, "height": height, "cost": cost,
+                        "quantity": None if quantity is None else int(quantity)})
+    if not entries:
+        raise ValueError("Stock list is empty")
+    return entries
+
+
+def stock_lists(stock=None, sheet_width=REFERENCE_SHEET[0], sheet_height=REFERENCE_SHEET[1]):
+    """{material: normalize_stock list} for every material. `stock` ({material: [entries]})
+    overrides the default sheet_width x sheet_height stock; raises ValueError for
+    an unknown material or a bad entry."""
+    stock = stock or {}
+    unknown = sorted(set(stock) - set(MATERIALS))
+    if unknown:
+        raise ValueError(f"Unknown stock material(s) {', '.join(unknown)}, expected {', '.join(sorted(MATERIALS))}")
+    return {m: normalize_stock(stock.get(m) or default_stock(m, sheet_width, sheet_height)) for m in MATERIALS}
+
+
+def _stock_sheets(result, stock, material):
+    return [dict(result["sheets"][str(n)], material=material, stock=stock["name"], width=stock["width"],
+                 height=stock["height"], cost=stock["cost"])
+            for n in range(result["sheet_count"])]
+
+
+def _sheet_used(sheet):
+    return sheet["efficiency"] / 100.0 * sheet["width"] * sheet["height"]
+
+
+def _rank(layout):
+    # Lower is better: unplaced parts, cost, stock area bought, then the emptiest sheet
+    sheets = layout["sheets"]
+    return (len(layout["unplaced"]), round(sum(s["cost"] for s in sheets), 2),
+            round(sum(s["width"] * s["height"] for s in sheets)), min((s["efficiency"] for s in sheets), default=0))
+
+
+def _fill_offcuts(parts, offcuts, material, spacing, rotations, nfp_cache):
+    """Nest parts onto limited inventory, largest offcut first; returns (sheets, remaining parts)."""
+    sheets = []
+    remaining = list(parts)
+    for stock in sorted(offcuts, key=lambda s: -s["width"] * s["height"]):
+        for _ in range(stock["quantity"]):
+            if not remaining:
+                break
+            result = nest_parts_polygon(remaining, stock["width"], stock["height"], spacing, rotations, nfp_cache,
+                                        max_sheets=1)
+            if not result["sheet_count"]:
+                break
+            sheets.extend(_stock_sheets(result, stock, material))
+            placed = {p["id"] for p in result["sheets"]["0"]["parts"]}
+            remaining = [p for p in remaining if p["id"] not in placed]
+    return sheets, remaining
+
+
+def _downsize(layout, parts, options, spacing, rotations, nfp_cache):
+    """Re-nest each sheet onto the cheapest unlimited stock that still takes all its parts."""
+    by_id = {p["id"]: p for p in parts}
+    sheets = list(layout["sheets"])
+    moved = 0
+    for n, sheet in enumerate(sheets):
+        cheaper = sorted((s for s in options if (s["cost"], s["width"] * s["height"])
+                          < (sheet["cost"], sheet["width"] * sheet["height"])),
+                         key=lambda s: (s["cost"], s["width"] * s["height"]))
+        sheet_parts = [by_id[p["id"]] for p in sheet["parts"] if p["id"] in by_id]
+        for stock in cheaper:
+            result = nest_parts_polygon(sheet_parts, stock["width"], stock["height"], spacing, rotations, nfp_cache,
+                                        max_sheets=1)
+            if result["sheet_count"] == 1 and not result["unplaced"]:
+                sheets[n] = _stock_sheets(result, stock, layout["material"])[0]
+                moved += 1
+                break
+    if not moved:
+        return layout
+    return dict(layout, sheets=sheets, algo=f"{layout['algo']}+downsized")
+
+
+def combine_layouts(layouts, elapsed=0.0):
+    """One nesting result from per-material layouts: every sheet numbered in turn (each
+    carrying its material, stock, size and cost), with totals per material and stock."""
+    sheets = [s for layout in layouts.values() for s in layout["sheets"]]
+    materials = {}
+    for material, layout in layouts.items():
+        stock = {}
+        for s in layout["sheets"]:
+            entry = stock.setdefault(s["stock"], {"width": s["width"], "height": s["height"], "sheets": 0, "cost": 0.0})
+            entry["sheets"] += 1
+            entry["cost"] = round(entry["cost"] + s["cost"], 2)
+        area = sum(s["width"] * s["height"] for s in layout["sheets"])
+        materials[material] = {
+            "algo": layout["algo"],
+            "sheet_count": len(layout["sheets"]),
+            "efficiency": round(sum(_sheet_used(s) for s in layout["sheets"]) / area * 100, 2) if area else 0,
+            "cost": round(sum(s["cost"] for s in layout["sheets"]), 2),
+            "unplaced": layout["unplaced"],
+            "stock": stock,
+        }
+    area = sum(s["width"] * s["height"] for s in sheets)
+    return {
+        "algo": ", ".join(dict.fromkeys(m["algo"] for m in materials.values())),
+        "efficiency": round(sum(_sheet_used(s) for s in sheets) / area * 100, 2) if area else 0,
+        "sheet_count": len(sheets),
+        "cost": round(sum(s["cost"] for s in sheets), 2),
+        "sheets": {str(n): s for n, s in enumerate(sheets)},
+        "unplaced": [name for layout in layouts.values() for name in layout["unplaced"]],
+        "materials": materials,
+        "seconds": round(elapsed, 3),
+    }
+
+
+def nesting_summary(result):
+    """Sheet counts, utilisation and cost of a combined layout, overall and per material
+    and stock (the sheets themselves left out), for manifests and estimates."""
+    return {
+        "algo": result["algo"],
+        "sheet_count": result["sheet_count"],
+        "efficiency": result["efficiency"],
+        "cost": result["cost"],
+        "unplaced": len(result["unplaced"]),
+        "materials": {m: {k: v for k, v in group.items() if k != "unplaced"}
+                      for m, group in result["materials"].items()},
+    }
+
+
+def _summary(result):
+    return {"algo": result["algo"], "sheet_count": result["sheet_count"], "efficiency": result["efficiency"],
+            "cost": result["cost"], "unplaced": len(result["unplaced"])}
+
+
+def _run_search(events, material, stock, search):
+    try:
+        for kind, value in search:
+            events.put((material, stock, kind, value))
+    except Exception as e:
+        events.put((material, stock, "error", e))
+    finally:
+        events.put((material, stock, "end", None))
+
+
+def iter_stock_nesting(groups, stock, mode="fast", time_budget=None, spacing=8.0, rotation_step=90,
+                       nfp_cache=None, pool=None, stop=None):
+    """Anytime material nesting: yields ("layout", result) whenever the combined layout
+    improves (once every group has one), then ("done", summary).
+
+    groups maps material -> part_data (ids unique across groups) and stock maps
+    material -> normalize_stock list. Each unlimited stock size of each group runs an
+    iter_search in its own thread on the shared pool; `stop` ends them all.
+    """
+    budget = search_budget(mode, time_budget)
+    start = time.time()
+    stop = stop or threading.Event()
+    rotations = rotation_steps(rotation_step)
+    events = queue.Queue()
+    best = {}
+    pending = set()
+    threads = []
+    for material, parts in groups.items():
+        options = stock[material]
+        offcut_sheets, remaining = _fill_offcuts(parts, [s for s in options if s["quantity"] is not None],
+                                                 material, spacing, rotations, nfp_cache)
+        best[material] = {"material": material, "algo": "offcuts", "sheets": offcut_sheets,
+                          "unplaced": [p["name"] for p in remaining], "offcuts": offcut_sheets}
+        unlimited = [s for s in options if s["quantity"] is None]
+        if remaining and unlimited:
+            pending.add(material)
+        for s in unlimited if remaining else []:
+            search = iter_search(remaining, s["width"], s["height"], mode, budget, spacing, rotation_step,
+                                 nfp_cache, pool, stop)
+            threads.append(threading.Thread(target=_run_search, args=(events, material, s, search), daemon=True))
+
+    searches = []
+    sent = finished = False
+    try:
+        for thread in threads:
+            thread.start()
+        running = len(threads)
+        while running:
+            material, s, kind, value = events.get()
+            if kind == "end":
+                running -= 1
+            elif kind == "error":
+                print(f"[ENGINE] Nesting {material} on {s['name']} failed: {value}")
+            elif kind == "done":
+                searches.append({"material": material, "stock": s["name"], "reason": value["reason"],
+                                 "layouts_run": value["layouts_run"], "best": value["best"]})
+            else:
+                current = best[material]
+                layout = dict(current, algo=f"{value['algo']}@{s['name']}",
+                              sheets=current["offcuts"] + _stock_sheets(value, s, material),
+                              unplaced=value["unplaced"])
+                if material in pending or _rank(layout) < _rank(current):
+                    pending.discard(material)
+                    best[material] = layout
+                    if not pending:
+                        sent = True
+                        yield "layout", combine_layouts(best, time.time() - start)
+        finished = True
+    finally:
+        if not finished:
+            stop.set()
+
+    changed = False
+    for material, parts in groups.items():
+        unlimited = [s for s in stock[material] if s["quantity"] is None]
+        layout = _downsize(best[material], parts, unlimited, spacing, rotations, nfp_cache)
+        changed = changed or layout is not best[material]
+        best[material] = layout
+    result = combine_layouts(best, time.time() - start)
+    if changed or not sent:
+        yield "layout", result
+
+    reasons = {s["reason"] for s in searches}
+    reason = next((r for r in ("stopped", "budget") if r in reasons), "exhausted")
+    print(f"[ENGINE] Material nesting ({mode}, {reason}): {len(groups)} materials, {len(searches)} searches, "
+          f"{result['sheet_count']} sheets costing {result['cost']:.2f}")
+    yield "done", {
+        "mode": mode,
+        "budget_s": budget,
+        "elapsed_s": round(time.time() - start, 3),
+        "reason": reason,
+        "layouts_run": sum(s["layouts_run"] for s in searches),
+        "searches": searches,
+        "best": _summary(result),
+    }
+
+
+def nest_stock(groups, stock, mode="fast", time_budget=None, spacing=8.0, rotation_step=90,
+               nfp_cache=None, pool=None):
+    """Best combined layout from iter_stock_nesting, with its summary under "search"."""
+    best = None
+    for kind, value in iter_stock_nesting(groups, stock, mode, time_budget, spacing, rotation_step,
+                                          nfp_cache, pool):
+        if kind == "layout":
+            best = value
+        else:
+            best = dict(best, search=value)
+    return best
@@ -10,6 +10,7 @@ import struct
 import base64
 import zipfile
 import io
+import time
 import pytest
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -197,6 +198,178 @@ class TestGenerate:
         assert indices == list(range(len(indices))), f"Non-contiguous mesh indices: {indices}"
 
 
+    def test_generate_sets_etag(self):
+        r = client.post("/generate", json=MINIMAL_STRUCTURAL_CONFIG)
+        assert r.headers.get("etag")
+
+    def test_if_none_match_returns_304(self):
+        """Re-requesting a design the client already holds is a bodiless 304."""
+        etag = client.post("/generate", json=MINIMAL_STRUCTURAL_CONFIG).headers["etag"]
+        r = client.post("/generate", json=MINIMAL_STRUCTURAL_CONFIG, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+
+    def test_etag_changes_with_config(self):
+        a = client.post("/generate", json=MINIMAL_STRUCTURAL_CONFIG).headers["etag"]
+        changed = {**MINIMAL_STRUCTURAL_CONFIG, "plaster_thickness": 12}
+        b = client.post("/generate", json=changed, headers={"If-None-Match": a})
+        assert b.status_code == 200
+        assert b.headers["etag"] != a
+
+    def test_binary_glb_carries_manifest_in_extras(self):
+        r = client.post("/generate?format=glb", json=MINIMAL_STRUCTURAL_CONFIG)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "model/gltf-binary"
+        assert r.content[:4] == b"glTF"
+        json_len = struct.unpack("<I", r.content[12:16])[0]
+        gltf = json.loads(r.content[20:20 + json_len])
+        assert gltf["extras"]["manifest"]["categories"]
+        assert "treads" in gltf["extras"]["styles"]
+
+    def test_accept_header_selects_binary(self):
+        r = client.post("/generate", json=MINIMAL_STRUCTURAL_CONFIG, headers={"Accept": "model/gltf-binary"})
+        assert r.content[:4] == b"glTF"
+
+    def test_gzip_negotiated(self):
+        r = client.post("/generate?format=glb", json=MINIMAL_STRUCTURAL_CONFIG,
+                        headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.content[:4] == b"glTF"  # transparently decoded by the client
+        plain = client.post("/generate?format=glb", json=MINIMAL_STRUCTURAL_CONFIG,
+                            headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["etag"] != r.headers["etag"]
+
+    def test_lod_tiers_are_separate_representations(self):
+        preview = client.post("/generate?format=glb&lod=preview", json=MINIMAL_STRUCTURAL_CONFIG)
+        fine = client.post("/generate?format=glb&lod=fabrication", json=MINIMAL_STRUCTURAL_CONFIG)
+        assert preview.status_code == fine.status_code == 200
+        assert preview.headers["etag"] != fine.headers["etag"]
+        assert len(preview.content) <= len(fine.content)
+
+    def test_progressive_serves_preview_then_refines(self):
+        """Preview GLB first, refined tier from the job; part_N node names match across tiers."""
+        import time
+
+        def gltf_json(data):
+            json_len = struct.unpack("<I", data[12:16])[0]
+            return json.loads(data[20:20 + json_len])
+
+        config = {**MINIMAL_STRUCTURAL_CONFIG, "width": 655}
+        r = client.post("/generate?format=glb&lod=standard&progressive=true", json=config)
+        assert r.status_code == 200
+        job_id = r.headers["x-refine-job"]
+        preview = gltf_json(r.content)
+        assert preview["extras"]["lod"] == "preview"
+
+        for _ in range(120):
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.5)
+        assert status["status"] == "done"
+        refined = gltf_json(client.get(f"/jobs/{job_id}/result").content)
+        assert refined["extras"]["lod"] == "standard"
+        assert [n["name"] for n in refined["nodes"]] == [n["name"] for n in preview["nodes"]]
+
+        # Once refined, the same request is served at the requested tier directly
+        again = client.post("/generate?format=glb&lod=standard&progressive=true", json=config)
+        assert "x-refine-job" not in again.headers
+        assert again.headers["etag"] == r.headers["x-refine-etag"]
+
+    def test_quantized_glb_is_smaller(self):
+        plain = client.post("/generate?format=glb", json=MINIMAL_STRUCTURAL_CONFIG,
+                            headers={"Accept-Encoding": "identity"})
+        quantized = client.post("/generate?format=glb&quantize=true", json=MINIMAL_STRUCTURAL_CONFIG,
+                                headers={"Accept-Encoding": "identity"})
+        assert quantized.status_code == 200
+        assert quantized.headers["etag"] != plain.headers["etag"]
+        assert len(quantized.content) < 0.7 * len(plain.content)
+
+    def test_delta_returns_only_changed_parts(self):
+        base = client.post("/generate?format=glb", json=MINIMAL_STRUCTURAL_CONFIG)
+        changed = {**MINIMAL_STRUCTURAL_CONFIG, "plaster_thickness": 14}
+        r = client.post(f"/generate/delta?base={base.headers['x-config-key']}", json=changed)
+        assert r.status_code == 200
+        json_len = struct.unpack("<I", r.content[12:16])[0]
+        gltf = json.loads(r.content[20:20 + json_len])
+        delta = gltf["extras"]["delta"]
+        assert any(pid.startswith("plaster") for pid in delta["replaced"])
+        assert not any(pid.startswith("treads") for pid in delta["replaced"])
+        assert delta["unchanged"] > 0
+        assert len(gltf.get("nodes", [])) == len(delta["added"]) + len(delta["replaced"])
+
+    def test_delta_with_unknown_base_returns_409(self):
+        r = client.post("/generate/delta?base=deadbeef", json=MINIMAL_STRUCTURAL_CONFIG)
+        assert r.status_code == 409
+
+    def test_unknown_lod_returns_400(self):
+        r = client.post("/generate?lod=ultra", json=MINIMAL_STRUCTURAL_CONFIG)
+        assert r.status_code == 400
+
+    def test_saturated_pool_returns_503(self, monkeypatch):
+        """When the compute pool is full the client gets a retry hint instead of queueing forever."""
+        from api import COMPUTE_POOL
+        from compute_pool import PoolSaturated
+
+        def saturated(*args, **kwargs):
+            raise PoolSaturated(7)
+
+        monkeypatch.setattr(COMPUTE_POOL, "submit", saturated)
+        r = client.post("/generate", json={**MINIMAL_STRUCTURAL_CONFIG, "width": 612})
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == "7"
+
+
+class TestBatch:
+    def test_grid_streams_one_result_per_variant(self):
+        grid = {"width": [800, 860], "winder_steps": [3]}
+        r = client.post("/generate/batch", json={"base": MINIMAL_STRUCTURAL_CONFIG, "grid": grid,
+                                                 "include_glb": True})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(l) for l in r.text.splitlines() if l.strip()]
+        assert lines[0] == {"type": "batch", "count": 2}
+        assert lines[-1]["type"] == "done" and lines[-1]["failed"] == 0
+        results = [l for l in lines if l["type"] == "result"]
+        assert sorted(l["index"] for l in results) == [0, 1]
+        for result in results:
+            assert result["volume_mm3"] > 0
+            assert result["nesting"]["sheet_count"] >= 1
+        glb = client.get(results[0]["glb_url"])
+        assert glb.status_code == 200 and glb.content[:4] == b"glTF"
+
+    def test_empty_batch_rejected(self):
+        r = client.post("/generate/batch", json={})
+        assert r.status_code == 400
+
+
+class TestCoalescing:
+    def test_concurrent_identical_work_runs_once(self):
+        """Concurrent callers with one key share a single pool job and its result."""
+        import asyncio
+        import threading
+        from api import _single_flight
+
+        calls = []
+        release = threading.Event()
+
+        def slow_build(x):
+            calls.append(x)
+            release.wait(5)
+            return x * 2
+
+        async def scenario():
+            a = asyncio.ensure_future(_single_flight(("test", "k"), slow_build, 21))
+            b = asyncio.ensure_future(_single_flight(("test", "k"), slow_build, 21))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(a, b)
+
+        assert asyncio.run(scenario()) == [42, 42]
+        assert len(calls) == 1
+
+
 # ===========================================================================
 # POST /export/autocad
 # ===========================================================================
@@ -237,6 +410,55 @@ class TestAutoCADExport:
             assert "categories" in manifest
 
 
+# ===========================================================================
+# POST /export/bundle
+# ===========================================================================
+
+class TestBundleExport:
+    def test_bundle_contains_every_output(self):
+        r = client.post("/export/bundle", json={"config": MINIMAL_STRUCTURAL_CONFIG})
+        assert r.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            names = zf.namelist()
+            for expected in ("staircase.glb", "bom.csv", "profiles.dxf", "nested.dxf", "manifest.json"):
+                assert expected in names, f"{expected} missing from {names}"
+            assert any(n.startswith("step/") for n in names)
+            manifest = json.loads(zf.read("manifest.json"))
+            assert manifest["nesting"]["sheet_count"] >= 1
+            assert zf.read("staircase.glb")[:4] == b"glTF"
+
+    def test_bundle_nests_by_material_like_cnc_nest(self):
+        body = {"config": MINIMAL_STRUCTURAL_CONFIG, "categories": ["treads", "stringers"],
+                "stock": {"50mm Structural": [{"width": 3050, "height": 1220, "cost": 300}]}}
+        r = client.post("/export/bundle", json=body)
+        assert r.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+            nesting = json.loads(zf.read("manifest.json"))["nesting"]
+        assert set(nesting["materials"]) == {"20mm Timber", "50mm Structural"}
+        assert set(nesting["materials"]["50mm Structural"]["stock"]) == {"3050x1220"}
+        assert nesting["cost"] == pytest.approx(sum(m["cost"] for m in nesting["materials"].values()))
+
+    def test_bundle_traces_each_split_once(self):
+        """Profiles at the sheet width plus stringers at their 3050 stock: nothing is traced twice."""
+        from exporters import PROFILE_CACHE, PROFILE_CATEGORIES
+
+        body = {"config": {**MINIMAL_STRUCTURAL_CONFIG, "width": 660}, "categories": ["treads", "stringers"],
+                "stock": {"50mm Structural": [{"width": 3050, "height": 1220, "cost": 300}]}}
+        misses = PROFILE_CACHE.stats()["misses"]
+        assert client.post("/export/bundle", json=body).status_code == 200
+        assert PROFILE_CACHE.stats()["misses"] - misses == len(PROFILE_CATEGORIES) + 1
+
+    def test_bundle_builds_geometry_once(self):
+        """A bundle after /generate reuses the cached model instead of rebuilding."""
+        from api import GEOMETRY_CACHE
+
+        config = {**MINIMAL_STRUCTURAL_CONFIG, "width": 640}
+        client.post("/generate", json=config)
+        misses = GEOMETRY_CACHE.stats()["misses"]
+        client.post("/export/bundle", json={"config": config})
+        assert GEOMETRY_CACHE.stats()["misses"] == misses
+
+
 # ===========================================================================
 # POST /export/dxf
 # ===========================================================================
@@ -302,6 +524,107 @@ class TestCNCNest:
         # Accept any response — the key assertion is that the server doesn't hang
         assert r.status_code in (200, 400, 500)
 
+    def test_nest_true_shape_with_rotation_step(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "rotation_step": 45,
+        })
+        assert r.status_code == 200
+        data = r.json()
+        assert 0 < data["efficiency"] <= 100
+        parts = [p for s in data["sheets"].values() for p in s["parts"]]
+        assert parts and all("rotation" in p and "inner" in p for p in parts)
+
+    def test_nest_rejects_tiny_rotation_step(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "rotation_step": 0.01,
+        })
+        assert r.status_code == 422
+
+    def test_nest_search_mode(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "mode": "thorough",
+            "time_budget": 2,
+        })
+        assert r.status_code == 200
+        search = r.json()["search"]
+        assert search["mode"] == "thorough" and search["budget_s"] == 2
+        assert search["layouts_run"] >= 1
+
+    def test_nest_streams_improving_layouts(self):
+        r = client.post("/cnc/nest?stream=true", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "time_budget": 1,
+        })
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(l) for l in r.text.splitlines() if l.strip()]
+        assert lines[0]["type"] == "search" and lines[0]["search_id"]
+        layouts = [l for l in lines if l["type"] == "layout"]
+        assert layouts and layouts[0]["seq"] == 1
+        assert lines[-1]["type"] == "done"
+        assert lines[-1]["best"]["sheet_count"] == layouts[-1]["sheet_count"]
+
+    def test_stop_ends_streaming_search_with_its_best_layout(self):
+        start = time.time()
+        with client.stream("POST", "/cnc/nest?stream=true", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "mode": "thorough",
+            "time_budget": 60,
+        }) as r:
+            lines = r.iter_lines()
+            search = json.loads(next(lines))
+            assert client.post(f"/cnc/nest/{search['search_id']}/stop").status_code == 200
+            rest = [json.loads(l) for l in lines if l.strip()]
+        assert time.time() - start < 30
+        assert rest[-1]["type"] == "done" and rest[-1]["reason"] == "stopped"
+        assert client.post(f"/cnc/nest/{search['search_id']}/stop").status_code == 404
+
+    def test_stop_unknown_search_returns_404(self):
+        r = client.post("/cnc/nest/not-a-search/stop")
+        assert r.status_code == 404
+
+    def test_nest_groups_parts_by_material_and_stock(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads", "stringers"],
+            "stock": {"50mm Structural": [
+                {"width": 3050, "height": 1220, "cost": 300},
+                {"name": "offcut A", "width": 1200, "height": 600, "quantity": 1},
+            ]},
+        })
+        assert r.status_code == 200
+        data = r.json()
+        assert set(data["materials"]) == {"20mm Timber", "50mm Structural"}
+        sheets = list(data["sheets"].values())
+        assert all(s["stock"] in ("3050x1220", "offcut A") for s in sheets if s["material"] == "50mm Structural")
+        assert data["cost"] == pytest.approx(sum(s["cost"] for s in sheets))
+        assert data["sheet_count"] == sum(st["sheets"] for m in data["materials"].values()
+                                          for st in m["stock"].values())
+
+    def test_nest_rejects_unknown_stock_material(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "stock": {"Oak": [{"width": 2440, "height": 1220}]},
+        })
+        assert r.status_code == 400
+
+    def test_nest_rejects_unknown_mode(self):
+        r = client.post("/cnc/nest", json={
+            "config": MINIMAL_STRUCTURAL_CONFIG,
+            "categories": ["treads"],
+            "mode": "exhaustive",
+        })
+        assert r.status_code == 400
+
 
 # ===========================================================================
 # POST /cnc/export-dxf
@@ -0,0 +1,65 @@
+"""Batch grid expansion and export bookkeeping tests (no geometry is built)."""
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch
+from batch import estimate, expand_grid, outputs_key, row_config, row_names, up_to_date
+from brep_cache import load_configs
+from geometry_cache import GeometryCache
+
+
+class TestExpandGrid:
+    def test_every_combination_last_key_fastest(self):
+        configs = expand_grid({"rise": 220}, {"width": [800, 900], "winder_steps": [2, 3]})
+        assert [(c["width"], c["winder_steps"]) for c in configs] == [(800, 2), (800, 3), (900, 2), (900, 3)]
+        assert all(c["rise"] == 220 for c in configs)
+
+    def test_grid_overrides_base(self):
+        assert expand_grid({"width": 700}, {"width": [1000]}) == [{"width": 1000}]
+
+    def test_empty_value_list_gives_no_configs(self):
+        assert expand_grid({}, {"width": []}) == []
+
+
+class TestExportRows:
+    def test_row_names_use_label_columns_and_stay_unique(self):
+        rows = [{"id": "A/1"}, {"name": "shop"}, {"width": 900}, {"id": "shop"}]
+        assert row_names(rows) == ["A_1", "shop", "row_0003", "shop_0004"]
+
+    def test_label_columns_are_not_config(self):
+        assert row_config({"id": "a", "name": "b", "width": 900}) == {"width": 900}
+
+    def test_csv_rows_are_typed_and_blank_cells_skipped(self, tmp_path):
+        path = tmp_path / "rows.csv"
+        path.write_text("id,width,rise,unified_soffit,waist\nr1,900,187.5,true,\n")
+        assert load_configs(str(path)) == [{"id": "r1", "width": 900, "rise": 187.5, "unified_soffit": True}]
+
+    def test_up_to_date_needs_matching_key_and_files(self, tmp_path):
+        key = outputs_key("abc", ["glb", "bom"], "fabrication", 2440, 1220, ["treads"])
+        assert key != outputs_key("abc", ["glb"], "fabrication", 2440, 1220, ["treads"])
+        stock = {"20mm Timber": [{"width": 3050, "height": 1220, "cost": 120}]}
+        assert key != outputs_key("abc", ["glb", "bom"], "fabrication", 2440, 1220, ["treads"], stock)
+        (tmp_path / "bom.csv").write_text("x")
+        (tmp_path / "manifest.json").write_text(json.dumps({"outputs_key": key, "files": ["bom.csv"]}))
+        assert up_to_date(str(tmp_path), key) is not None
+        assert up_to_date(str(tmp_path), "other") is None
+        (tmp_path / "bom.csv").unlink()
+        assert up_to_date(str(tmp_path), key) is None
+
+
+class TestWorkerBuilds:
+    def test_variant_builds_stay_serial_inside_the_batch_pool(self, monkeypatch):
+        """The batch pool is the only level of parallelism: no build pool per worker."""
+        seen = []
+
+        def builder(config, workers=None):
+            seen.append(workers)
+            return {}
+
+        monkeypatch.setenv("STUDIO_BUILD_WORKERS", "4")
+        monkeypatch.setattr(batch, "_WORKER_CACHE", GeometryCache({"width": 800.0}, builder))
+        estimate({"width": 900, "build_workers": 4}, [], [], 2440, 1220)
+        assert seen == [1]
@@ -0,0 +1,245 @@
+"""Cache layer tests for the Parametric Staircase Studio.
+
+Covers config canonicalisation and the in-process geometry cache using stand-in
+builders, so no OCCT geometry is constructed.
+"""
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry_cache import GeometryCache, config_hash, normalize_config
+from brep_cache import BrepDiskCache, pack_shapes, unpack_shapes
+
+
+DEFAULTS = {"width": 800.0, "rise": 220.0, "s_bottom_steps": 3, "unified_soffit": False}
+
+
+class _FakeBuilder:
+    """Counts calls and returns a small elements dict."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, config):
+        self.calls += 1
+        return {"treads": [object() for _ in range(config["s_bottom_steps"])]}
+
+
+# ===========================================================================
+# CONFIG HASHING
+# ===========================================================================
+
+class TestConfigHash:
+    def test_int_and_float_hash_equal(self):
+        """800 and 800.0 describe the same staircase."""
+        assert config_hash({"width": 800}, DEFAULTS) == config_hash({"width": 800.0}, DEFAULTS)
+
+    def test_key_order_irrelevant(self):
+        a = config_hash({"width": 900, "rise": 200}, DEFAULTS)
+        b = config_hash({"rise": 200, "width": 900}, DEFAULTS)
+        assert a == b
+
+    def test_model_type_ignored(self):
+        a = config_hash({"model_type": "structural", "width": 900}, DEFAULTS)
+        b = config_hash({"model_type": "volumetric", "width": 900}, DEFAULTS)
+        assert a == b
+
+    def test_none_falls_back_to_default(self):
+        assert config_hash({"width": None}, DEFAULTS) == config_hash({}, DEFAULTS)
+
+    def test_geometry_change_changes_hash(self):
+        assert config_hash({"width": 900}, DEFAULTS) != config_hash({"width": 901}, DEFAULTS)
+
+    def test_builder_version_changes_hash(self):
+        """Keys persisted by an older builder must not match the new one's."""
+        a = config_hash({"width": 900}, DEFAULTS, version="s1")
+        b = config_hash({"width": 900}, DEFAULTS, version="s2")
+        assert a != b
+        assert GeometryCache(DEFAULTS, version="s2").key_for({"width": 900}) == b
+
+    def test_strict_ignores_unknown_keys(self):
+        """Volumetric hashing ignores structural-only keys it never reads."""
+        a = config_hash({"nosing": 20}, DEFAULTS, strict=True)
+        b = config_hash({"nosing": 35}, DEFAULTS, strict=True)
+        assert a == b
+
+    def test_normalize_fills_defaults(self):
+        cfg = normalize_config({"width": 700, "model_type": "structural"}, DEFAULTS)
+        assert cfg["width"] == 700
+        assert cfg["rise"] == 220.0
+        assert "model_type" not in cfg
+
+
+# ===========================================================================
+# GEOMETRY CACHE
+# ===========================================================================
+
+class TestGeometryCache:
+    def test_repeat_request_builds_once(self):
+        cache = GeometryCache(DEFAULTS)
+        builder = _FakeBuilder()
+        cache.get_or_build({"width": 800}, builder)
+        cache.get_or_build({"width": 800.0, "model_type": "structural"}, builder)
+        assert builder.calls == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_returned_lists_are_copies(self):
+        """Mutating a returned category list must not corrupt the cached entry."""
+        cache = GeometryCache(DEFAULTS)
+        builder = _FakeBuilder()
+        _, first = cache.get_or_build({}, builder)
+        first["treads"].clear()
+        _, second = cache.get_or_build({}, builder)
+        assert len(second["treads"]) == 3
+
+    def test_lru_entry_limit(self):
+        cache = GeometryCache(DEFAULTS, max_entries=2)
+        builder = _FakeBuilder()
+        for w in (700, 800, 900):
+            cache.get_or_build({"width": w}, builder)
+        cache.get_or_build({"width": 700}, builder)
+        assert builder.calls == 4
+        assert cache.stats()["entries"] == 2
+
+    def test_byte_budget_keeps_newest(self):
+        """An entry larger than the budget evicts everything else but itself survives."""
+        cache = GeometryCache(DEFAULTS, max_bytes=1)
+        builder = _FakeBuilder()
+        cache.get_or_build({"width": 700}, builder)
+        cache.get_or_build({"width": 800}, builder)
+        assert cache.stats()["entries"] == 1
+        cache.get_or_build({"width": 800}, builder)
+        assert builder.calls == 2
+
+    def test_build_workers_reach_builder_but_not_hash(self):
+        seen = []
+
+        def builder(config, workers=None):
+            seen.append((workers, "build_workers" in config))
+            return {"treads": []}
+
+        cache = GeometryCache(DEFAULTS)
+        cache.get_or_build({"width": 800, "build_workers": 3}, builder)
+        cache.get_or_build({"width": 800, "build_workers": 1}, builder)
+        cache.get_or_build({"width": 900}, builder, workers=2)
+        assert seen == [(3, False), (2, False)]
+
+    def test_build_workers_size_the_structural_build_pool(self, monkeypatch):
+        import staircase_structural
+        from geometry_cache import structural_cache
+
+        class Submitted(Exception):
+            pass
+
+        pools = []
+
+        def submit(config, workers):
+            pools.append(workers)
+            raise Submitted
+
+        monkeypatch.setattr(staircase_structural, "DEFAULT_BUILD_WORKERS", 0)
+        monkeypatch.setattr(staircase_structural, "_submit_independent", submit)
+        with pytest.raises(Submitted):
+            structural_cache().get_or_build({"build_workers": 3})
+        assert pools == [3]
+
+    def test_build_pool_is_shared_whatever_the_count(self, monkeypatch):
+        import staircase_structural
+
+        created = []
+
+        class FakePool:
+            def __init__(self, max_workers, mp_context):
+                created.append(max_workers)
+                self.stopped = False
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                self.stopped = True
+
+        monkeypatch.setattr(staircase_structural, "ProcessPoolExecutor", FakePool)
+        monkeypatch.setattr(staircase_structural, "_BUILD_POOL", None)
+        pool = staircase_structural._build_pool(2)
+        assert staircase_structural._build_pool(3) is pool and staircase_structural._build_pool(4) is pool
+        assert created == [2]
+        staircase_structural.shutdown_build_pool()
+        assert pool.stopped and staircase_structural._BUILD_POOL is None
+
+
+# ===========================================================================
+# BREP DISK CACHE
+# ===========================================================================
+
+class TestBrepDiskCache:
+    def test_round_trip_preserves_categories(self, tmp_path):
+        from build123d import Box
+
+        disk = BrepDiskCache(str(tmp_path), namespace="structural")
+        disk.put("abc", {"treads": [Box(100, 50, 20), Box(100, 50, 20)], "plaster": []})
+        loaded = disk.get("abc")
+        assert len(loaded["treads"]) == 2
+        assert loaded["plaster"] == []
+        assert abs(loaded["treads"][0].volume - 100 * 50 * 20) < 1e-3
+
+    def test_hit_miss_counters(self, tmp_path):
+        from build123d import Box
+
+        disk = BrepDiskCache(str(tmp_path))
+        assert disk.get("missing") is None
+        disk.put("k", {"treads": [Box(10, 10, 10)]})
+        disk.get("k")
+        stats = disk.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_size_bound_evicts_oldest(self, tmp_path):
+        from build123d import Box
+
+        disk = BrepDiskCache(str(tmp_path), max_bytes=1)
+        disk.put("old", {"treads": [Box(10, 10, 10)]})
+        disk.put("new", {"treads": [Box(10, 10, 10)]})
+        assert disk.get("old") is None
+        assert disk.get("new") is not None
+
+    def test_memory_miss_falls_through_to_disk(self, tmp_path):
+        """A fresh in-process cache (e.g. after restart) loads from disk instead of rebuilding."""
+        from build123d import Box
+
+        disk = BrepDiskCache(str(tmp_path))
+        calls = []
+
+        def builder(config):
+            calls.append(config)
+            return {"treads": [Box(10, 10, 10)]}
+
+        GeometryCache(DEFAULTS, builder, disk).get_or_build({"width": 900})
+        GeometryCache(DEFAULTS, builder, disk).get_or_build({"width": 900})
+        assert len(calls) == 1
+
+
+# ===========================================================================
+# PROCESS-BOUNDARY SERIALISATION
+# ===========================================================================
+
+class TestPackShapes:
+    def test_nested_structure_round_trips(self):
+        from build123d import Box
+
+        value = ([Box(10, 10, 10), Box(20, 10, 10)], None, Box(5, 5, 5))
+        skeleton, data = pack_shapes(value)
+        parts, empty, single = unpack_shapes(skeleton, data)
+        assert len(parts) == 2
+        assert empty is None
+        assert abs(parts[1].volume - 2000) < 1e-3
+        assert abs(single.volume - 125) < 1e-3
+
+    def test_shared_prototype_stays_shared(self):
+        """Located instances of one prototype come back referencing one TShape."""
+        from build123d import Box, Pos
+
+        proto = Box(10, 10, 10)
+        skeleton, data = pack_shapes([proto.moved(Pos(0, 0, 0)), proto.moved(Pos(50, 0, 0))])
+        a, b = unpack_shapes(skeleton, data)
+        assert a.wrapped.IsPartner(b.wrapped)
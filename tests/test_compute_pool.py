@@ -0,0 +1,57 @@
+"""Compute pool tests: admission control and timeouts, using plain Python jobs."""
+import sys
+import os
+import time
+import asyncio
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compute_pool import ComputePool, PoolSaturated
+
+
+class TestComputePool:
+    def test_run_returns_result(self):
+        pool = ComputePool(workers=1, max_queue=0, timeout=5)
+        assert asyncio.run(pool.run(lambda a, b: a + b, 2, 3)) == 5
+        assert pool.stats()["completed"] == 1
+
+    def test_rejects_when_saturated(self):
+        """workers + max_queue jobs are admitted; the next one gets a retry hint."""
+        pool = ComputePool(workers=1, max_queue=1, timeout=5)
+        release = threading.Event()
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(PoolSaturated) as exc:
+            pool.submit(release.wait)
+        assert exc.value.retry_after >= 1
+        assert pool.stats()["rejected"] == 1
+        release.set()
+
+    def test_timeout_leaves_job_running(self):
+        pool = ComputePool(workers=1, max_queue=0, timeout=0.05)
+        done = threading.Event()
+
+        def slow():
+            time.sleep(0.2)
+            done.set()
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.run(slow))
+        assert done.wait(2)
+        assert pool.stats()["timeouts"] == 1
+
+    def test_event_loop_stays_responsive(self):
+        """A long job doesn't stop other coroutines from running."""
+        pool = ComputePool(workers=1, max_queue=0, timeout=5)
+
+        async def scenario():
+            job = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+            start = time.time()
+            await asyncio.sleep(0.01)
+            tick = time.time() - start
+            await job
+            return tick
+
+        assert asyncio.run(scenario()) < 0.1
@@ -223,6 +223,29 @@ class TestStructuralBuilder:
         
         assert len(result_large["treads"]) > len(result_small["treads"])
 
+    def test_plaster_edit_reuses_tread_stage(self):
+        """Changing plaster_thickness must not rebuild treads (stage memoisation)."""
+        first = build_structural_staircase(self._make_config(plaster_thickness=10))
+        second = build_structural_staircase(self._make_config(plaster_thickness=15))
+        assert first["treads"][0] is second["treads"][0]
+        assert first["plaster"][0] is not second["plaster"][0]
+
+    def test_stage_keys_isolate_subsystems(self):
+        """Nosing feeds the treads but not the volumetric reference."""
+        from staircase_structural import VOLUMETRIC_KEYS, FLIGHT_SKIN_KEYS, PLASTER_KEYS
+        assert "nosing" not in VOLUMETRIC_KEYS
+        assert "nosing" in FLIGHT_SKIN_KEYS
+        assert "plaster_thickness" not in FLIGHT_SKIN_KEYS
+        assert PLASTER_KEYS == ["plaster_thickness"]
+
+    def test_flight_treads_share_prototype(self):
+        """Straight-flight treads are located instances of one TShape, not copies."""
+        result = build_structural_staircase(self._make_config(s_bottom_steps=4, s_top_steps=4))
+        treads = result["treads"]
+        assert treads[0].wrapped.IsPartner(treads[1].wrapped)
+        assert not treads[0].wrapped.IsSame(treads[1].wrapped)
+        assert abs(treads[0].volume - treads[1].volume) < 1e-6
+
     def test_stress_extreme_small(self):
         """Extreme small parameters don't crash."""
         config = self._make_config(
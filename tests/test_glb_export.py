@@ -0,0 +1,246 @@
+"""In-memory GLB writer tests.
+
+GlbWriter and the normal computation run on synthetic NumPy arrays; the
+tessellation tests need build123d.
+"""
+import sys
+import os
+import json
+import struct
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glb_export import (GlbWriter, vertex_normals, categories_to_glb, optimize_mesh, vertex_cache_order,
+                        node_digests, subset_glb)
+
+
+def _parse_glb(data):
+    magic, version, length = struct.unpack("<III", data[:12])
+    assert magic == 0x46546C67 and version == 2 and length == len(data)
+    json_len, json_type = struct.unpack("<II", data[12:20])
+    assert json_type == 0x4E4F534A
+    gltf = json.loads(data[20:20 + json_len])
+    bin_start = 20 + json_len
+    bin_len, bin_type = struct.unpack("<II", data[bin_start:bin_start + 8])
+    assert bin_type == 0x004E4942
+    return gltf, data[bin_start + 8:bin_start + 8 + bin_len]
+
+
+TRIANGLE = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+TRIANGLE_INDICES = np.array([[0, 1, 2]], dtype=np.uint32)
+
+
+class TestGlbWriter:
+    def test_container_is_valid_and_aligned(self):
+        writer = GlbWriter()
+        material = writer.add_material("treads", (0.5, 0.4, 0.3), 0.5)
+        prim = writer.primitive(TRIANGLE, vertex_normals(TRIANGLE, TRIANGLE_INDICES), TRIANGLE_INDICES, material)
+        writer.add_node("part_0", writer.add_mesh("mesh_0", [prim]))
+        data = writer.to_bytes()
+
+        assert len(data) % 4 == 0
+        gltf, bin_chunk = _parse_glb(data)
+        assert gltf["buffers"][0]["byteLength"] == len(bin_chunk)
+        assert gltf["nodes"][0] == {"name": "part_0", "mesh": 0}
+        assert gltf["materials"][0]["alphaMode"] == "BLEND"
+        for view in gltf["bufferViews"]:
+            assert view["byteOffset"] % 4 == 0
+
+    def test_position_bounds_and_positions_round_trip(self):
+        writer = GlbWriter()
+        prim = writer.primitive(TRIANGLE, vertex_normals(TRIANGLE, TRIANGLE_INDICES), TRIANGLE_INDICES)
+        writer.add_node("model", writer.add_mesh("model", [prim]))
+        gltf, bin_chunk = _parse_glb(writer.to_bytes())
+
+        accessor = gltf["accessors"][prim["attributes"]["POSITION"]]
+        assert accessor["min"] == [0, 0, 0] and accessor["max"] == [1, 1, 0]
+        view = gltf["bufferViews"][accessor["bufferView"]]
+        raw = bin_chunk[view["byteOffset"]:view["byteOffset"] + view["byteLength"]]
+        assert np.array_equal(np.frombuffer(raw, dtype=np.float32).reshape(-1, 3), TRIANGLE)
+        assert "materials" not in gltf
+
+    def test_normals_follow_winding(self):
+        normals = vertex_normals(TRIANGLE, TRIANGLE_INDICES)
+        assert np.allclose(normals, [[0, 0, 1]] * 3)
+
+
+class TestSubset:
+    def _two_part_glb(self, offset=0.0):
+        writer = GlbWriter()
+        material = writer.add_material("treads", (0.5, 0.4, 0.3))
+        for i, shift in enumerate((0.0, 5.0 + offset)):
+            positions = TRIANGLE + np.float32(shift)
+            prim = writer.primitive(positions, vertex_normals(positions, TRIANGLE_INDICES), TRIANGLE_INDICES, material)
+            writer.add_node(f"part_{i}", writer.add_mesh(f"mesh_{i}", [prim]))
+        writer.gltf["extras"] = {"manifest": {}}
+        return writer.to_bytes()
+
+    def test_digests_track_geometry_only(self):
+        a, b = node_digests(self._two_part_glb()), node_digests(self._two_part_glb(offset=1.0))
+        assert a["part_0"] == b["part_0"]
+        assert a["part_1"] != b["part_1"]
+
+    def test_subset_keeps_named_nodes_and_their_data(self):
+        data = self._two_part_glb()
+        subset = subset_glb(data, ["part_1"], extras={"delta": True})
+        gltf, _ = _parse_glb(subset)
+        assert [n["name"] for n in gltf["nodes"]] == ["part_1"]
+        assert gltf["extras"] == {"delta": True}
+        assert len(gltf["materials"]) == 1
+        assert node_digests(subset)["part_1"] == node_digests(data)["part_1"]
+
+
+class TestQuantization:
+    def test_quantized_primitive_uses_extension_and_padded_strides(self):
+        writer = GlbWriter(quantize=True)
+        frame = (np.array([0.5, 0.5, 0.0]), 0.5)
+        prim = writer.primitive(TRIANGLE, vertex_normals(TRIANGLE, TRIANGLE_INDICES), TRIANGLE_INDICES, frame=frame)
+        writer.add_node("part_0", writer.add_mesh("mesh_0", [prim]), frame=frame)
+        gltf, _ = _parse_glb(writer.to_bytes())
+
+        assert gltf["extensionsRequired"] == ["KHR_mesh_quantization"]
+        position = gltf["accessors"][prim["attributes"]["POSITION"]]
+        normal = gltf["accessors"][prim["attributes"]["NORMAL"]]
+        assert (position["componentType"], position["normalized"]) == (5122, True)
+        assert (normal["componentType"], normal["normalized"]) == (5120, True)
+        assert gltf["bufferViews"][position["bufferView"]]["byteStride"] == 8
+        assert gltf["bufferViews"][normal["bufferView"]]["byteStride"] == 4
+        # Node transform maps the int16 range back onto the frame
+        assert gltf["nodes"][0]["translation"] == [0.5, 0.5, 0.0]
+        assert gltf["nodes"][0]["scale"][0] * 32767 == pytest.approx(0.5)
+        assert position["min"] == [-32767, -32767, 0] and position["max"] == [32767, 32767, 0]
+
+    def test_cache_order_is_a_permutation(self):
+        n = 10
+        quads = [(i * (n + 1) + j, i * (n + 1) + j + 1, (i + 1) * (n + 1) + j)
+                 for i in range(n) for j in range(n)]
+        indices = np.array(quads[::-1], dtype=np.uint32)
+        order = vertex_cache_order(indices)
+        assert sorted(order.tolist()) == list(range(len(indices)))
+
+    def test_optimize_mesh_preserves_triangles(self):
+        positions = np.arange(15, dtype=np.float32).reshape(5, 3)
+        normals = np.zeros_like(positions)
+        indices = np.array([[4, 2, 3], [0, 4, 2]], dtype=np.uint32)  # vertex 1 unused
+        new_positions, _, new_indices = optimize_mesh(positions, normals, indices)
+        assert len(new_positions) == 4
+        before = {tuple(map(tuple, positions[t])) for t in indices}
+        after = {tuple(map(tuple, new_positions[t])) for t in new_indices}
+        assert before == after
+        assert new_indices.reshape(-1)[0] == 0  # vertices renumbered by first use
+
+
+class TestTessellation:
+    def test_one_node_and_mesh_per_part(self):
+        from build123d import Box, Pos
+
+        parts = [Box(100, 50, 20), Pos(200, 0, 0) * Box(100, 50, 20)]
+        styles = {"treads": {"color": [0.6, 0.4, 0.2], "opacity": 0.5},
+                  "risers": {"color": [0.5, 0.5, 0.5], "opacity": 1.0}}
+        gltf, _ = _parse_glb(categories_to_glb([("treads", parts[:1]), ("risers", parts[1:])], styles))
+
+        assert [n["name"] for n in gltf["nodes"]] == ["part_0", "part_1"]
+        assert [m["name"] for m in gltf["materials"]] == ["treads", "risers"]
+        assert gltf["meshes"][1]["primitives"][0]["material"] == 1
+
+    def test_single_primitive_per_part(self):
+        """Each part's faces are merged into one primitive: 6 faces x 2 triangles for a box."""
+        from build123d import Box
+
+        gltf, _ = _parse_glb(categories_to_glb([("treads", [Box(100, 50, 20)])],
+                                               {"treads": {"color": [1, 1, 1], "opacity": 1.0}}))
+        prims = gltf["meshes"][0]["primitives"]
+        assert len(prims) == 1
+        assert gltf["accessors"][prims[0]["indices"]]["count"] == 6 * 2 * 3
+
+    def test_located_instances_keep_their_placement(self):
+        """Instances sharing one prototype triangulation land at their own locations."""
+        from build123d import Box, Pos
+
+        proto = Box(10, 10, 10)
+        parts = [proto.moved(Pos(0, 0, 0)), proto.moved(Pos(100, 0, 0))]
+        gltf, _ = _parse_glb(categories_to_glb([("treads", parts)],
+                                               {"treads": {"color": [1, 1, 1], "opacity": 1.0}}, instance=False))
+        mins = [gltf["accessors"][m["primitives"][0]["attributes"]["POSITION"]]["min"][0] for m in gltf["meshes"]]
+        assert mins == pytest.approx([-5, 95], abs=1e-3)
+
+    def test_identical_parts_share_one_mesh(self):
+        """Independently built, translated copies become one mesh placed by their nodes."""
+        from build123d import Cylinder, Pos
+
+        rods = [Pos(x, 0, 0) * Cylinder(10, 900) for x in (0, 100, 200)]
+        gltf, _ = _parse_glb(categories_to_glb([("balusters", rods)],
+                                               {"balusters": {"color": [1, 1, 1], "opacity": 1.0}}))
+        assert len(gltf["meshes"]) == 1
+        assert [n["name"] for n in gltf["nodes"]] == ["part_0", "part_1", "part_2"]
+        assert {n["mesh"] for n in gltf["nodes"]} == {0}
+        assert [n["translation"][0] for n in gltf["nodes"]] == pytest.approx([0, 100, 200], abs=1e-6)
+
+    def test_rotated_copies_share_one_mesh(self):
+        from build123d import Box, Pos, Rot
+
+        tread = Box(900, 250, 40) - Pos(400, 100, 0) * Box(50, 50, 50)  # asymmetric notch
+        parts = [tread, Pos(0, 1000, 0) * Rot(0, 0, 90) * tread]
+        gltf, _ = _parse_glb(categories_to_glb([("treads", parts)],
+                                               {"treads": {"color": [1, 1, 1], "opacity": 1.0}}))
+        assert len(gltf["meshes"]) == 1
+        assert "rotation" in gltf["nodes"][1]
+
+    def test_different_parts_are_not_shared(self):
+        from build123d import Box, Pos
+
+        parts = [Box(100, 50, 20), Pos(300, 0, 0) * Box(100, 50, 25)]
+        gltf, _ = _parse_glb(categories_to_glb([("treads", parts)],
+                                               {"treads": {"color": [1, 1, 1], "opacity": 1.0}}))
+        assert len(gltf["meshes"]) == 2
+
+    def test_z_up_converted_to_y_up(self):
+        """A tall box (Z) comes out tall along glTF's Y axis."""
+        from build123d import Box
+
+        gltf, _ = _parse_glb(categories_to_glb([("treads", [Box(10, 10, 100)])],
+                                               {"treads": {"color": [1, 1, 1], "opacity": 1.0}}))
+        prims = gltf["meshes"][0]["primitives"]
+        ys = [v for p in prims for v in (gltf["accessors"][p["attributes"]["POSITION"]]["min"][1],
+                                         gltf["accessors"][p["attributes"]["POSITION"]]["max"][1])]
+        assert max(ys) - min(ys) == pytest.approx(100, abs=1e-3)
+
+    def test_finer_lod_adds_triangles_on_curves(self):
+        """Curved parts gain triangles from preview to fabrication, even when re-meshed on the same shape."""
+        from build123d import Cylinder
+
+        rod = Cylinder(20, 900)
+        styles = {"balusters": {"color": [1, 1, 1], "opacity": 1.0}}
+        counts = []
+        for lod in ("fabrication", "preview", "standard", "fabrication"):
+            gltf, _ = _parse_glb(categories_to_glb([("balusters", [rod])], styles, lod=lod))
+            counts.append(gltf["accessors"][gltf["meshes"][0]["primitives"][0]["indices"]]["count"])
+        assert counts[1] < counts[2] < counts[3]
+        assert counts[0] == counts[3]
+
+    def test_packing_leaves_the_cached_shapes_untouched(self):
+        """Meshing works on copies, so exports reading the same shapes never see it."""
+        from build123d import Cylinder
+        from OCP.BRep import BRep_Tool
+        from OCP.TopLoc import TopLoc_Location
+
+        rod = Cylinder(20, 900)
+        categories_to_glb([("balusters", [rod])], {"balusters": {"color": [1, 1, 1], "opacity": 1.0}})
+        assert all(BRep_Tool.Triangulation_s(f.wrapped, TopLoc_Location()) is None for f in rod.faces())
+
+    def test_unknown_lod_rejected(self):
+        from build123d import Box
+
+        with pytest.raises(ValueError):
+            categories_to_glb([("treads", [Box(1, 1, 1)])], {"treads": {"color": [1, 1, 1], "opacity": 1.0}},
+                              lod="ultra")
+
+    def test_quantized_glb_is_smaller(self):
+        from build123d import Cylinder
+
+        styles = {"balusters": {"color": [1, 1, 1], "opacity": 1.0}}
+        plain = categories_to_glb([("balusters", [Cylinder(20, 900)])], styles)
+        quantized = categories_to_glb([("balusters", [Cylinder(20, 900)])], styles, quantize=True)
+        assert len(quantized) < 0.7 * len(plain)
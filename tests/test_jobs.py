@@ -0,0 +1,75 @@
+"""Background job store tests, using plain Python jobs on a real compute pool."""
+import sys
+import os
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compute_pool import ComputePool
+from geometry_cache import notify_stage
+from jobs import JobArtifact, JobStore
+
+
+def _wait(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if not job.in_flight:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job still {job.status}")
+
+
+class TestJobStore:
+    def test_stages_reported_in_order(self):
+        store = JobStore(ComputePool(workers=1, max_queue=4))
+
+        def run(progress):
+            notify_stage("volumetric")   # as StageCache.run would
+            notify_stage("flight_framing")
+            progress("nesting")
+            return JobArtifact(b"dxf", "application/dxf")
+
+        job, _ = store.submit("cnc_dxf", "k", ["volumetric", "routing", "nesting"], run)
+        _wait(job)
+        status = job.to_dict()
+        assert status["status"] == "done"
+        assert [s["status"] for s in status["stages"]] == ["done", "skipped", "done"]
+        assert job.result.content == b"dxf"
+
+    def test_identical_in_flight_jobs_deduplicated(self):
+        store = JobStore(ComputePool(workers=1, max_queue=4))
+        release = threading.Event()
+        calls = []
+
+        def run(progress):
+            calls.append(1)
+            release.wait(5)
+            return JobArtifact(b"zip", "application/zip")
+
+        first, dup_first = store.submit("autocad", "same", [], run)
+        second, dup_second = store.submit("autocad", "same", [], run)
+        release.set()
+        _wait(first)
+        assert first is second
+        assert (dup_first, dup_second) == (False, True)
+        assert len(calls) == 1
+
+    def test_failed_job_reports_error_and_is_retried(self):
+        store = JobStore(ComputePool(workers=1, max_queue=4))
+
+        def boom(progress):
+            raise ValueError("No parts to nest")
+
+        job, _ = store.submit("cnc_dxf", "k", ["nesting"], boom)
+        _wait(job)
+        assert job.status == "error"
+        assert "No parts" in job.error
+        retry, deduplicated = store.submit("cnc_dxf", "k", ["nesting"], boom)
+        assert retry is not job and not deduplicated
+
+    def test_finished_results_expire(self):
+        store = JobStore(ComputePool(workers=1, max_queue=4), ttl=0)
+        job, _ = store.submit("autocad", "k", [], lambda progress: JobArtifact(b"", "application/zip"))
+        _wait(job)
+        job.finished -= 1
+        assert store.get(job.id) is None
@@ -0,0 +1,80 @@
+"""Nesting search tests (pure Python strategies on a thread pool)."""
+import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nesting_search import anneal, iter_search, run_strategy
+from polygon_nesting import layout_score, nest_parts_polygon
+
+
+def rect(w, h):
+    return [(0, 0), (w, 0), (w, h), (0, h)]
+
+
+def ell(size, arm):
+    return [(0, 0), (size, 0), (size, arm), (arm, arm), (arm, size), (0, size)]
+
+
+PARTS = [{"id": i, "name": f"p{i}", "points": ell(500 + 40 * i, 120) if i % 2 else rect(300 + 70 * i, 220)}
+         for i in range(10)]
+
+
+class TestStrategies:
+    def test_polygon_strategy_names_its_order(self):
+        result = run_strategy(("polygon", "length"), PARTS, 2440, 1220, 8.0, 90, time.time() + 5)
+        assert result["algo"] == "polygon:length"
+        assert sum(len(s["parts"]) for s in result["sheets"].values()) == len(PARTS)
+
+    def test_anneal_never_worse_than_its_start(self):
+        baseline = nest_parts_polygon(PARTS, 1500, 1000)
+        result = anneal(PARTS, 1500, 1000, 8.0, (0, 90, 180, 270), time.time() + 0.5)
+        assert layout_score(result) <= layout_score(baseline)
+        assert result["anneal_steps"] > 0
+
+
+class TestSearch:
+    def test_search_returns_best_within_budget(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            start = time.time()
+            events = list(iter_search(PARTS, 2440, 1220, mode="thorough", time_budget=1.0, pool=pool))
+            elapsed = time.time() - start
+        assert elapsed < 5
+        best = [value for kind, value in events if kind == "layout"][-1]
+        kind, summary = events[-1]
+        layouts = summary["layouts"]
+        assert layouts[0]["algo"] == best["algo"] == summary["best"]["algo"]
+        assert best["sheet_count"] == min(l["sheet_count"] for l in layouts)
+        assert summary["mode"] == "thorough"
+
+    def test_unknown_mode_and_bad_budget_are_rejected(self):
+        with pytest.raises(ValueError):
+            next(iter_search(PARTS, mode="exhaustive"))
+        with pytest.raises(ValueError):
+            next(iter_search(PARTS, time_budget=0))
+
+    def test_iter_search_yields_only_improvements(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            events = list(iter_search(PARTS, 1500, 1000, mode="thorough", time_budget=1.0, pool=pool))
+        kinds = [kind for kind, _ in events]
+        assert kinds[-1] == "done" and kinds.count("done") == 1 and kinds[0] == "layout"
+        scores = [layout_score(value) for kind, value in events if kind == "layout"]
+        assert scores == sorted(scores, reverse=True) and len(set(scores)) == len(scores)
+
+    def test_stop_event_ends_search_early(self):
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            start = time.time()
+            search = iter_search(PARTS, 2440, 1220, mode="thorough", time_budget=30, pool=pool, stop=stop)
+            kind, first = next(search)
+            stop.set()
+            kind, summary = list(search)[-1]
+            elapsed = time.time() - start
+        assert kind == "done" and summary["reason"] == "stopped"
+        assert elapsed < 10
+        assert summary["best"]["sheet_count"] <= first["sheet_count"]
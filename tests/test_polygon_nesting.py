@@ -0,0 +1,126 @@
+"""True-shape nesting tests (pure Python, no geometry kernel needed)."""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from polygon_nesting import (
+    NfpCache, convex_pieces, minkowski_sum, nest_parts_polygon, outline_key, point_in_polygon,
+    polygon_area, rotation_steps,
+)
+
+
+def rect(w, h):
+    return [(0, 0), (w, 0), (w, h), (0, h)]
+
+
+def ell(size, arm):
+    return [(0, 0), (size, 0), (size, arm), (arm, arm), (arm, size), (0, size)]
+
+
+def placed_outlines(result):
+    for sheet in result["sheets"].values():
+        yield [[(x + p["x"], y + p["y"]) for x, y in p["outer"]] for p in sheet["parts"]]
+
+
+class TestGeometry:
+    def test_convex_pieces_cover_the_outline(self):
+        pieces = convex_pieces(ell(1000, 200))
+        assert len(pieces) >= 2
+        assert abs(sum(polygon_area(p) for p in pieces) - polygon_area(ell(1000, 200))) < 1e-6
+
+    def test_minkowski_sum_of_squares(self):
+        total = minkowski_sum(rect(10, 10), rect(5, 5))
+        assert sorted(total) == sorted(rect(15, 15))
+
+    def test_rotation_steps(self):
+        assert rotation_steps(90) == (0, 90, 180, 270)
+        assert rotation_steps(0) == (0,)
+        assert len(rotation_steps(15)) == 24
+        assert len(rotation_steps(0.01)) == 72  # clamped to MIN_ROTATION_STEP
+
+
+class TestNesting:
+    def test_interlocking_ells_share_their_bounding_boxes(self):
+        # Two 1000x1000 L-shapes don't fit a 1100x1100 sheet as rectangles, but
+        # one turned 180 degrees slots into the other
+        parts = [{"id": i, "name": f"ell_{i}", "points": ell(1000, 200)} for i in range(2)]
+        result = nest_parts_polygon(parts, 1100, 1300)
+        assert result["sheet_count"] == 1
+        assert {p["rotation"] for p in result["sheets"]["0"]["parts"]} == {0, 180}
+
+    def test_parts_do_not_overlap(self):
+        parts = [{"id": i, "name": f"p{i}", "points": ell(600, 150) if i % 2 else rect(700, 250)}
+                 for i in range(10)]
+        result = nest_parts_polygon(parts, 2440, 1220)
+        for outlines in placed_outlines(result):
+            for i, a in enumerate(outlines):
+                for b in outlines[i + 1:]:
+                    assert not any(point_in_polygon(b, x, y) for x, y in a)
+                    assert not any(point_in_polygon(a, x, y) for x, y in b)
+
+    def test_small_part_goes_in_a_cut_out(self):
+        frame = {"id": 0, "name": "frame", "points": rect(1000, 1000),
+                 "inner": [[(100, 100), (900, 100), (900, 900), (100, 900)]]}
+        small = {"id": 1, "name": "small", "points": rect(300, 300)}
+        result = nest_parts_polygon([frame, small], 1020, 1020)
+        assert result["sheet_count"] == 1
+        placed = {p["name"]: p for p in result["sheets"]["0"]["parts"]}
+        assert 100 < placed["small"]["x"] < 900 and 100 < placed["small"]["y"] < 900
+
+    def test_efficiency_is_material_area(self):
+        result = nest_parts_polygon([{"id": 0, "name": "a", "points": rect(1000, 500),
+                                      "inner": [rect(100, 100)]}], 2000, 1000)
+        assert result["efficiency"] == round((500000 - 10000) / 2000000 * 100, 2)
+
+    def test_oversized_part_is_reported(self):
+        result = nest_parts_polygon([{"id": 0, "name": "huge", "points": rect(3000, 2000)}], 2440, 1220)
+        assert result["unplaced"] == ["huge"]
+        assert result["sheet_count"] == 0
+
+    def test_tall_part_is_turned_to_fit(self):
+        result = nest_parts_polygon([{"id": 0, "name": "tall", "points": rect(100, 2400)}], 2440, 1220)
+        assert result["sheets"]["0"]["parts"][0]["rotation"] in (90, 270)
+
+
+class TestNfpCache:
+    def test_outline_key_ignores_position_and_start_vertex(self):
+        a = [(0, 0), (100, 0), (100, 50), (0, 50)]
+        b = [(110, 60), (110, 10), (10, 10), (10, 60)][::-1]
+        assert outline_key(a) == outline_key(b)
+        assert outline_key(a) != outline_key([(0, 0), (50, 0), (50, 100), (0, 100)])
+
+    def test_identical_parts_share_nfps(self):
+        parts = [{"id": i, "name": f"t{i}", "points": rect(400, 250)} for i in range(8)]
+        result = nest_parts_polygon(parts, 2440, 1220)
+        assert result["nfp"]["computed"] < result["nfp"]["hits"]
+
+    def test_disk_shards_survive_a_new_cache(self, tmp_path):
+        parts = [{"id": i, "name": f"p{i}", "points": ell(500, 120) if i % 2 else rect(600, 200)}
+                 for i in range(6)]
+        first = nest_parts_polygon(parts, 2440, 1220, nfp_cache=NfpCache(str(tmp_path)))
+        second = nest_parts_polygon(parts, 2440, 1220, nfp_cache=NfpCache(str(tmp_path)))
+        assert first["nfp"]["computed"] > 0
+        assert second["nfp"]["computed"] == 0
+        assert second["sheets"] == first["sheets"]
+
+    def test_shard_lookup_counts_one_hit(self, tmp_path):
+        parts = [{"id": i, "name": f"p{i}", "points": rect(600, 200)} for i in range(2)]
+        nest_parts_polygon(parts, 2440, 1220, nfp_cache=NfpCache(str(tmp_path)))
+        cache = NfpCache(str(tmp_path))
+        result = nest_parts_polygon(parts, 2440, 1220, nfp_cache=cache)
+        stats = cache.stats()
+        assert stats["shard_reads"] == 1 and stats["misses"] == 0
+        assert stats["hits"] == result["nfp"]["hits"]
+
+    def test_oldest_shards_are_evicted(self, tmp_path):
+        def shards():
+            return {name for _, _, files in os.walk(tmp_path) for name in files}
+
+        cache = NfpCache(str(tmp_path), max_disk_bytes=1)
+        nest_parts_polygon([{"id": i, "name": f"r{i}", "points": rect(600, 200)} for i in range(2)],
+                           2440, 1220, nfp_cache=cache)
+        first = shards()
+        nest_parts_polygon([{"id": i, "name": f"l{i}", "points": ell(500, 120)} for i in range(2)],
+                           2440, 1220, nfp_cache=cache)
+        assert first and shards() and not first & shards()
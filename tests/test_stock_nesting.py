@@ -0,0 +1,79 @@
+"""Material-aware multi-stock nesting tests (pure Python strategies on a thread pool)."""
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_nesting import default_stock, material_groups, nest_stock, normalize_stock, stock_lists
+
+
+def rect(w, h):
+    return [(0, 0), (w, 0), (w, h), (0, h)]
+
+
+TREADS = [{"id": i, "name": f"treads_{i + 1}", "points": rect(900, 280)} for i in range(12)]
+STRINGERS = [{"id": 100 + i, "name": f"stringers_{i + 1}", "points": rect(2200, 300)} for i in range(2)]
+
+
+def nest(groups, stock):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        return nest_stock(groups, stock, time_budget=1.0, pool=pool)
+
+
+class TestStock:
+    def test_categories_group_by_material(self):
+        groups = material_groups(["treads", "stringers", "risers", "ribs"])
+        assert groups == {"20mm Timber": ["treads", "risers"], "50mm Structural": ["stringers"],
+                          "18mm Plywood": ["ribs"]}
+
+    def test_default_stock_price_scales_with_area(self):
+        full = default_stock("20mm Timber")[0]
+        half = default_stock("20mm Timber", 1220, 1220)[0]
+        assert full["quantity"] is None and half["cost"] == pytest.approx(full["cost"] / 2)
+
+    def test_bad_stock_is_rejected(self):
+        with pytest.raises(ValueError):
+            normalize_stock([{"width": 0, "height": 100}])
+        with pytest.raises(ValueError):
+            normalize_stock([{"width": 100, "height": 100}, {"width": 100, "height": 100}])
+
+    def test_stock_lists_cover_every_material(self):
+        stock = stock_lists({"50mm Structural": [{"width": 3050, "height": 1220, "cost": 300}]}, 2440, 1220)
+        assert set(stock) == {"20mm Timber", "50mm Structural", "18mm Plywood"}
+        assert [s["name"] for s in stock["50mm Structural"]] == ["3050x1220"]
+        assert stock["20mm Timber"] == default_stock("20mm Timber")
+        with pytest.raises(ValueError):
+            stock_lists({"Oak": [{"width": 100, "height": 100}]})
+
+
+class TestNestStock:
+    def test_groups_nest_on_their_own_stock(self):
+        stock = {"20mm Timber": normalize_stock(default_stock("20mm Timber")),
+                 "50mm Structural": normalize_stock([{"width": 3050, "height": 1220, "cost": 300}])}
+        result = nest({"20mm Timber": TREADS, "50mm Structural": STRINGERS}, stock)
+        assert not result["unplaced"]
+        by_material = {}
+        for sheet in result["sheets"].values():
+            by_material.setdefault(sheet["material"], set()).update(p["name"].split("_")[0] for p in sheet["parts"])
+        assert by_material == {"20mm Timber": {"treads"}, "50mm Structural": {"stringers"}}
+        structural = result["materials"]["50mm Structural"]
+        assert structural["stock"]["3050x1220"]["cost"] == pytest.approx(300 * structural["sheet_count"])
+        assert result["cost"] == pytest.approx(sum(m["cost"] for m in result["materials"].values()))
+
+    def test_offcuts_are_used_first(self):
+        stock = {"20mm Timber": normalize_stock(default_stock("20mm Timber")
+                                                + [{"width": 1000, "height": 600, "quantity": 2}])}
+        result = nest({"20mm Timber": TREADS}, stock)
+        offcuts = [s for s in result["sheets"].values() if s["stock"] == "1000x600 offcut"]
+        assert len(offcuts) == 2 and all(s["cost"] == 0 for s in offcuts)
+        assert sum(len(s["parts"]) for s in result["sheets"].values()) == len(TREADS)
+
+    def test_lightly_used_sheet_moves_to_cheaper_stock(self):
+        stock = {"20mm Timber": normalize_stock([{"width": 2440, "height": 1220, "cost": 95},
+                                                 {"width": 1220, "height": 610, "cost": 30}])}
+        result = nest({"20mm Timber": TREADS[:1]}, stock)
+        assert result["sheet_count"] == 1
+        assert result["sheets"]["0"]["stock"] == "1220x610" and result["cost"] == 30